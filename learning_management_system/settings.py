@@ -52,10 +52,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'pages.staticassets.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'pages.queryinspector.QueryInspectorMiddleware',
+    'pages.middleware.ReadReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,13 +86,79 @@ WSGI_APPLICATION = 'learning_management_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (default) keeps the local db.sqlite3 file.
+# DB_ENGINE=postgres reads DB_NAME/DB_USER/DB_PASSWORD/DB_HOST/DB_PORT and uses
+# persistent connections with health checks, or a psycopg connection pool
+# when DB_POOL_MAX_SIZE is set (pooling and CONN_MAX_AGE are exclusive).
+# Setting DB_REPLICA_HOST (postgres) or DB_REPLICA_NAME (sqlite file) adds a
+# "replica" alias that read-only views use (see pages.routers).
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgres":
+    _pool_size = int(os.getenv("DB_POOL_MAX_SIZE", "0"))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DB_NAME", "lms"),
+            'USER': os.getenv("DB_USER", "lms"),
+            'PASSWORD': os.getenv("DB_PASSWORD", ""),
+            'HOST': os.getenv("DB_HOST", "localhost"),
+            'PORT': os.getenv("DB_PORT", "5432"),
+            'CONN_MAX_AGE': 0 if _pool_size else int(os.getenv("DB_CONN_MAX_AGE", "60")),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+                **({'pool': {
+                    'min_size': int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                    'max_size': _pool_size,
+                    'timeout': int(os.getenv("DB_POOL_TIMEOUT", "10")),
+                }} if _pool_size else {}),
+            },
+        }
     }
+    if os.getenv("DB_REPLICA_HOST"):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.getenv("DB_REPLICA_HOST"),
+            'PORT': os.getenv("DB_REPLICA_PORT", DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Wait up to 20s for the write lock; take it at BEGIN so a
+                # read transaction never fails upgrading to a write.
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+    if os.getenv("DB_REPLICA_NAME"):
+        # Local stand-in for a replica: a second SQLite file
+        # (`manage.py migrate --database=replica`, then copy data across).
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / os.getenv("DB_REPLICA_NAME"),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_ROUTERS = ['pages.routers.ReadReplicaRouter']
+
+# Applied to every new SQLite connection by pages.db (empty dict to disable)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": 20000,       # ms
+    "synchronous": "NORMAL",     # durable at checkpoints; safe with WAL
+    "mmap_size": 268435456,      # 256 MiB
+    "temp_store": "MEMORY",
 }
 
+# URL names served from the replica for GET/HEAD (admin changelists always are)
+READ_REPLICA_VIEWS = ("index", "courses_list", "course_enroll")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,9 +198,41 @@ STATIC_URL = '/static/'
 # STATICFILES_DIRS = [BASE_DIR / "static"]   
 STATIC_ROOT = BASE_DIR / "staticfiles" 
 
+# collectstatic fingerprints names and writes .gz/.br siblings of text
+# assets plus STATIC_IMAGE_WIDTHS resized and AVIF/WebP copies of images
+# (pages.staticassets). StaticFilesMiddleware serves them from STATIC_ROOT,
+# negotiated per request; hashed names are cached as immutable, the rest for
+# STATIC_MAX_AGE seconds; STATIC_SERVE=0 hands that to a proxy, and it is
+# off under DEBUG. The test runner swaps in plain storage, as tests run
+# without collectstatic.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "pages.staticassets.CompressedManifestStaticFilesStorage"},
+}
+STATIC_IMAGE_WIDTHS = (480, 960, 1600)
+STATIC_IMAGE_FORMATS = ("avif", "webp")
+STATIC_SERVE = os.getenv("STATIC_SERVE", "0" if DEBUG else "1") == "1"
+STATIC_MAX_AGE = 60
+
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Lesson resource downloads (pages.downloads). Behind nginx use
+# "x-accel-redirect" with an `internal` location at RESOURCE_ACCEL_PREFIX
+# aliased to MEDIA_ROOT; "x-sendfile" for Apache/lighttpd. Unset, Django
+# streams the file itself (with Range and ETag support).
+RESOURCE_SENDFILE = os.getenv("RESOURCE_SENDFILE") or None
+RESOURCE_ACCEL_PREFIX = "/protected-media/"
+
+# Avatar uploads (pages.avatars): validated in the request, then cropped,
+# stripped of metadata and re-encoded to WebP/JPEG at each size by
+# AVATAR_WORKERS background threads (0 = inline).
+AVATAR_SIZES = (32, 64, 128, 256, 512)
+AVATAR_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+AVATAR_MAX_PIXELS = 40_000_000
+AVATAR_WORKERS = 2
+AVATAR_STAGING_DIR = os.getenv("AVATAR_STAGING_DIR", BASE_DIR / "var" / "avatar_staging")
+
 
 LOGIN_REDIRECT_URL = "dashboard"   # or 'index'
 LOGOUT_REDIRECT_URL = "index"      # where to go after logout
@@ -147,3 +248,62 @@ MESSAGE_TAGS = {
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Quiz grading: per-process LRU of answer keys. Set the alias to a shared
+# cache (e.g. "default" backed by Redis) so workers reuse each other's keys.
+ANSWER_KEY_CACHE_SIZE = 256
+ANSWER_KEY_CACHE_ALIAS = None
+
+# Mirror lesson completions into per-(user, course) bitsets (pages.bitmaps).
+# Backfill first with `manage.py reconcile_completion_bitmaps`.
+COMPLETION_BITMAPS = False
+
+# Group-commit small writes (completions, quiz attempts, contact messages)
+# through one background thread per process (pages.writequeue).
+WRITE_QUEUE_ENABLED = False
+WRITE_QUEUE_MAX_BATCH = 200
+WRITE_QUEUE_MAX_DELAY_MS = 5
+WRITE_QUEUE_TIMEOUT = 30
+
+# "sync" writes QuizAttempt before responding; "spool" answers right after
+# grading and leaves the write to `manage.py drain_quiz_attempts`.
+QUIZ_ATTEMPT_MODE = os.getenv("QUIZ_ATTEMPT_MODE", "sync")
+QUIZ_ATTEMPT_SPOOL_DIR = os.getenv("QUIZ_ATTEMPT_SPOOL_DIR", BASE_DIR / "var" / "attempt_spool")
+
+# Anonymous renders of index/courses_list/course_enroll (pages.pagecache),
+# keyed by the catalog version; the timeout only bounds memory use. Pages get
+# their own cache so search-query churn never culls the content versions,
+# answer keys or curriculum snapshots held in "default".
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "default",
+    },
+    "pages": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "pages",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    # Content versions (pages.versions) must be shared by every worker
+    "versions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CONTENT_VERSION_CACHE_DIR", BASE_DIR / "var" / "versions"),
+        "OPTIONS": {"MAX_ENTRIES": 100_000},
+    },
+}
+CONTENT_VERSION_CACHE = "versions"
+PAGE_CACHE_ALIAS = "pages"
+PAGE_CACHE_TIMEOUT = 600
+PAGE_CACHE_MAX_PARAM_LENGTH = 100
+
+# Per-request SQL recording (pages.queryinspector): call sites that repeat
+# one query shape this often are logged as likely N+1s, and views over their
+# @query_budget log a warning ("raise" makes them fail). It walks the stack
+# on every query, so it is off unless DEBUG or QUERY_INSPECTOR=1; the test
+# runner turns it on with QUERY_BUDGET_MODE = "raise".
+QUERY_INSPECTOR_ENABLED = os.getenv("QUERY_INSPECTOR", "1" if DEBUG else "0") == "1"
+QUERY_INSPECTOR_N_PLUS_ONE = 5
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log")
+
+TEST_RUNNER = "learning_management_system.test_runner.TestRunner"
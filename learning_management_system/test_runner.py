@@ -0,0 +1,37 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner with test-only settings: views that go over their
+    @query_budget fail the test, static files use plain storage since tests
+    run without collectstatic, and content versions go to a throwaway dir.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._versions_dir = tempfile.mkdtemp(prefix="lms-test-versions-")
+        caches = {**settings.CACHES}
+        caches[settings.CONTENT_VERSION_CACHE] = {
+            **caches[settings.CONTENT_VERSION_CACHE], "LOCATION": self._versions_dir,
+        }
+        self._overrides = override_settings(
+            CACHES=caches,
+            QUERY_INSPECTOR_ENABLED=True,
+            QUERY_BUDGET_MODE="raise",
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        self._overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._overrides.disable()
+        shutil.rmtree(self._versions_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,15 +1,39 @@
-from django.contrib import admin 
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from .models import (
-    UserProfile, Course, Module, Lesson, Resource,
-    Enrollment, LessonCompletion, Quiz, Question, Choice, QuizAttempt, ContactMessage
+    UserProfile, Course, Module, Lesson, Resource, Blob,
+    Enrollment, LessonCompletion, LessonProgressBitmap, Quiz, Question, Choice, QuizAttempt, ContactMessage
 )
+from . import bitmaps, counters, enrollment_import, pagecache, progress, search
 
 admin.site.site_header = "Rabbani CiC Admin"
 admin.site.site_title = "Rabbani CiC Admin"
 admin.site.index_title = "Learning Management System"
 
+def select_related_filter(*related):
+    """
+    RelatedFieldListFilter whose choice labels come from one query: the
+    default one calls str() per row, and Module/Lesson/Quiz.__str__ walk up
+    to the course.
+    """
+    class Filter(admin.RelatedFieldListFilter):
+        def field_choices(self, field, request, model_admin):
+            ordering = self.field_admin_ordering(field, request, model_admin)
+            qs = field.remote_field.model._default_manager.select_related(*related)
+            if ordering:
+                qs = qs.order_by(*ordering)
+            attname = field.remote_field.get_related_field().attname
+            return [(getattr(obj, attname), str(obj)) for obj in qs]
+    return Filter
+
 # ----- Inlines -----
 class ResourceInline(admin.TabularInline):
     model = Resource
@@ -37,6 +61,12 @@ class QuestionInline(admin.StackedInline):
     ordering = ("order",)               # ✅ was index
     show_change_link = True
 
+class EnrollmentImportForm(forms.Form):
+    csv_file = forms.FileField(label="CSV file", help_text="Columns: email, course (slug); optional status, first_name, last_name.")
+    create_users = forms.BooleanField(required=False, help_text="Create accounts (username = email, no password) for unknown emails.")
+    status = forms.ChoiceField(choices=Enrollment.STATUS_CHOICES, initial=Enrollment.STATUS_ACTIVE,
+                               help_text="Used for rows without a status column.")
+
 # ----- UserProfile -----
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -51,22 +81,36 @@ class UserProfileAdmin(admin.ModelAdmin):
 # ----- Course -----
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ("title", "category", "is_active", "slug")
+    list_display = ("title", "category", "is_active", "slug", "n_modules", "n_lessons")
     list_filter = ("category", "is_active")
     search_fields = ("title", "slug", "category")
     prepopulated_fields = {"slug": ("title",)}
-    actions = ("activate_selected", "deactivate_selected")
+    readonly_fields = ("n_modules", "n_lessons")
+    actions = ("activate_selected", "deactivate_selected", "recount_selected")
+
+    def _set_active(self, queryset, is_active):
+        # update() sends no post_save, so do what the Course signals would
+        course_ids = list(queryset.values_list("pk", flat=True))
+        updated = Course.objects.filter(pk__in=course_ids).update(is_active=is_active)
+        transaction.on_commit(pagecache.bump_catalog)
+        transaction.on_commit(lambda: search.reindex(course_ids))
+        return updated
 
     def activate_selected(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = self._set_active(queryset, True)
         self.message_user(request, f"Activated {updated} course(s).")
     activate_selected.short_description = "Activate selected courses"
 
     def deactivate_selected(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = self._set_active(queryset, False)
         self.message_user(request, f"Deactivated {updated} course(s).")
     deactivate_selected.short_description = "Deactivate selected courses"
 
+    def recount_selected(self, request, queryset):
+        updated = counters.recount(queryset)
+        self.message_user(request, f"Recounted modules/lessons for {updated} course(s).")
+    recount_selected.short_description = "Recount modules/lessons"
+
 # ----- Module -----
 @admin.register(Module)
 class ModuleAdmin(admin.ModelAdmin):
@@ -86,7 +130,7 @@ class ModuleAdmin(admin.ModelAdmin):
 @admin.register(Lesson)
 class LessonAdmin(admin.ModelAdmin):
     list_display = ("module", "index", "title", "youtube_preview")
-    list_filter = ("module__course", "module")
+    list_filter = ("module__course", ("module", select_related_filter("course")))
     search_fields = ("title", "module__title", "module__course__title")
     ordering = ("module", "index")
     autocomplete_fields = ("module",)
@@ -119,7 +163,7 @@ class LessonAdmin(admin.ModelAdmin):
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
     list_display = ("lesson", "title", "is_active")  # ✅ removed pass_mark
-    list_filter = ("lesson__module__course", "lesson__module")
+    list_filter = ("lesson__module__course", ("lesson__module", select_related_filter("course")))
     search_fields = ("title", "lesson__title", "lesson__module__title", "lesson__module__course__title")
     ordering = ("lesson",)
     autocomplete_fields = ("lesson",)
@@ -134,7 +178,7 @@ class QuizAdmin(admin.ModelAdmin):
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
     list_display = ("quiz", "order", "text")   # ✅ was index
-    list_filter = ("quiz__lesson__module__course", "quiz")
+    list_filter = ("quiz__lesson__module__course", ("quiz", select_related_filter("lesson__module__course")))
     search_fields = ("text", "quiz__title", "quiz__lesson__title")
     ordering = ("quiz", "order")               # ✅ was index
     autocomplete_fields = ("quiz",)
@@ -149,7 +193,7 @@ class QuestionAdmin(admin.ModelAdmin):
 @admin.register(Choice)
 class ChoiceAdmin(admin.ModelAdmin):
     list_display = ("question", "is_correct", "text")
-    list_filter = ("is_correct", "question__quiz")
+    list_filter = ("is_correct", ("question__quiz", select_related_filter("lesson__module__course")))
     search_fields = ("text", "question__text", "question__quiz__title")
     ordering = ("question", "id")
     autocomplete_fields = ("question",)
@@ -162,13 +206,14 @@ class ChoiceAdmin(admin.ModelAdmin):
 # ----- Enrollment -----
 @admin.register(Enrollment)
 class EnrollmentAdmin(admin.ModelAdmin):
-    list_display = ("user", "course", "status", "created_at")
+    list_display = ("user", "course", "status", "progress_display", "created_at")
     list_filter = ("status", "course")
     search_fields = ("user__username", "user__email", "course__title")
     ordering = ("-created_at",)
     autocomplete_fields = ("user", "course")
     date_hierarchy = "created_at"
-    actions = ("mark_active", "mark_completed")
+    readonly_fields = ("completed_lessons", "total_lessons")
+    actions = ("mark_active", "mark_completed", "recompute_progress")
 
     def get_queryset(self, request):
         return (super()
@@ -185,6 +230,50 @@ class EnrollmentAdmin(admin.ModelAdmin):
         self.message_user(request, f"Marked {updated} enrollment(s) as completed.")
     mark_completed.short_description = "Mark selected as Completed"
 
+    @admin.display(description="Progress")
+    def progress_display(self, obj):
+        return f"{obj.progress}% ({obj.completed_lessons}/{obj.total_lessons})"
+
+    def recompute_progress(self, request, queryset):
+        updated = progress.recompute(queryset)
+        self.message_user(request, f"Recomputed progress for {updated} enrollment(s).")
+    recompute_progress.short_description = "Recompute progress counters"
+
+    # Bulk CSV import (same engine as `manage.py import_enrollments`)
+    change_list_template = "admin/pages/enrollment/change_list.html"
+
+    def get_urls(self):
+        return [
+            path("import/", self.admin_site.admin_view(self.import_csv_view), name="pages_enrollment_import"),
+        ] + super().get_urls()
+
+    def import_csv_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = EnrollmentImportForm(request.POST or None, request.FILES or None)
+        report = None
+        if request.method == "POST" and form.is_valid():
+            upload = io.TextIOWrapper(form.cleaned_data["csv_file"].file, encoding="utf-8-sig", newline="")
+            try:
+                report = enrollment_import.import_enrollments(
+                    enrollment_import.read_rows(upload),
+                    create_users=form.cleaned_data["create_users"],
+                    status=form.cleaned_data["status"],
+                )
+            except (ValueError, UnicodeDecodeError) as exc:
+                form.add_error("csv_file", str(exc))
+            else:
+                level = messages.WARNING if report.n_errors else messages.SUCCESS
+                self.message_user(request, report.summary(), level)
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Import enrollments",
+            "form": form,
+            "report": report,
+        }
+        return TemplateResponse(request, "admin/pages/enrollment/import.html", context)
+
 # ----- LessonCompletion -----
 @admin.register(LessonCompletion)
 class LessonCompletionAdmin(admin.ModelAdmin):
@@ -200,6 +289,55 @@ class LessonCompletionAdmin(admin.ModelAdmin):
                 .get_queryset(request)
                 .select_related("user", "lesson", "lesson__module", "lesson__module__course"))
 
+    # Admin edits bypass the toggle API (and LessonCompletion has no delete
+    # signals), so rebuild the affected counters here
+    def _recount(self, users, lessons):
+        affected = Enrollment.objects.filter(user_id__in=users, course__modules__lessons__in=lessons)
+        progress.recompute(affected)
+        for user_id, course_id in affected.values_list("user_id", "course_id"):
+            bitmaps.invalidate(user_id, course_id)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        users = {obj.user_id, form.initial.get("user")} - {None}
+        lessons = {obj.lesson_id, form.initial.get("lesson")} - {None}
+        self._recount(users, lessons)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._recount([obj.user_id], [obj.lesson_id])
+
+    def delete_queryset(self, request, queryset):
+        pairs = list(queryset.values_list("user_id", "lesson_id"))
+        super().delete_queryset(request, queryset)
+        self._recount({u for u, _ in pairs}, {l for _, l in pairs})
+
+# ----- LessonProgressBitmap -----
+@admin.register(LessonProgressBitmap)
+class LessonProgressBitmapAdmin(admin.ModelAdmin):
+    list_display = ("user", "course", "n_completed", "layout", "updated_at")
+    list_filter = ("course",)
+    search_fields = ("user__username", "user__email", "course__title")
+    readonly_fields = ("user", "course", "n_completed", "layout", "updated_at")
+    exclude = ("bits",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("user", "course")
+
+    def has_add_permission(self, request):
+        return False  # rows are derived from LessonCompletion
+
+# ----- Blob -----
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "refcount", "created_at")
+    list_filter = ("refcount",)
+    search_fields = ("name", "sha256")
+    readonly_fields = ("name", "sha256", "size", "refcount", "created_at")
+
+    def has_add_permission(self, request):
+        return False  # rows are written by the storage (pages.blobstore)
+
 # ----- QuizAttempt -----
 @admin.register(QuizAttempt)
 class QuizAttemptAdmin(admin.ModelAdmin):
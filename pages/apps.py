@@ -6,6 +6,6 @@ class PagesConfig(AppConfig):
     name = 'pages'
     
     def ready(self):
-        from . import signals
+        from . import checks, db, queryinspector, signals
 
 
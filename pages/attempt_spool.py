@@ -0,0 +1,178 @@
+"""
+File spool for quiz attempts (QUIZ_ATTEMPT_MODE = "spool").
+
+The submit view grades in memory, then enqueue() writes the attempt as one
+JSON file and returns; `manage.py drain_quiz_attempts` bulk-inserts them.
+
+Layout under QUIZ_ATTEMPT_SPOOL_DIR:
+
+  tmp/         files being written (fsynced, then renamed into ready/)
+  ready/       complete attempts, oldest first by name
+  processing/  claimed by a worker (rename is atomic, so workers don't collide);
+               the mtime is the claim time, which recover() goes by
+  failed/      records that can't be inserted (bad JSON or fields, deleted quiz/user)
+
+A file is only removed after its row is committed, so a crashed worker leaves
+it in processing/ for recover() to hand back.
+"""
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Quiz, QuizAttempt
+
+READY, PROCESSING, FAILED, TMP = "ready", "processing", "failed", "tmp"
+
+
+def enabled():
+    return getattr(settings, "QUIZ_ATTEMPT_MODE", "sync") == "spool"
+
+
+def spool_dir() -> Path:
+    return Path(settings.QUIZ_ATTEMPT_SPOOL_DIR)
+
+
+def _dir(name) -> Path:
+    path = spool_dir() / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def enqueue(user_id, quiz_id, score, total, passed, raw_answers) -> str:
+    """Durably spool one attempt and return its spool id."""
+    spool_id = f"{time.time_ns():020d}-{uuid.uuid4().hex}"
+    record = {
+        "user_id": user_id,
+        "quiz_id": quiz_id,
+        "score": score,
+        "total": total,
+        "passed": passed,
+        "raw_answers": raw_answers,
+        "submitted_at": timezone.now().isoformat(),
+    }
+    tmp = _dir(TMP) / f"{spool_id}.json"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(record, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, _dir(READY) / tmp.name)
+    return spool_id
+
+
+def pending() -> int:
+    return sum(1 for _ in _dir(READY).glob("*.json"))
+
+
+def claim(limit) -> list:
+    """Move up to `limit` of the oldest ready files into processing/."""
+    processing = _dir(PROCESSING)
+    claimed = []
+    for path in sorted(_dir(READY).glob("*.json"))[:limit]:
+        target = processing / path.name
+        try:
+            # Stamp the claim time first: a file must never sit in processing/
+            # with its enqueue mtime, or recover() would hand it back at once
+            os.utime(path)
+            os.rename(path, target)
+        except FileNotFoundError:
+            continue  # another worker got it
+        claimed.append(target)
+    return claimed
+
+
+def recover(older_than=300) -> int:
+    """Hand back files claimed more than `older_than` seconds ago (a crashed worker's)."""
+    cutoff = time.time() - older_than
+    ready = _dir(READY)
+    n = 0
+    for path in _dir(PROCESSING).glob("*.json"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                os.rename(path, ready / path.name)
+                n += 1
+        except FileNotFoundError:
+            continue
+    return n
+
+
+def _fail(path):
+    os.replace(path, _dir(FAILED) / path.name)
+
+
+def _well_formed(r):
+    """Whether a decoded record has every field ingest() needs, of the right type."""
+    if not isinstance(r, dict):
+        return False
+    try:
+        datetime.fromisoformat(r["submitted_at"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (
+        isinstance(r.get("quiz_id"), int)
+        and (r.get("user_id") is None or isinstance(r["user_id"], int))
+        and isinstance(r.get("score"), int)
+        and isinstance(r.get("total"), int)
+        and isinstance(r.get("passed"), bool)
+        and isinstance(r.get("raw_answers") or {}, dict)
+    )
+
+
+def ingest(paths, batch_size=1000):
+    """
+    Insert the claimed files with bulk_create and remove them.
+    Returns (inserted, failed).
+    """
+    records = []
+    failed = 0
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                record = json.load(fh)
+        except (OSError, ValueError):
+            record = None
+        if _well_formed(record):
+            records.append((path, record))
+        else:
+            _fail(path)
+            failed += 1
+
+    # Attempts for quizzes/users deleted since submission would fail the batch
+    from django.contrib.auth import get_user_model
+
+    quiz_ids = set(Quiz.objects.filter(id__in={r["quiz_id"] for _, r in records})
+                   .values_list("id", flat=True))
+    user_ids = set(get_user_model().objects.filter(id__in={r.get("user_id") for _, r in records} - {None})
+                   .values_list("id", flat=True))
+    valid = []
+    for path, r in records:
+        if r.get("quiz_id") in quiz_ids and (r.get("user_id") is None or r["user_id"] in user_ids):
+            valid.append((path, r))
+        else:
+            _fail(path)
+            failed += 1
+
+    if valid:
+        attempts = [
+            QuizAttempt(
+                user_id=r.get("user_id"), quiz_id=r["quiz_id"], score=r["score"], total=r["total"],
+                passed=r["passed"], raw_answers=r.get("raw_answers") or {},
+            )
+            for _, r in valid
+        ]
+        with transaction.atomic():
+            QuizAttempt.objects.bulk_create(attempts, batch_size=batch_size)
+            # auto_now_add stamps ingestion time; keep the submission time instead
+            for attempt, (_, r) in zip(attempts, valid):
+                attempt.created_at = datetime.fromisoformat(r["submitted_at"])
+            if attempts[0].pk is not None:
+                QuizAttempt.objects.bulk_update(attempts, ["created_at"], batch_size=batch_size)
+        for path, _ in valid:
+            path.unlink(missing_ok=True)
+    return len(valid), failed
@@ -0,0 +1,219 @@
+"""
+Avatar processing.
+
+api_profile validate()s an upload (a real image in an allowed format, within
+the byte and pixel limits) and stage()s it under AVATAR_STAGING_DIR. A small
+thread pool (AVATAR_WORKERS; 0 processes inline) then process()es it:
+
+  - the EXIF orientation is applied, then all metadata (EXIF/GPS, ICC, XMP,
+    comments) is dropped by re-encoding only the pixels;
+  - the image is centre-cropped square and scaled to each of AVATAR_SIZES
+    (never up), and each size is encoded as WebP and as JPEG;
+  - the largest WebP becomes UserProfile.avatar and every variant goes in
+    UserProfile.avatar_variants ({"version": n, "webp": {"64": name, ...},
+    "jpeg": {...}}), all in the content-addressed storage (pages.blobstore).
+
+Staged files are named <user id>-<time_ns>, and `version` stores that
+time, so an older upload that finishes late can't replace a newer one.
+`manage.py process_avatars` picks up files a restart left behind and, with
+--backfill, avatars uploaded before this pipeline existed.
+"""
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .blobstore import avatar_storage
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_FORMATS = {"JPEG", "MPO", "PNG", "WEBP", "GIF"}  # MPO: multi-picture JPEGs from phone cameras
+ENCODINGS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+FALLBACK_SIZE = 128  # the JPEG offered as a plain `src`/avatar_url
+
+
+def sizes():
+    return tuple(sorted(getattr(settings, "AVATAR_SIZES", (32, 64, 128, 256, 512))))
+
+
+def staging_dir() -> Path:
+    path = Path(settings.AVATAR_STAGING_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# ----- Request side -----
+def validate(upload):
+    """Raise ValueError (with a message for the user) unless the upload is an acceptable image."""
+    max_bytes = getattr(settings, "AVATAR_MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+    if upload.size > max_bytes:
+        raise ValueError(f"Image too large (max {max_bytes // (1024 * 1024)} MB).")
+    try:
+        upload.seek(0)
+        with Image.open(upload) as img:
+            fmt, (width, height) = img.format, img.size
+            img.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValueError("That file isn't a readable image.")
+    finally:
+        upload.seek(0)
+    if fmt not in ALLOWED_FORMATS:
+        raise ValueError(f"Unsupported image format ({fmt}); use JPEG, PNG, WebP or GIF.")
+    if width * height > getattr(settings, "AVATAR_MAX_PIXELS", 40_000_000):
+        raise ValueError("Image dimensions are too large.")
+
+
+def stage(user_id, upload) -> Path:
+    name = f"{user_id}-{time.time_ns()}"
+    tmp = staging_dir() / f".{name}.tmp"
+    with open(tmp, "wb") as fh:
+        for chunk in upload.chunks():
+            fh.write(chunk)
+    path = staging_dir() / name
+    os.replace(tmp, path)
+    return path
+
+
+def accept(user_id, upload):
+    """Stage a validated upload and hand it to the workers."""
+    submit(stage(user_id, upload))
+
+
+def pending(user_id) -> bool:
+    return any(staging_dir().glob(f"{user_id}-*"))
+
+
+def staged():
+    """Every staged upload, oldest first."""
+    return sorted(p for p in staging_dir().iterdir() if not p.name.startswith("."))
+
+
+# ----- Worker -----
+_executor = None
+_pid = None
+_lock = threading.Lock()
+
+
+def submit(path):
+    """Process a staged upload in the background (inline with AVATAR_WORKERS = 0)."""
+    global _executor, _pid
+    workers = getattr(settings, "AVATAR_WORKERS", 2)
+    if not workers:
+        return process_staged(path)
+    # Threads don't survive fork (e.g. gunicorn --preload): one pool per pid
+    if _executor is None or _pid != os.getpid():
+        with _lock:
+            if _executor is None or _pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pages-avatars")
+                _pid = os.getpid()
+    _executor.submit(_run, path)
+
+
+def _run(path):
+    try:
+        process_staged(path)
+    except Exception:
+        logger.exception("Avatar processing failed for %s", path.name)
+    finally:
+        connections.close_all()
+
+
+def process_staged(path) -> bool:
+    """Render and store one staged upload; False if it was superseded or unreadable."""
+    user_id, version = (int(part) for part in path.name.split("-"))
+    try:
+        with open(path, "rb") as fh:
+            renders = render(fh)
+    except FileNotFoundError:
+        return False  # another worker got it
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError, ValueError):
+        logger.warning("Dropping unreadable avatar upload %s", path.name)
+        path.unlink(missing_ok=True)
+        return False
+    stored = save(user_id, version, renders)
+    path.unlink(missing_ok=True)
+    return stored
+
+
+def render(fileobj):
+    """{(encoding, size): bytes} for every size in AVATAR_SIZES, metadata-free."""
+    largest = sizes()[-1]
+    with Image.open(fileobj) as img:
+        img.draft("RGB", (largest * 2, largest * 2))  # JPEG: decode at a reduced scale
+        img = ImageOps.exif_transpose(img)
+        alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if alpha else "RGB")
+    img.info = {}  # exif, icc_profile, xmp... would otherwise be copied into every variant
+    side = min(min(img.size), largest)
+    square = ImageOps.fit(img, (side, side), Image.Resampling.LANCZOS)
+
+    renders = {}
+    for size in sizes():
+        thumb = square if size >= side else square.resize((size, size), Image.Resampling.LANCZOS)
+        for encoding, (fmt, options) in ENCODINGS.items():
+            image = thumb
+            if fmt == "JPEG" and thumb.mode == "RGBA":
+                image = Image.new("RGB", thumb.size, "white")
+                image.paste(thumb, mask=thumb.getchannel("A"))
+            out = io.BytesIO()
+            image.save(out, fmt, **options)
+            renders[(encoding, size)] = out.getvalue()
+    return renders
+
+
+def save(user_id, version, renders) -> bool:
+    storage = avatar_storage()
+    variants = {"version": version, **{encoding: {} for encoding in ENCODINGS}}
+    for (encoding, size), data in renders.items():
+        variants[encoding][str(size)] = storage.save(f"avatar.{encoding}", ContentFile(data))
+    with transaction.atomic():
+        profile, _ = UserProfile.objects.select_for_update().get_or_create(user_id=user_id)
+        if (profile.avatar_variants or {}).get("version", 0) > version:
+            return False  # a newer upload already landed; gc_blobs drops these files
+        profile.avatar = variants["webp"][str(sizes()[-1])]
+        profile.avatar_variants = variants
+        profile.save(update_fields=["avatar", "avatar_variants", "updated_at"])
+    return True
+
+
+def backfill(profile) -> bool:
+    """Run an avatar stored before this pipeline through it."""
+    with profile.avatar.open("rb") as fh:
+        renders = render(fh)
+    return save(profile.user_id, time.time_ns(), renders)
+
+
+# ----- Reading -----
+def as_json(profile):
+    """The avatar part of the profile API: a fallback URL plus srcset strings."""
+    variants = profile.avatar_variants or {}
+    storage = avatar_storage()
+
+    def srcset(encoding):
+        names = variants.get(encoding) or {}
+        return ", ".join(f"{storage.url(names[s])} {s}w" for s in sorted(names, key=int))
+
+    jpeg = variants.get("jpeg") or {}
+    if jpeg:
+        fallback = jpeg.get(str(FALLBACK_SIZE)) or jpeg[max(jpeg, key=int)]
+        url = storage.url(fallback)
+    else:
+        url = profile.avatar.url if profile.avatar else ""
+    return {
+        "url": url,
+        "srcset": srcset("webp"),
+        "jpeg_srcset": srcset("jpeg"),
+        "pending": pending(profile.user_id),
+    }
@@ -0,0 +1,142 @@
+"""
+Benchmark scenarios for the LMS hot paths (`manage.py run_benchmarks`).
+
+Each scenario issues one request per iteration through Django's test client
+as a logged-in learner and records wall time and the number of queries on
+the default connection. Run it against data from `manage.py
+generate_load_data`: the write scenarios toggle completions and add quiz
+attempts for the benchmark user.
+"""
+import math
+import statistics
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Choice, Enrollment, Lesson, Question, Quiz
+
+
+@dataclass
+class Fixture:
+    """What the scenarios need to know about the benchmark user's data."""
+    user: object
+    course_slug: str
+    lesson_ids: list
+    quiz_id: int
+    answers: dict  # {"q_<question id>": choice id}
+    search_term: str
+
+
+@dataclass
+class Result:
+    name: str
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    max_ms: float
+    queries_per_request: float
+    max_queries: int
+    statuses: dict
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def build_fixture(user):
+    enrollment = (Enrollment.objects.select_related("course").filter(user=user)
+                  .order_by("-total_lessons").first())
+    if enrollment is None:
+        raise ValueError(f"{user} has no enrollments to benchmark")
+    course = enrollment.course
+    lesson_ids = list(Lesson.objects.filter(module__course=course).order_by("module__index", "index")
+                      .values_list("pk", flat=True))
+    quiz = Quiz.objects.filter(lesson__module__course=course, questions__isnull=False).first()
+    answers = {}
+    if quiz is not None:
+        for question_id in Question.objects.filter(quiz=quiz).values_list("pk", flat=True):
+            choice_id = (Choice.objects.filter(question_id=question_id)
+                         .order_by("-is_correct", "pk").values_list("pk", flat=True).first())
+            if choice_id:
+                answers[f"q_{question_id}"] = choice_id
+    return Fixture(
+        user=user,
+        course_slug=course.slug,
+        lesson_ids=lesson_ids,
+        quiz_id=quiz.pk if quiz else None,
+        answers=answers,
+        search_term=(course.title.split() or ["course"])[0][:5],
+    )
+
+
+# ----- Scenarios: (client, fixture, iteration) -> response -----
+def dashboard(client, fx, i):
+    return client.get(reverse("dashboard"))
+
+
+def course_detail(client, fx, i):
+    return client.get(reverse("course_detail", args=[fx.course_slug]))
+
+
+def courses_list(client, fx, i):
+    return client.get(reverse("courses_list"))
+
+
+def courses_search(client, fx, i):
+    return client.get(reverse("courses_list"), {"q": fx.search_term})
+
+
+def api_toggle_lesson_completion(client, fx, i):
+    # Walk the lessons marking them complete, then walk them again unmarking
+    n = len(fx.lesson_ids)
+    completed = (i // n) % 2 == 0
+    return client.post(reverse("api_toggle_lesson"),
+                       {"lesson_id": fx.lesson_ids[i % n], "completed": str(completed).lower()})
+
+
+def api_submit_quiz_attempt(client, fx, i):
+    return client.post(reverse("api_quiz_attempt", args=[fx.quiz_id]), fx.answers)
+
+
+SCENARIOS = {
+    "dashboard": dashboard,
+    "course_detail": course_detail,
+    "courses_list": courses_list,
+    "courses_search": courses_search,
+    "api_toggle_lesson_completion": api_toggle_lesson_completion,
+    "api_submit_quiz_attempt": api_submit_quiz_attempt,
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def run(name, client, fixture, iterations=50, warmup=5):
+    scenario = SCENARIOS[name]
+    for i in range(warmup):
+        scenario(client, fixture, i)
+    times, queries, statuses = [], [], Counter()
+    for i in range(warmup, warmup + iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = scenario(client, fixture, i)
+            times.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+        statuses[str(response.status_code)] += 1
+    return Result(
+        name=name,
+        iterations=iterations,
+        p50_ms=round(percentile(times, 50), 3),
+        p95_ms=round(percentile(times, 95), 3),
+        mean_ms=round(statistics.fmean(times), 3),
+        max_ms=round(max(times), 3),
+        queries_per_request=round(statistics.fmean(queries), 2),
+        max_queries=max(queries),
+        statuses=dict(statuses),
+    )
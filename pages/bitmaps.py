@@ -0,0 +1,145 @@
+"""
+Bitset lesson-completion store (optional, COMPLETION_BITMAPS = True).
+
+LessonCompletion stays the source of truth; LessonProgressBitmap keeps one
+row per (user, course) whose bits are indexed by lesson position in the
+cached curriculum snapshot. Reading a learner's progress is then one row
+lookup, and testing/counting a lesson is O(1) on the bytes.
+
+Reads never write (they may run on a replica, see pages.routers): a row
+that is missing, written against an older lesson order (see `layout`) or
+invalidated by an admin edit or delete of LessonCompletion rows is computed
+from the table for that read, and rewritten by the learner's next `record`
+or by `manage.py reconcile_completion_bitmaps`, which backfills and
+verifies rows in bulk.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import LessonCompletion, LessonProgressBitmap
+
+
+class CompletionBitmap:
+    """A growable bitset over lesson positions."""
+
+    __slots__ = ("_bytes",)
+
+    def __init__(self, data=b""):
+        self._bytes = bytearray(data)
+
+    def test(self, pos: int) -> bool:
+        byte = pos >> 3
+        return byte < len(self._bytes) and bool(self._bytes[byte] & (1 << (pos & 7)))
+
+    def set(self, pos: int, value: bool = True):
+        byte = pos >> 3
+        if byte >= len(self._bytes):
+            if not value:
+                return
+            self._bytes.extend(b"\0" * (byte + 1 - len(self._bytes)))
+        if value:
+            self._bytes[byte] |= 1 << (pos & 7)
+        else:
+            self._bytes[byte] &= ~(1 << (pos & 7)) & 0xFF
+
+    def toggle(self, pos: int) -> bool:
+        value = not self.test(pos)
+        self.set(pos, value)
+        return value
+
+    def count(self) -> int:
+        return int.from_bytes(self._bytes, "little").bit_count()
+
+    def __iter__(self):
+        for byte_no, byte in enumerate(self._bytes):
+            while byte:
+                low = byte & -byte
+                yield (byte_no << 3) + low.bit_length() - 1
+                byte ^= low
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bytes).rstrip(b"\0")
+
+
+def enabled() -> bool:
+    return getattr(settings, "COMPLETION_BITMAPS", False)
+
+
+def layout_of(curriculum) -> str:
+    data = b"".join(i.to_bytes(8, "little") for i in curriculum.lesson_ids)
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def bitmap_for(lesson_ids, curriculum) -> CompletionBitmap:
+    position = {lid: pos for pos, lid in enumerate(curriculum.lesson_ids)}
+    bitmap = CompletionBitmap()
+    for lid in lesson_ids:
+        if lid in position:
+            bitmap.set(position[lid])
+    return bitmap
+
+
+def from_completions(user_id, curriculum) -> CompletionBitmap:
+    """The (user, course) bitmap computed from LessonCompletion, not stored."""
+    completed = LessonCompletion.objects.filter(
+        user_id=user_id, lesson__module__course_id=curriculum.course_id, completed=True,
+    ).values_list("lesson_id", flat=True)
+    return bitmap_for(completed, curriculum)
+
+
+def rebuild(user_id, curriculum) -> CompletionBitmap:
+    """Rewrite the (user, course) row from LessonCompletion."""
+    bitmap = from_completions(user_id, curriculum)
+    LessonProgressBitmap.objects.update_or_create(
+        user_id=user_id, course_id=curriculum.course_id,
+        defaults={"bits": bitmap.to_bytes(), "n_completed": bitmap.count(), "layout": layout_of(curriculum)},
+    )
+    return bitmap
+
+
+def load(user_id, curriculum) -> CompletionBitmap:
+    row = (
+        LessonProgressBitmap.objects
+        .filter(user_id=user_id, course_id=curriculum.course_id)
+        .values_list("bits", "layout").first()
+    )
+    if row is None or row[1] != layout_of(curriculum):
+        return from_completions(user_id, curriculum)
+    return CompletionBitmap(row[0])
+
+
+def completed_ids(user_id, curriculum) -> set:
+    lesson_ids = curriculum.lesson_ids
+    return {lesson_ids[pos] for pos in load(user_id, curriculum) if pos < len(lesson_ids)}
+
+
+def record(user_id, curriculum, changes):
+    """
+    Apply {lesson_id: completed} to the row after LessonCompletion was written.
+    Lessons missing from the snapshot mean it is stale: rebuild instead.
+    """
+    position = {lid: pos for pos, lid in enumerate(curriculum.lesson_ids)}
+    if any(lid not in position for lid in changes):
+        return rebuild(user_id, curriculum)
+    layout = layout_of(curriculum)
+    with transaction.atomic(savepoint=False):
+        row = (
+            LessonProgressBitmap.objects.select_for_update()
+            .filter(user_id=user_id, course_id=curriculum.course_id, layout=layout).first()
+        )
+        if row is None:
+            return rebuild(user_id, curriculum)
+        bitmap = CompletionBitmap(row.bits)
+        for lid, completed in changes.items():
+            bitmap.set(position[lid], completed)
+        row.bits = bitmap.to_bytes()
+        row.n_completed = bitmap.count()
+        row.save(update_fields=["bits", "n_completed", "updated_at"])
+    return bitmap
+
+
+def invalidate(user_id, course_id):
+    """Drop a row so reads fall back to LessonCompletion until it is rebuilt."""
+    LessonProgressBitmap.objects.filter(user_id=user_id, course_id=course_id).delete()
@@ -0,0 +1,229 @@
+"""
+Content-addressed storage for uploaded files.
+
+ContentAddressedStorage ignores the upload's name: it hashes the content
+while copying it to a temp file and stores it once, as
+blobs/<namespace>/<aa>/<sha256><ext> under MEDIA_ROOT. Identical uploads
+share one file and names never collide. The extension is kept so the file
+still gets the right Content-Type.
+
+Every blob has a Blob row. Its refcount is kept in step with the fields in
+REFERENCES by the model signals. `manage.py gc_blobs` recounts and
+deletes blobs nobody references, and `manage.py rehash_media` moves files
+uploaded before this storage existed into it.
+
+An upload can reuse a blob at refcount 0 before its row is saved and
+retain() runs, so every upload and reference change bumps the row's
+updated_at, and gc only deletes rows left alone for its grace period,
+re-checking that in the DELETE itself. Uploads touch the row before
+looking for the file, so one that races a deletion writes the file again.
+
+Namespaces keep gated lesson resources (served by pages.downloads) apart
+from public avatars. A proxy can serve blobs/avatars/ directly with
+immutable far-future caching, since a blob's name changes with its content,
+while blobs/resources/ stays internal.
+"""
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F, FileField
+from django.utils import timezone
+
+PREFIX = "blobs/"
+# model label -> fields holding blob names: FileFields, or JSONFields with
+# names anywhere inside (UserProfile.avatar_variants, see pages.avatars)
+REFERENCES = {"pages.Resource": ("file",), "pages.UserProfile": ("avatar", "avatar_variants")}
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, namespace, **kwargs):
+        super().__init__(**kwargs)
+        self.namespace = namespace
+
+    def get_available_name(self, name, max_length=None):
+        return name  # the content picks the name in _save
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()[:16]
+        tmp_dir = self.path(PREFIX + "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            digest, size = hashlib.sha256(), 0
+            with os.fdopen(fd, "wb") as out:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            sha = digest.hexdigest()
+            name = f"{PREFIX}{self.namespace}/{sha[:2]}/{sha}{ext}"
+            # Before the file check: see the module docstring
+            Blob = apps.get_model("pages", "Blob")
+            Blob.objects.update_or_create(
+                name=name, defaults={"updated_at": timezone.now()}, create_defaults={"sha256": sha, "size": size},
+            )
+            path = self.path(name)
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return name
+
+
+_storages = {}
+
+
+def _storage(namespace):
+    if namespace not in _storages:
+        _storages[namespace] = ContentAddressedStorage(namespace)
+    return _storages[namespace]
+
+
+# Callables, so migrations refer to them rather than serialising the storage
+def resource_storage():
+    return _storage("resources")
+
+
+def avatar_storage():
+    return _storage("avatars")
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(PREFIX)
+
+
+def names_in(value):
+    """Blob names in a field value: a FieldFile, a name, or JSON holding names."""
+    if isinstance(value, str):
+        return {value} if is_blob(value) else set()
+    if isinstance(value, dict):
+        return names_in(list(value.values()))
+    if isinstance(value, (list, tuple)):
+        return set().union(*map(names_in, value))
+    return names_in(getattr(value, "name", None) or "")
+
+
+def sha256_of(name):
+    """The content hash in a blob name ("" for other names)."""
+    return os.path.splitext(os.path.basename(name))[0] if is_blob(name) else ""
+
+
+# ----- Reference counts -----
+def retain(name):
+    if not is_blob(name):
+        return
+    Blob = apps.get_model("pages", "Blob")
+    if not Blob.objects.filter(name=name).update(refcount=F("refcount") + 1, updated_at=timezone.now()):
+        Blob.objects.create(name=name, sha256=sha256_of(name), size=_size(name), refcount=1)
+
+
+def release(name):
+    if is_blob(name):
+        Blob = apps.get_model("pages", "Blob")
+        Blob.objects.filter(name=name, refcount__gt=0).update(refcount=F("refcount") - 1, updated_at=timezone.now())
+
+
+def _size(name):
+    try:
+        return os.path.getsize(resource_storage().path(name))
+    except OSError:
+        return 0
+
+
+def file_fields():
+    """(model, field name) for the FileFields in REFERENCES."""
+    for label, fields in REFERENCES.items():
+        model = apps.get_model(label)
+        for field in fields:
+            if isinstance(model._meta.get_field(field), FileField):
+                yield model, field
+
+
+def references():
+    """
+    Counter of blob name -> number of rows referencing it. A row counts once
+    per blob however many of its fields hold the name, as the signals do.
+    """
+    counts = Counter()
+    for label, fields in REFERENCES.items():
+        model = apps.get_model(label)
+        for values in model.objects.values_list(*fields).iterator():
+            counts.update(names_in(list(values)))
+    return counts
+
+
+def recount():
+    """Reset every refcount from the REFERENCES fields; returns how many changed."""
+    Blob = apps.get_model("pages", "Blob")
+    counts = references()
+    changed = []
+    for blob in Blob.objects.iterator():
+        n = counts.pop(blob.name, 0)
+        if blob.refcount != n:
+            blob.refcount = n
+            changed.append(blob)
+    Blob.objects.bulk_update(changed, ["refcount"], batch_size=500)
+    # Referenced files that never got a row
+    Blob.objects.bulk_create(
+        [Blob(name=name, sha256=sha256_of(name), size=_size(name), refcount=n) for name, n in counts.items()],
+        ignore_conflicts=True,
+    )
+    return len(changed) + len(counts)
+
+
+def collect(grace=timedelta(hours=24), dry_run=False):
+    """
+    Delete unreferenced blobs untouched for `grace` (newer ones may belong to
+    an upload whose row isn't saved yet), stray files under blobs/ that have
+    no Blob row, and abandoned temp files. Returns (files, bytes).
+    """
+    Blob = apps.get_model("pages", "Blob")
+    storage = resource_storage()
+    cutoff = timezone.now() - grace
+    n_files = n_bytes = 0
+
+    for blob in Blob.objects.filter(refcount=0, updated_at__lt=cutoff).iterator():
+        if not dry_run:
+            with transaction.atomic():
+                # The row is locked from here to commit, so an upload of the
+                # same content waits, then finds no file and writes it again
+                if not Blob.objects.filter(pk=blob.pk, refcount=0, updated_at__lt=cutoff).delete()[0]:
+                    continue  # claimed since the scan
+                storage.delete(blob.name)
+        n_files += 1
+        n_bytes += blob.size
+
+    root = storage.path(PREFIX)
+    known = None
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > cutoff.timestamp():
+                continue
+            name = os.path.relpath(path, storage.location).replace(os.sep, "/")
+            if not name.startswith(PREFIX + "tmp/"):
+                if known is None:
+                    known = set(Blob.objects.values_list("name", flat=True))
+                if name in known:
+                    continue
+            n_files += 1
+            n_bytes += stat.st_size
+            if not dry_run:
+                os.unlink(path)
+    return n_files, n_bytes
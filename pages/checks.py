@@ -0,0 +1,26 @@
+"""System checks for settings the pages app depends on."""
+from django.conf import settings
+from django.core.checks import Error, register
+
+from . import versions
+
+# Backends whose entries are only visible to the process that wrote them
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def check_content_version_cache(app_configs, **kwargs):
+    alias = versions.alias()
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"CONTENT_VERSION_CACHE ({alias!r}) uses the process-local {backend.rsplit('.', 1)[-1]}.",
+            hint="Content versions must be shared by all workers, or an edit leaves the others "
+                 "serving stale answer keys, curricula and catalog pages. Use a file-based, "
+                 "Redis or Memcached cache.",
+            id="pages.E001",
+        )]
+    return []
@@ -0,0 +1,90 @@
+"""
+Writing lesson completions in bulk.
+
+apply() validates every lesson id in one query, reads the learner's current
+state in one more, and upserts only the rows that actually change with a
+single bulk_create(update_conflicts=True), adjusting progress counters (and
+bitmaps, when enabled) per course in the same transaction.
+
+The state is read inside that transaction with the learner's enrollments
+and completion rows locked (SQLite takes its write lock at BEGIN), so two
+concurrent toggles of one lesson can't both apply the same delta.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import bitmaps, progress
+from .curriculum import get_curriculum
+from .models import Enrollment, Lesson, LessonCompletion
+
+MAX_ITEMS = 500
+
+
+def apply(user_id, changes):
+    """
+    changes: {lesson_id: completed (bool)}
+    Returns {lesson_id: {"ok", "completed", "course_id"} or {"ok": False, "error"}}.
+    """
+    course_of = dict(
+        Lesson.objects.filter(id__in=list(changes)).values_list("id", "module__course_id")
+    )
+    with transaction.atomic():
+        return _apply(user_id, changes, course_of)
+
+
+def _apply(user_id, changes, course_of):
+    # Enrollment locks cover lessons without a completion row yet
+    list(Enrollment.objects.select_for_update()
+         .filter(user_id=user_id, course_id__in=set(course_of.values())).values_list("pk"))
+    current = dict(
+        LessonCompletion.objects.select_for_update()
+        .filter(user_id=user_id, lesson_id__in=list(course_of))
+        .values_list("lesson_id", "completed")
+    )
+
+    now = timezone.now()
+    results, rows, deltas, per_course = {}, [], {}, {}
+    for lid, completed in changes.items():
+        if lid not in course_of:
+            results[lid] = {"ok": False, "error": "not_found"}
+            continue
+        results[lid] = {"ok": True, "completed": completed, "course_id": course_of[lid]}
+        was = current.get(lid)
+        if was == completed:
+            continue  # unchanged: keep the original completed_at
+        rows.append(LessonCompletion(
+            user_id=user_id, lesson_id=lid, completed=completed,
+            completed_at=now if completed else None,
+        ))
+        if bool(was) != completed:
+            course_id = course_of[lid]
+            deltas[course_id] = deltas.get(course_id, 0) + (1 if completed else -1)
+            per_course.setdefault(course_id, {})[lid] = completed
+
+    if rows:
+        LessonCompletion.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["user", "lesson"],
+            update_fields=["completed", "completed_at"],
+        )
+        for course_id, delta in deltas.items():
+            progress.completion_changed(user_id, course_id, delta)
+        if bitmaps.enabled():
+            for course_id, lesson_changes in per_course.items():
+                bitmaps.record(user_id, get_curriculum(course_id), lesson_changes)
+    return results
+
+
+def course_progress(user_id, course_ids):
+    """{course_id: {"slug", "completed_lessons", "total_lessons", "progress"}}"""
+    return {
+        e.course_id: {
+            "slug": e.course.slug,
+            "completed_lessons": e.completed_lessons,
+            "total_lessons": e.total_lessons,
+            "progress": e.progress,
+        }
+        for e in Enrollment.objects.select_related("course")
+        .filter(user_id=user_id, course_id__in=list(course_ids))
+    }
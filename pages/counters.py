@@ -0,0 +1,79 @@
+"""
+Stored curriculum counters on Course (n_modules, n_lessons).
+
+Signal handlers call into here whenever a Module or Lesson is created, moved
+to another course, or deleted. Module.save()/Lesson.save() run inside
+transaction.atomic() and deletes run inside the collector's transaction, so a
+counter change commits or rolls back together with the row that caused it.
+Course-level lesson deltas are forwarded to pages.progress so enrollment
+totals move in step.
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import progress
+from .db import shift
+from .models import Course, Enrollment, Lesson, LessonCompletion, Module
+
+
+def modules_changed(course_id, delta):
+    if delta:
+        Course.objects.filter(pk=course_id).update(n_modules=shift("n_modules", delta))
+
+
+def lessons_changed(course_id, delta):
+    if delta:
+        Course.objects.filter(pk=course_id).update(n_lessons=shift("n_lessons", delta))
+        progress.lessons_changed(course_id, delta)
+
+
+def lesson_moved(lesson, old_course_id, new_course_id):
+    """A lesson was re-parented to a module of another course."""
+    lessons_changed(old_course_id, -1)
+    lessons_changed(new_course_id, +1)
+    learners = LessonCompletion.objects.filter(lesson=lesson, completed=True).values("user_id")
+    Enrollment.objects.filter(course_id=old_course_id, user_id__in=learners).update(
+        completed_lessons=shift("completed_lessons", -1)
+    )
+    Enrollment.objects.filter(course_id=new_course_id, user_id__in=learners).update(
+        completed_lessons=shift("completed_lessons", +1)
+    )
+
+
+def module_moved(module, old_course_id, new_course_id):
+    """A module (with all its lessons) was re-parented to another course."""
+    n = module.lessons.count()
+    modules_changed(old_course_id, -1)
+    modules_changed(new_course_id, +1)
+    for course_id, delta in ((old_course_id, -n), (new_course_id, +n)):
+        Course.objects.filter(pk=course_id).update(n_lessons=shift("n_lessons", delta))
+    # Per-learner completed counts shift by different amounts: rebuild them
+    progress.recompute(Enrollment.objects.filter(course_id__in=[old_course_id, new_course_id]))
+
+
+def _subquery(qs, group_by):
+    return Coalesce(
+        Subquery(
+            qs.order_by().values(group_by).annotate(n=Count("id")).values("n"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def counted_courses():
+    """Courses annotated with their true module/lesson counts."""
+    return Course.objects.annotate(
+        true_modules=_subquery(Module.objects.filter(course_id=OuterRef("pk")), "course_id"),
+        true_lessons=_subquery(Lesson.objects.filter(module__course_id=OuterRef("pk")), "module__course_id"),
+    )
+
+
+def recount(courses=None):
+    """Rebuild n_modules/n_lessons for the given Course queryset (default: all)."""
+    if courses is None:
+        courses = Course.objects.all()
+    return courses.update(
+        n_modules=_subquery(Module.objects.filter(course_id=OuterRef("pk")), "course_id"),
+        n_lessons=_subquery(Lesson.objects.filter(module__course_id=OuterRef("pk")), "module__course_id"),
+    )
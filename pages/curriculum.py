@@ -0,0 +1,130 @@
+"""
+Cached curriculum snapshots.
+
+A snapshot is the immutable Module -> Lesson -> Resource tree of one course,
+built in three queries and stored in Django's cache under the course's
+"curriculum" content version. Any Module/Lesson/Resource edit bumps that
+version (see signals), so course pages only pay for their per-user queries.
+The snapshot cache may be per process: versions are shared by all workers
+(pages.versions), so every worker moves to the new key after an edit.
+"""
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+
+from .downloads import resource_url
+from .models import Lesson, Module, Resource
+from .versions import get_version
+
+
+@dataclass(frozen=True)
+class ResourceEntry:
+    id: int
+    name: str
+    url: str
+
+
+@dataclass(frozen=True)
+class LessonEntry:
+    id: int
+    index: int
+    title: str
+    summary: str
+    youtube_url: str
+    resources: tuple
+
+
+@dataclass(frozen=True)
+class ModuleEntry:
+    id: int
+    index: int
+    title: str
+    intro: str
+    lessons: tuple
+
+    @property
+    def anchor(self):
+        return f"module{self.index}"
+
+    @property
+    def lesson_count(self):
+        return len(self.lessons)
+
+
+@dataclass(frozen=True)
+class Curriculum:
+    course_id: int
+    version: int
+    modules: tuple
+    # Every lesson id in display order (module index, lesson index)
+    lesson_ids: tuple
+    # [{"anchor": "module1", "lesson_ids": [...]}, ...] for the player's JS
+    module_lessons_json: str
+
+    @property
+    def n_modules(self):
+        return len(self.modules)
+
+    @property
+    def n_lessons(self):
+        return len(self.lesson_ids)
+
+
+def _cache():
+    return caches[getattr(settings, "CURRICULUM_CACHE_ALIAS", "default")]
+
+
+def build_curriculum(course_id: int, version: int = 0) -> Curriculum:
+    # Always read the primary: a snapshot built from a lagging replica would
+    # be cached under the new version and outlive the lag.
+    db = router.db_for_write(Module)
+    modules = list(
+        Module.objects.using(db).filter(course_id=course_id)
+        .order_by("index", "id")
+        .values_list("id", "index", "title", "intro")
+    )
+    lessons = list(
+        Lesson.objects.using(db).filter(module__course_id=course_id)
+        .order_by("index", "id")
+        .values_list("id", "module_id", "index", "title", "summary", "youtube_url")
+    )
+    resources = {}
+    for r in Resource.objects.using(db).filter(lesson__module__course_id=course_id).order_by("id"):
+        # Enrollment-gated view rather than the (public) storage URL
+        url = resource_url(r) if r.file else ""
+        resources.setdefault(r.lesson_id, []).append(ResourceEntry(r.id, r.name, url))
+
+    by_module = {}
+    for lid, module_id, index, title, summary, youtube_url in lessons:
+        by_module.setdefault(module_id, []).append(LessonEntry(
+            id=lid, index=index, title=title, summary=summary or "",
+            youtube_url=youtube_url or "", resources=tuple(resources.get(lid, ())),
+        ))
+    entries = tuple(
+        ModuleEntry(id=mid, index=index, title=title, intro=intro or "",
+                    lessons=tuple(by_module.get(mid, ())))
+        for mid, index, title, intro in modules
+    )
+    return Curriculum(
+        course_id=course_id,
+        version=version,
+        modules=entries,
+        lesson_ids=tuple(l.id for m in entries for l in m.lessons),
+        module_lessons_json=json.dumps([
+            {"anchor": m.anchor, "lesson_ids": [l.id for l in m.lessons]} for m in entries
+        ]),
+    )
+
+
+def get_curriculum(course_id: int) -> Curriculum:
+    version = get_version("curriculum", course_id)
+    key = f"curriculum:{course_id}:{version}"
+    cache = _cache()
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_curriculum(course_id, version)
+        cache.set(key, snapshot, timeout=getattr(settings, "CURRICULUM_CACHE_TIMEOUT", 24 * 3600))
+    return snapshot
@@ -0,0 +1,32 @@
+"""
+Connection tuning for SQLite, and query expressions shared by the
+denormalized counters (pages.counters, pages.progress).
+
+connection_created runs settings.SQLITE_PRAGMAS on every new SQLite
+connection: WAL lets readers proceed while one writer commits, busy_timeout
+makes writers wait for the lock instead of failing with "database is
+locked", and synchronous=NORMAL/mmap_size cut fsync and read-syscall costs.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.dispatch import receiver
+
+
+def shift(field, delta):
+    """`field` + delta for an UPDATE, floored at zero."""
+    # PositiveIntegerField: never let a drifted counter go below zero
+    return Greatest(F(field) + delta, Value(0))
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    if not pragmas:
+        return
+    with connection.cursor() as cur:
+        for name, value in pragmas.items():
+            cur.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,170 @@
+"""
+Protected file delivery for lesson resources.
+
+views.resource_download checks the enrollment and hands the file over here.
+With settings.RESOURCE_SENDFILE set, the response carries only headers and
+the front proxy sends the bytes (and handles Range/conditional requests):
+
+  "x-accel-redirect" (nginx): X-Accel-Redirect: RESOURCE_ACCEL_PREFIX + name,
+      for an `internal` location aliased to MEDIA_ROOT;
+  "x-sendfile" (Apache mod_xsendfile, lighttpd): X-Sendfile: absolute path.
+
+Without a proxy, FileResponse streams the file (whole files go through
+wsgi.file_wrapper, i.e. sendfile() on most servers), conditional requests
+get 304/412 and a single "Range: bytes=" gets a 206. Multi-range requests get
+the whole file, which RFC 9110 allows. ETags use nginx's mtime-size format,
+so switching between the two doesn't invalidate browser caches. Files in
+the content-addressed storage (pages.blobstore) use their sha256 instead,
+and resource_url() puts it in the URL so those responses can be immutable.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+from . import blobstore
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+MAX_AGE = 3600
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+VERSION_LENGTH = 16  # hex digits of the sha256 in ?v=
+
+
+class _RangeFile:
+    """`length` bytes of `file` from `start`, read like a file by FileResponse."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        data = self.file.read(self.remaining if size < 0 else min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def etag_for(stat):
+    return quote_etag(f"{int(stat.st_mtime):x}-{stat.st_size:x}")
+
+
+def parse_range(header, size):
+    """
+    (first, last) byte positions for a single satisfiable range, None to
+    send the whole file (no, malformed or multiple ranges), False if the
+    range can't be satisfied.
+    """
+    match = _RANGE.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        first = int(first)
+        if last and int(last) < first:
+            return None
+        if first >= size:
+            return False
+        return first, min(int(last), size - 1) if last else size - 1
+    suffix = int(last)
+    if suffix == 0 or size == 0:
+        return False
+    return max(0, size - suffix), size - 1
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    return not if_range or if_range in (etag, http_date(last_modified))
+
+
+def serve_file(request, path, name, filename, etag=None, immutable=False):
+    """
+    path: absolute path; name: path relative to MEDIA_ROOT (for
+    X-Accel-Redirect); filename: offered in Content-Disposition; etag:
+    overrides the mtime-size one; immutable: the URL is versioned by the
+    content, so browsers may keep it for a year without revalidating.
+    """
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    mode = getattr(settings, "RESOURCE_SENDFILE", None)
+    if mode:
+        response = HttpResponse(content_type=content_type)
+        if mode == "x-accel-redirect":
+            response["X-Accel-Redirect"] = settings.RESOURCE_ACCEL_PREFIX.rstrip("/") + "/" + quote(name)
+        elif mode == "x-sendfile":
+            response["X-Sendfile"] = path
+        else:
+            raise ImproperlyConfigured(f"Unknown RESOURCE_SENDFILE {mode!r}")
+        return _finish(response, filename, immutable)
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("File not found")
+    etag = etag or etag_for(stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        byte_range = None
+        if _if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers.get("Range"), stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+        elif byte_range:
+            first, last = byte_range
+            response = FileResponse(_RangeFile(open(path, "rb"), first, last - first + 1),
+                                    status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {first}-{last}/{stat.st_size}"
+            response["Content-Length"] = last - first + 1
+        else:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    return _finish(response, filename, immutable)
+
+
+def _finish(response, filename, immutable=False):
+    # Inline so browsers' PDF viewers can fetch pages with Range requests
+    response["Content-Disposition"] = content_disposition_header(False, filename)
+    if immutable:
+        patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, private=True, max_age=MAX_AGE)
+    return response
+
+
+def resource_url(resource):
+    """The download URL, versioned by the content hash for blob-stored files."""
+    url = reverse("resource_download", args=[resource.id])
+    sha = blobstore.sha256_of(resource.file.name)
+    return f"{url}?v={sha[:VERSION_LENGTH]}" if sha else url
+
+
+def serve_resource(request, resource):
+    try:
+        path = resource.file.path
+    except NotImplementedError:  # remote storage: its URL does the serving
+        return redirect(resource.file.url)
+    name = resource.file.name
+    sha = blobstore.sha256_of(name)
+    ext = os.path.splitext(name)[1]
+    # Blob names are hashes; offer the resource's display name instead
+    filename = f"{resource.name}{ext}" if sha and resource.name else os.path.basename(name)
+    return serve_file(
+        request, path, name, filename,
+        etag=quote_etag(sha) if sha else None,
+        immutable=bool(sha) and request.GET.get("v") == sha[:VERSION_LENGTH],
+    )
@@ -0,0 +1,245 @@
+"""
+Bulk enrollment import from CSV (email, course[, status, first_name, last_name]).
+
+Rows are processed in batches: users and courses are resolved with one
+`in` lookup each (users by lowercased username or email, so "Ann@x.org"
+finds the account "ann@x.org"), missing users are optionally created (username = email,
+unusable password, like SignupForm's username=email pattern), and the
+enrollments go in with one bulk_create(ignore_conflicts=True) against the
+unique_enrollment constraint. bulk_create skips signals, so profiles and
+progress counters are filled in here instead.
+
+Each batch commits on its own, so a long import keeps what it has done. A
+batch that fails in the database is retried one row at a time, and only
+the rows that still fail are lost (and reported, with their line numbers).
+
+Used by `manage.py import_enrollments` and the Enrollment admin upload page.
+"""
+import csv
+import logging
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from . import progress
+from .models import Course, Enrollment, UserProfile
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 1000  # kept in the report; the rest are only counted
+
+COLUMN_ALIASES = {
+    "email": ("email", "user", "user_email"),
+    "course": ("course", "course_slug", "slug"),
+    "status": ("status",),
+    "first_name": ("first_name",),
+    "last_name": ("last_name",),
+}
+STATUSES = {value for value, _ in Enrollment.STATUS_CHOICES}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    enrolled: int = 0
+    already_enrolled: int = 0
+    duplicates: int = 0
+    users_created: int = 0
+    n_errors: int = 0
+    errors: list = field(default_factory=list)  # [(line, message)]
+    seconds: float = 0.0
+
+    @property
+    def rate(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def error(self, line, message):
+        self.n_errors += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+    def merge(self, other):
+        """Add the counts and errors of a committed batch's report."""
+        for name in ("rows", "enrolled", "already_enrolled", "duplicates", "users_created"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.n_errors += other.n_errors - len(other.errors)
+        for line, message in other.errors:
+            self.error(line, message)
+
+    def summary(self):
+        return (
+            f"{self.rows} row(s) in {self.seconds:.2f}s ({self.rate:.0f} rows/s): "
+            f"{self.enrolled} enrolled, {self.already_enrolled} already enrolled, "
+            f"{self.duplicates} duplicate(s), {self.users_created} user(s) created, "
+            f"{self.n_errors} error(s)."
+        )
+
+
+def read_rows(text_file):
+    """(line number, {column: value}) for every data row of the CSV."""
+    reader = csv.DictReader(text_file)
+    if not reader.fieldnames:
+        raise ValueError("The CSV file is empty.")
+    present = {name.strip().lower(): name for name in reader.fieldnames if name}
+    columns = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        columns[column] = next((present[a] for a in aliases if a in present), None)
+    missing = [c for c in ("email", "course") if columns[c] is None]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}.")
+    for row in reader:
+        yield reader.line_num, {
+            column: (row.get(source) or "").strip()
+            for column, source in columns.items() if source is not None
+        }
+
+
+def import_enrollments(rows, create_users=False, batch_size=BATCH_SIZE, status=Enrollment.STATUS_ACTIVE):
+    report = ImportReport()
+    started = time.perf_counter()
+    courses = {}  # slug -> (id, n_lessons), or None when unknown
+    seen = set()  # (user_id, course_id) already handled in this import
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        try:
+            _commit_batch(batch, report, courses, seen, create_users, status)
+        except DatabaseError:
+            # One bad row must not cost its neighbours: retry them singly
+            logger.warning("Enrollment import batch of %d failed; retrying rows singly", len(batch), exc_info=True)
+            for line, row in batch:
+                try:
+                    _commit_batch([(line, row)], report, courses, seen, create_users, status)
+                except DatabaseError as exc:
+                    report.rows += 1
+                    report.error(line, f"not imported: {exc}")
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def _commit_batch(batch, report, courses, seen, create_users, status):
+    """Import `batch` in its own transaction; `report` and `seen` only change if it commits."""
+    batch_report, batch_seen = ImportReport(), set(seen)
+    with transaction.atomic():
+        _import_batch(batch, batch_report, courses, batch_seen, create_users, status)
+    report.merge(batch_report)
+    seen.update(batch_seen)
+
+
+def _import_batch(batch, report, courses, seen, create_users, default_status):
+    User = get_user_model()
+    report.rows += len(batch)
+
+    # Validate and normalise
+    valid = []
+    for line, row in batch:
+        email = row["email"].lower()
+        slug = row["course"]
+        row_status = row.get("status") or default_status
+        try:
+            validate_email(email)
+        except ValidationError:
+            report.error(line, f"invalid email {row['email']!r}")
+            continue
+        if not slug:
+            report.error(line, "missing course")
+            continue
+        if row_status not in STATUSES:
+            report.error(line, f"unknown status {row_status!r}")
+            continue
+        valid.append((line, email, slug, row_status, row))
+
+    # Courses (cached across batches)
+    unknown = {slug for _, _, slug, _, _ in valid if slug not in courses}
+    if unknown:
+        for slug in unknown:
+            courses[slug] = None
+        for pk, slug, n_lessons in (
+            Course.objects.filter(slug__in=unknown, is_active=True).values_list("pk", "slug", "n_lessons")
+        ):
+            courses[slug] = (pk, n_lessons)
+
+    # Users: username=email for accounts made by signup, email for older ones
+    emails = {email for _, email, _, _, _ in valid}
+    user_ids = {}
+    for pk, username, email in (
+        User.objects.annotate(username_lower=Lower("username"), email_lower=Lower("email"))
+        .filter(Q(username_lower__in=emails) | Q(email_lower__in=emails))
+        .order_by("pk")
+        .values_list("pk", "username_lower", "email_lower")
+    ):
+        if username in emails:
+            user_ids[username] = pk
+        else:
+            user_ids.setdefault(email, pk)
+    existing_users = set(user_ids.values())
+
+    if create_users:
+        new = {}
+        for _, email, slug, _, row in valid:
+            if email not in user_ids and email not in new and courses.get(slug):
+                user = User(username=email, email=email,
+                            first_name=row.get("first_name", "")[:150], last_name=row.get("last_name", "")[:150])
+                user.set_unusable_password()
+                new[email] = user
+        if new:
+            User.objects.bulk_create(new.values(), ignore_conflicts=True)
+            created = dict(
+                User.objects.annotate(username_lower=Lower("username"))
+                .filter(username_lower__in=list(new)).values_list("username_lower", "pk")
+            )
+            UserProfile.objects.bulk_create(
+                [UserProfile(user_id=pk) for pk in created.values()], ignore_conflicts=True,
+            )
+            user_ids.update(created)
+            report.users_created += len(created)
+
+    # Enrollments
+    pairs = {}
+    for line, email, slug, row_status, _ in valid:
+        course = courses.get(slug)
+        if course is None:
+            report.error(line, f"unknown or inactive course {slug!r}")
+            continue
+        if email not in user_ids:
+            report.error(line, f"no user with email {email!r}")
+            continue
+        key = (user_ids[email], course[0])
+        if key in seen or key in pairs:
+            report.duplicates += 1
+            continue
+        pairs[key] = (row_status, course[1])
+    if not pairs:
+        return
+
+    batch_users = {uid for uid, _ in pairs}
+    batch_courses = {cid for _, cid in pairs}
+    enrolled = set(
+        Enrollment.objects.filter(user_id__in=batch_users, course_id__in=batch_courses)
+        .values_list("user_id", "course_id")
+    )
+    new_rows = [
+        Enrollment(user_id=uid, course_id=cid, status=row_status, total_lessons=n_lessons)
+        for (uid, cid), (row_status, n_lessons) in pairs.items() if (uid, cid) not in enrolled
+    ]
+    Enrollment.objects.bulk_create(new_rows, ignore_conflicts=True)
+    seen.update(pairs)
+    report.enrolled += len(new_rows)
+    report.already_enrolled += len(pairs) - len(new_rows)
+
+    # Only learners who existed before can have completions to count
+    returning = {e.user_id for e in new_rows} & existing_users
+    if returning:
+        progress.recompute(Enrollment.objects.filter(
+            user_id__in=returning, course_id__in={e.course_id for e in new_rows},
+        ))
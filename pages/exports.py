@@ -0,0 +1,235 @@
+"""
+Streaming exports of learner activity (quiz attempts, lesson completions).
+
+rows() walks one ordered query with .iterator(), and the encoders turn rows
+into CSV or JSONL byte blocks (optionally gzipped on the fly), so memory use
+doesn't depend on table size. Rows come out in id order: pass the last id
+you received as `after_id` to resume an interrupted dump.
+
+Under ASGI, StreamingHttpResponse would drain a sync iterator into memory
+before sending a byte, so async servers get astream() instead: it reads
+keyset-paginated blocks (id > the last one sent), each query and its
+encoding in a worker thread, and yields as it goes.
+
+Used by `manage.py export_activity` and the staff-only export view.
+"""
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import LessonCompletion, QuizAttempt
+
+CHUNK_SIZE = 2000
+# Encoded output is yielded in blocks of roughly this many bytes
+BLOCK_SIZE = 64 * 1024
+# Spreadsheets run cells starting with these as formulas (usernames are
+# user-supplied): CSV cells get a leading ' so they open as text
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+EXPORTS = {
+    "quiz_attempts": {
+        "model": QuizAttempt,
+        "date_field": "created_at",
+        "course_field": "quiz__lesson__module__course__slug",
+        "columns": (
+            ("id", "id"),
+            ("user_id", "user_id"),
+            ("username", "user__username"),
+            ("course", "quiz__lesson__module__course__slug"),
+            ("lesson_id", "quiz__lesson_id"),
+            ("quiz_id", "quiz_id"),
+            ("score", "score"),
+            ("total", "total"),
+            ("passed", "passed"),
+            ("created_at", "created_at"),
+            ("raw_answers", "raw_answers"),
+        ),
+    },
+    "completions": {
+        "model": LessonCompletion,
+        "date_field": "completed_at",
+        "course_field": "lesson__module__course__slug",
+        "columns": (
+            ("id", "id"),
+            ("user_id", "user_id"),
+            ("username", "user__username"),
+            ("course", "lesson__module__course__slug"),
+            ("module_id", "lesson__module_id"),
+            ("lesson_id", "lesson_id"),
+            ("completed", "completed"),
+            ("completed_at", "completed_at"),
+        ),
+    },
+}
+FORMATS = ("csv", "jsonl")
+
+
+def parse_bound(value, end=False):
+    """
+    A date or datetime string as an aware datetime (None for empty input).
+    Dates cover the whole day: as an upper bound they mean "before the next day".
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Not a date or datetime: {value!r}")
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def header(kind):
+    return [name for name, _ in EXPORTS[kind]["columns"]]
+
+
+def _queryset(kind, since=None, until=None, courses=(), after_id=None):
+    spec = EXPORTS[kind]
+    qs = spec["model"].objects.all()
+    if since is not None:
+        qs = qs.filter(**{f"{spec['date_field']}__gte": since})
+    if until is not None:
+        qs = qs.filter(**{f"{spec['date_field']}__lt": until})
+    if courses:
+        qs = qs.filter(**{f"{spec['course_field']}__in": list(courses)})
+    if after_id is not None:
+        qs = qs.filter(id__gt=after_id)
+    fields = [path for _, path in spec["columns"]]
+    return qs.order_by("id").values_list(*fields)
+
+
+def rows(kind, chunk_size=CHUNK_SIZE, **filters):
+    """Value tuples (in header() order) ordered by id."""
+    return _queryset(kind, **filters).iterator(chunk_size=chunk_size)
+
+
+# ----- Encoders: rows in, byte blocks out -----
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _Line:
+    """File-like sink for csv.writer that hands back what was written."""
+
+    def write(self, value):
+        return value
+
+
+def _blocks(lines):
+    buf, size = [], 0
+    for line in lines:
+        buf.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+
+def _csv_cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return _value(value)
+
+
+def _csv_lines(columns, data, header=True):
+    writer = csv.writer(_Line())
+    if header:
+        yield writer.writerow(columns).encode()
+    for row in data:
+        yield writer.writerow([_csv_cell(v) for v in row]).encode()
+
+
+def _jsonl_lines(columns, data, header=True):
+    # JSONL has no header line
+    for row in data:
+        record = {name: _value(v) for name, v in zip(columns, row)}
+        yield (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+
+_LINES = {"csv": _csv_lines, "jsonl": _jsonl_lines}
+
+
+def encode_csv(columns, data):
+    return _blocks(_csv_lines(columns, data))
+
+
+def encode_jsonl(columns, data):
+    return _blocks(_jsonl_lines(columns, data))
+
+
+def _compressor(level=6):
+    return zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+
+def gzipped(blocks, level=6):
+    compressor = _compressor(level)
+    for block in blocks:
+        out = compressor.compress(block)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _check(kind, fmt):
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export: {kind!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt!r}")
+
+
+def stream(kind, fmt="csv", gzip=False, **filters):
+    """The whole export as an iterator of bytes."""
+    _check(kind, fmt)
+    encode = encode_csv if fmt == "csv" else encode_jsonl
+    blocks = encode(header(kind), rows(kind, **filters))
+    return gzipped(blocks) if gzip else blocks
+
+
+def _encoded_page(kind, fmt, compressor, first, after_id, limit, filters):
+    """(bytes, last id) for up to `limit` rows after `after_id`; last id is None at the end."""
+    batch = list(_queryset(kind, after_id=after_id, **filters)[:limit])
+    data = b"".join(_LINES[fmt](header(kind), batch, header=first))
+    if compressor is not None:
+        data = compressor.compress(data)
+    return data, (batch[-1][0] if len(batch) == limit else None)
+
+
+_aencoded_page = sync_to_async(_encoded_page)
+
+
+def astream(kind, fmt="csv", gzip=False, after_id=None, chunk_size=CHUNK_SIZE, **filters):
+    """stream() as an async iterator, for ASGI servers."""
+    _check(kind, fmt)  # raise now, not on first iteration
+
+    async def blocks():
+        compressor = _compressor() if gzip else None
+        first, last_id = True, after_id
+        while True:
+            data, last_id = await _aencoded_page(kind, fmt, compressor, first, last_id, chunk_size, filters)
+            first = False
+            if data:
+                yield data
+            if last_id is None:
+                break
+        if compressor is not None:
+            yield compressor.flush()
+
+    return blocks()
+
+
+def filename(kind, fmt, gzip=False):
+    return f"{kind}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}" + (".gz" if gzip else "")
@@ -0,0 +1,183 @@
+"""
+In-memory quiz grading.
+
+An answer key is loaded for a quiz in a single query and kept as an immutable
+structure (question id -> frozenset of correct choice ids). Submissions are
+then graded without touching the database.
+
+Keys are cached per process (LRU) and optionally in Django's cache, keyed by
+quiz id plus the quiz's content version. The version is bumped by signals on
+Quiz/Question/Choice edits, so an edited quiz is never graded with an old key.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Question
+from .versions import get_version
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    quiz_id: int
+    # Question ids in display order ("order", "id") so raw answers stay stable
+    question_ids: tuple
+    # Parallel to question_ids: the correct choice ids for each question
+    correct: tuple
+
+    @property
+    def total(self) -> int:
+        return len(self.question_ids)
+
+
+@dataclass(frozen=True)
+class GradeResult:
+    correct: int
+    total: int
+    score: int          # percent, rounded
+    raw_answers: dict   # {"<question_id>": "<chosen choice id>"}
+
+
+def load_answer_key(quiz_id: int) -> AnswerKey:
+    """
+    One LEFT JOIN over Question -> Choice. Questions without choices still
+    count towards the total (they can never be answered correctly).
+    """
+    rows = (
+        Question.objects
+        .filter(quiz_id=quiz_id)
+        .order_by("order", "id")
+        .values_list("id", "choices__id", "choices__is_correct")
+    )
+    question_ids = []
+    correct = {}
+    for qid, choice_id, is_correct in rows:
+        if qid not in correct:
+            question_ids.append(qid)
+            correct[qid] = set()
+        if choice_id is not None and is_correct:
+            correct[qid].add(choice_id)
+    return AnswerKey(
+        quiz_id=quiz_id,
+        question_ids=tuple(question_ids),
+        correct=tuple(frozenset(correct[qid]) for qid in question_ids),
+    )
+
+
+# ----- Answer-key cache -----
+class AnswerKeyCache:
+    """
+    Process-local LRU of AnswerKey objects keyed by (quiz_id, version).
+    When `alias` names a Django cache, misses fall through to it before the
+    database, so workers share keys loaded by each other.
+    """
+
+    def __init__(self, maxsize=256, alias=None):
+        self.maxsize = maxsize
+        self.alias = alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0          # served from this process
+        self.shared_hits = 0   # served from the Django cache
+        self.misses = 0        # loaded from the database
+
+    def get(self, quiz_id: int) -> AnswerKey:
+        version = get_version("quiz", quiz_id)
+        local_key = (quiz_id, version)
+        with self._lock:
+            key = self._entries.get(local_key)
+            if key is not None:
+                self._entries.move_to_end(local_key)
+                self.hits += 1
+                return key
+
+        shared = caches[self.alias] if self.alias else None
+        shared_key = f"answer-key:{quiz_id}:{version}"
+        key = shared.get(shared_key) if shared else None
+        if key is not None:
+            counter = "shared_hits"
+        else:
+            counter = "misses"
+            key = load_answer_key(quiz_id)
+            if shared:
+                shared.set(shared_key, key, timeout=None)
+
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            self._entries[local_key] = key
+            self._entries.move_to_end(local_key)
+            # Older versions of the same quiz are dead weight once seen
+            for stale in [k for k in self._entries if k[0] == quiz_id and k != local_key]:
+                del self._entries[stale]
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hit_ratio": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+answer_keys = AnswerKeyCache(
+    maxsize=getattr(settings, "ANSWER_KEY_CACHE_SIZE", 256),
+    alias=getattr(settings, "ANSWER_KEY_CACHE_ALIAS", None),
+)
+
+
+def get_answer_key(quiz_id: int) -> AnswerKey:
+    return answer_keys.get(quiz_id)
+
+
+def _as_choice_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def grade(key: AnswerKey, answers: Mapping) -> GradeResult:
+    """
+    answers: {"<question_id>": "<choice_id>"} as posted by the quiz form
+    (the "q_" prefix already stripped).
+    """
+    raw_answers = {}
+    n_correct = 0
+    for qid, good in zip(key.question_ids, key.correct):
+        chosen = str(answers.get(str(qid), ""))
+        raw_answers[str(qid)] = chosen
+        if _as_choice_id(chosen) in good:
+            n_correct += 1
+    total = key.total
+    return GradeResult(
+        correct=n_correct,
+        total=total,
+        score=int(round((n_correct * 100) / max(total, 1))),
+        raw_answers=raw_answers,
+    )
+
+
+def grade_many(key: AnswerKey, submissions: Iterable[Mapping]) -> list:
+    """Grade a batch of submissions for the same quiz against one key."""
+    return [grade(key, answers) for answers in submissions]
+
+
+def answers_from_post(data: Mapping) -> dict:
+    """Extract {"<question_id>": "<choice_id>"} from q_<id>=<choice> form fields."""
+    return {k.split("_", 1)[1]: v for k, v in data.items() if k.startswith("q_")}
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages import attempt_spool
+
+
+class Command(BaseCommand):
+    help = "Writes spooled quiz attempts (QUIZ_ATTEMPT_MODE = 'spool') to the database in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--once", action="store_true",
+                            help="Drain what is queued now, then exit.")
+        parser.add_argument("--interval", type=float, default=0.5,
+                            help="Seconds to sleep when the spool is empty.")
+        parser.add_argument("--recover-after", type=int, default=300,
+                            help="Requeue files claimed more than this many seconds ago.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        recovered = attempt_spool.recover(options["recover_after"])
+        if recovered:
+            self.stdout.write(f"Requeued {recovered} abandoned attempt(s).")
+
+        total = failed = batches = 0
+        busy = 0.0
+        try:
+            while True:
+                paths = attempt_spool.claim(batch_size)
+                if not paths:
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+                    continue
+                started = time.perf_counter()
+                inserted, bad = attempt_spool.ingest(paths, batch_size=batch_size)
+                elapsed = time.perf_counter() - started
+                busy += elapsed
+                total += inserted
+                failed += bad
+                batches += 1
+                self.stdout.write(
+                    f"  batch {batches}: {inserted} attempt(s) in {elapsed * 1000:.0f} ms"
+                    f" ({inserted / elapsed if elapsed else 0:.0f}/s)"
+                    + (f", {bad} moved to failed/" if bad else "")
+                )
+        except KeyboardInterrupt:
+            pass
+
+        rate = total / busy if busy else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {total} attempt(s) in {batches} batch(es), {rate:.0f} attempts/s; "
+            f"{failed} failed, {attempt_spool.pending()} still queued."
+        ))
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pages import exports
+
+
+class Command(BaseCommand):
+    help = "Streams quiz attempts or lesson completions to CSV/JSONL (optionally gzipped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(exports.EXPORTS))
+        parser.add_argument("--format", choices=exports.FORMATS, default="csv")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("-o", "--output", help="File to write (default: stdout).")
+        parser.add_argument("--since", help="Only rows on/after this date or datetime.")
+        parser.add_argument("--until", help="Only rows before this datetime (a date includes that whole day).")
+        parser.add_argument("--course", action="append", dest="slugs", metavar="SLUG",
+                            help="Limit to this course (repeatable).")
+        parser.add_argument("--after-id", type=int,
+                            help="Resume after this id (the last one of an earlier dump).")
+        parser.add_argument("--chunk-size", type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            filters = {
+                "since": exports.parse_bound(options["since"]),
+                "until": exports.parse_bound(options["until"], end=True),
+                "courses": options["slugs"] or (),
+                "after_id": options["after_id"],
+                "chunk_size": options["chunk_size"],
+            }
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        out = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        n_bytes = 0
+        try:
+            for block in exports.stream(options["kind"], options["format"], options["gzip"], **filters):
+                out.write(block)
+                n_bytes += len(block)
+        finally:
+            if options["output"]:
+                out.close()
+            else:
+                out.flush()
+        if options["output"]:
+            self.stderr.write(f"Wrote {n_bytes} byte(s) to {options['output']}.")
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from pages import blobstore
+
+
+class Command(BaseCommand):
+    help = ("Recounts blob references, then deletes unreferenced blobs, blob files without a row and "
+            "abandoned uploads older than the grace period.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=float, default=24,
+                            help="Keep anything touched more recently (uploads whose rows aren't saved yet).")
+        parser.add_argument("--no-recount", action="store_true", help="Trust the stored refcounts.")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if not options["no_recount"]:
+            fixed = blobstore.recount()
+            self.stdout.write(f"Recounted references: {fixed} blob(s) corrected.")
+        n_files, n_bytes = blobstore.collect(timedelta(hours=options["grace_hours"]), dry_run=options["dry_run"])
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {n_files} file(s), {n_bytes / 1e6:.1f} MB."))
@@ -0,0 +1,192 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from pages import counters, pagecache, progress, search
+from pages.models import (
+    Choice, Course, Enrollment, Lesson, LessonCompletion, Module, Question, Quiz, QuizAttempt, UserProfile,
+)
+from pages.versions import bump_version
+
+WORDS = (
+    "python django data web design cloud security agile marketing analytics network "
+    "design systems testing devops mobile react sql api machine learning product ux "
+    "storytelling finance leadership linux docker algorithms statistics writing"
+).split()
+CATEGORIES = ("Web Dev", "Data", "Design", "Security", "Business", "Cloud")
+BATCH = 5000
+
+
+class Command(BaseCommand):
+    help = ("Generates synthetic courses, users, enrollments, completions and quiz attempts with bulk "
+            "inserts (for benchmarks). Everything is named with --prefix so it can be cleared again.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--courses", type=int, default=20)
+        parser.add_argument("--modules", type=int, default=6, help="Modules per course.")
+        parser.add_argument("--lessons", type=int, default=8, help="Lessons per module.")
+        parser.add_argument("--questions", type=int, default=5, help="Questions per lesson quiz.")
+        parser.add_argument("--choices", type=int, default=4, help="Choices per question.")
+        parser.add_argument("--enrollments", type=int, default=3, help="Courses per user.")
+        parser.add_argument("--completion-rate", type=float, default=0.4,
+                            help="Share of an enrolled course's lessons each user has completed.")
+        parser.add_argument("--attempts", type=int, default=2, help="Quiz attempts per enrollment.")
+        parser.add_argument("--password", help="Password for the generated users (default: unusable).")
+        parser.add_argument("--prefix", default="load-")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--clear", action="store_true",
+                            help="Delete previously generated data with this prefix and exit.")
+
+    def handle(self, *args, **o):
+        User = get_user_model()
+        prefix = o["prefix"]
+        if not prefix:
+            raise CommandError("--prefix must not be empty.")
+        if o["clear"]:
+            n_users, _ = User.objects.filter(username__startswith=prefix).delete()
+            n_courses, _ = Course.objects.filter(slug__startswith=prefix).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {n_users + n_courses} row(s)."))
+            return
+        if Course.objects.filter(slug__startswith=prefix).exists():
+            raise CommandError(f"Data with prefix {prefix!r} exists; run with --clear first or pick another --prefix.")
+        if o["enrollments"] > o["courses"]:
+            raise CommandError("--enrollments can't exceed --courses.")
+
+        self.rng = random.Random(o["seed"])
+        started = time.perf_counter()
+        with transaction.atomic():
+            course_ids = self._content(prefix, o)
+            user_ids = self._users(User, prefix, o)
+            self._activity(user_ids, course_ids, o)
+
+            courses = Course.objects.filter(pk__in=course_ids)
+            counters.recount(courses)
+            progress.recompute(Enrollment.objects.filter(course__in=courses))
+            search.reindex(course_ids)
+
+            def bump():
+                for course_id in course_ids:
+                    bump_version("curriculum", course_id)
+                pagecache.bump_catalog()
+
+            transaction.on_commit(bump)
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s."))
+
+    # ----- helpers -----
+    def _insert(self, model, rows):
+        started = time.perf_counter()
+        model.objects.bulk_create(rows, batch_size=1000)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  {model.__name__}: {len(rows)} row(s) ({len(rows) / elapsed if elapsed else 0:.0f}/s)")
+
+    def _words(self, n):
+        return " ".join(self.rng.choice(WORDS) for _ in range(n))
+
+    def _content(self, prefix, o):
+        rng = self.rng
+        self._insert(Course, [
+            Course(slug=f"{prefix}course-{i}", title=f"{self._words(2).title()} {i}",
+                   category=rng.choice(CATEGORIES), short_desc=self._words(12))
+            for i in range(o["courses"])
+        ])
+        course_ids = list(Course.objects.filter(slug__startswith=prefix).values_list("pk", flat=True))
+
+        self._insert(Module, [
+            Module(course_id=cid, index=i, title=self._words(3).title(), intro=self._words(20))
+            for cid in course_ids for i in range(1, o["modules"] + 1)
+        ])
+        module_ids = list(Module.objects.filter(course_id__in=course_ids).values_list("pk", flat=True))
+
+        self._insert(Lesson, [
+            Lesson(module_id=mid, index=i, title=self._words(4).title(), summary=self._words(30),
+                   youtube_url="https://www.youtube.com/embed/dQw4w9WgXcQ")
+            for mid in module_ids for i in range(1, o["lessons"] + 1)
+        ])
+        lesson_ids = list(Lesson.objects.filter(module__course_id__in=course_ids).values_list("pk", flat=True))
+
+        self._insert(Quiz, [Quiz(lesson_id=lid, title="Lesson Quiz") for lid in lesson_ids])
+        quiz_ids = list(Quiz.objects.filter(lesson__module__course_id__in=course_ids).values_list("pk", flat=True))
+
+        self._insert(Question, [
+            Question(quiz_id=qid, order=i, text=self._words(8) + "?")
+            for qid in quiz_ids for i in range(1, o["questions"] + 1)
+        ])
+        question_ids = list(Question.objects.filter(quiz__lesson__module__course_id__in=course_ids)
+                            .values_list("pk", flat=True))
+
+        choices = []
+        for qid in question_ids:
+            correct = rng.randrange(o["choices"]) if o["choices"] else None
+            choices += [Choice(question_id=qid, text=self._words(3), is_correct=(i == correct))
+                        for i in range(o["choices"])]
+        self._insert(Choice, choices)
+        return course_ids
+
+    def _users(self, User, prefix, o):
+        password = make_password(o["password"])  # None -> unusable
+        self._insert(User, [
+            User(username=f"{prefix}user-{i}", email=f"{prefix}user-{i}@example.com",
+                 first_name="Load", last_name=f"User {i}", password=password)
+            for i in range(o["users"])
+        ])
+        user_ids = list(User.objects.filter(username__startswith=prefix).values_list("pk", flat=True))
+        self._insert(UserProfile, [UserProfile(user_id=uid) for uid in user_ids])
+        return user_ids
+
+    def _activity(self, user_ids, course_ids, o):
+        rng = self.rng
+        lessons_of = {}
+        for lid, cid in Lesson.objects.filter(module__course_id__in=course_ids).values_list("pk", "module__course_id"):
+            lessons_of.setdefault(cid, []).append(lid)
+        quiz_of = dict(Quiz.objects.filter(lesson__module__course_id__in=course_ids).values_list("lesson_id", "pk"))
+        questions = {}
+        for qid, quiz_id in Question.objects.filter(quiz__lesson__module__course_id__in=course_ids).values_list("pk", "quiz_id"):
+            questions.setdefault(quiz_id, []).append(qid)
+        choices = {}
+        for cid, qid, ok in (Choice.objects.filter(question__quiz__lesson__module__course_id__in=course_ids)
+                             .values_list("pk", "question_id", "is_correct")):
+            choices.setdefault(qid, []).append((cid, ok))
+
+        enrollments = [(uid, cid) for uid in user_ids for cid in rng.sample(course_ids, o["enrollments"])]
+        self._insert(Enrollment, [Enrollment(user_id=uid, course_id=cid) for uid, cid in enrollments])
+
+        now = timezone.now()
+        completions, attempts = [], []
+        n_completions = n_attempts = 0
+        for uid, cid in enrollments:
+            lessons = lessons_of.get(cid, [])
+            done = rng.sample(lessons, int(len(lessons) * o["completion_rate"]))
+            completions += [LessonCompletion(user_id=uid, lesson_id=lid, completed=True, completed_at=now)
+                            for lid in done]
+            for _ in range(o["attempts"] if lessons else 0):
+                quiz_id = quiz_of[rng.choice(lessons)]
+                answers, n_correct = {}, 0
+                for q in questions.get(quiz_id, []):
+                    if choices.get(q):
+                        choice_id, is_correct = rng.choice(choices[q])
+                        answers[str(q)] = str(choice_id)
+                        n_correct += is_correct
+                total = len(questions.get(quiz_id, []))
+                score = round(100 * n_correct / total) if total else 0
+                attempts.append(QuizAttempt(user_id=uid, quiz_id=quiz_id, score=score, total=total,
+                                            passed=score >= 70, raw_answers=answers))
+            if len(completions) >= BATCH:
+                LessonCompletion.objects.bulk_create(completions, batch_size=1000)
+                n_completions += len(completions)
+                completions = []
+            if len(attempts) >= BATCH:
+                QuizAttempt.objects.bulk_create(attempts, batch_size=1000)
+                n_attempts += len(attempts)
+                attempts = []
+        if completions:
+            LessonCompletion.objects.bulk_create(completions, batch_size=1000)
+        if attempts:
+            QuizAttempt.objects.bulk_create(attempts, batch_size=1000)
+        self.stdout.write(f"  LessonCompletion: {n_completions + len(completions)} row(s)")
+        self.stdout.write(f"  QuizAttempt: {n_attempts + len(attempts)} row(s)")
@@ -0,0 +1,56 @@
+import sys
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pages import enrollment_import
+from pages.models import Enrollment
+
+
+class Command(BaseCommand):
+    help = "Enrolls users in courses from a CSV with email and course (slug) columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="CSV file, or - for stdin.")
+        parser.add_argument("--create-users", action="store_true",
+                            help="Create accounts (username = email, no password) for unknown emails.")
+        parser.add_argument("--status", default=Enrollment.STATUS_ACTIVE,
+                            choices=sorted(enrollment_import.STATUSES),
+                            help="Status for rows without a status column.")
+        parser.add_argument("--batch-size", type=int, default=enrollment_import.BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Run the whole import in one transaction, then roll it back.")
+        parser.add_argument("--max-errors-shown", type=int, default=50)
+
+    def handle(self, *args, **options):
+        path = options["csv_path"]
+        try:
+            fh = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8-sig")
+        except OSError as exc:
+            raise CommandError(exc)
+        try:
+            # Otherwise every batch commits on its own (see pages.enrollment_import)
+            with transaction.atomic() if options["dry_run"] else nullcontext():
+                report = enrollment_import.import_enrollments(
+                    enrollment_import.read_rows(fh),
+                    create_users=options["create_users"],
+                    batch_size=options["batch_size"],
+                    status=options["status"],
+                )
+                if options["dry_run"]:
+                    transaction.set_rollback(True)
+        except ValueError as exc:
+            raise CommandError(exc)
+        finally:
+            if fh is not sys.stdin:
+                fh.close()
+
+        shown = report.errors[:options["max_errors_shown"]]
+        for line, message in shown:
+            self.stderr.write(f"  line {line}: {message}")
+        if report.n_errors > len(shown):
+            self.stderr.write(f"  ... and {report.n_errors - len(shown)} more error(s)")
+        prefix = "Dry run (rolled back): " if options["dry_run"] else ""
+        style = self.style.WARNING if report.n_errors else self.style.SUCCESS
+        self.stdout.write(style(prefix + report.summary()))
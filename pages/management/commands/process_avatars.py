@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages import avatars
+from pages.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = ("Processes avatar uploads still waiting in AVATAR_STAGING_DIR (e.g. after a restart); "
+            "with --backfill also makes thumbnails for avatars uploaded before the pipeline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backfill", action="store_true")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        n_staged = sum(avatars.process_staged(path) for path in avatars.staged())
+        self.stdout.write(f"Processed {n_staged} staged upload(s).")
+
+        if options["backfill"]:
+            n_done = n_failed = 0
+            for profile in UserProfile.objects.exclude(avatar="").exclude(avatar__isnull=True).filter(avatar_variants={}):
+                try:
+                    n_done += avatars.backfill(profile)
+                except (OSError, ValueError) as exc:
+                    n_failed += 1
+                    self.stderr.write(f"  {profile}: {exc}")
+            self.stdout.write(f"Backfilled {n_done} avatar(s), {n_failed} failed.")
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s."))
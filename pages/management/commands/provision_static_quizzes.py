@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pages.models import Course, Module, Lesson, Quiz
+from pages import static_quizzes
+
+
+class Command(BaseCommand):
+    help = "Creates the container course/module/lessons/quizzes used by the static quiz pages 1–8."
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        ids = static_quizzes.provision(Course, Module, Lesson, Quiz)
+        static_quizzes.reset()
+        for num, quiz_id in sorted(ids.items()):
+            self.stdout.write(f"  /quiz/{num}/ -> Quiz #{quiz_id}")
+        self.stdout.write(self.style.SUCCESS("Static quizzes provisioned."))
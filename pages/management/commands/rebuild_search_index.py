@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pages import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text course search index from Course/Module/Lesson."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("No search index table on this database; run migrate first.")
+        n = search.reindex_all(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {n} course(s)."))
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pages import bitmaps
+from pages.curriculum import get_curriculum
+from pages.models import Course, Enrollment, LessonCompletion, LessonProgressBitmap
+
+
+class Command(BaseCommand):
+    help = "Backfills (or with --check, verifies) LessonProgressBitmap rows from LessonCompletion."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", action="append", dest="slugs", metavar="SLUG",
+                            help="Limit to this course (repeatable).")
+        parser.add_argument("--check", action="store_true",
+                            help="Only report rows that differ; exit with an error if any do.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        courses = Course.objects.order_by("pk")
+        if options["slugs"]:
+            courses = courses.filter(slug__in=options["slugs"])
+
+        n_rows = n_bad = n_completions = n_bytes = 0
+        for course_id, slug in courses.values_list("pk", "slug"):
+            curriculum = get_curriculum(course_id)
+            layout = bitmaps.layout_of(curriculum)
+
+            by_user = {uid: [] for uid in Enrollment.objects.filter(course_id=course_id)
+                       .values_list("user_id", flat=True)}
+            for uid, lid in (LessonCompletion.objects
+                             .filter(lesson__module__course_id=course_id, completed=True)
+                             .values_list("user_id", "lesson_id").iterator(chunk_size=5000)):
+                by_user.setdefault(uid, []).append(lid)
+                n_completions += 1
+
+            rows = []
+            for uid, lesson_ids in by_user.items():
+                bitmap = bitmaps.bitmap_for(lesson_ids, curriculum)
+                rows.append(LessonProgressBitmap(
+                    user_id=uid, course_id=course_id, bits=bitmap.to_bytes(),
+                    n_completed=bitmap.count(), layout=layout,
+                ))
+            n_rows += len(rows)
+            n_bytes += sum(len(r.bits) for r in rows)
+
+            if options["check"]:
+                stored = {
+                    uid: (bytes(bits), layout_)
+                    for uid, bits, layout_ in LessonProgressBitmap.objects
+                    .filter(course_id=course_id).values_list("user_id", "bits", "layout")
+                }
+                bad = [r.user_id for r in rows if stored.get(r.user_id) != (r.bits, layout)]
+                if bad:
+                    self.stdout.write(f"  {slug}: {len(bad)} stale row(s)")
+                n_bad += len(bad)
+                continue
+
+            with transaction.atomic():
+                LessonProgressBitmap.objects.bulk_create(
+                    rows,
+                    batch_size=options["batch_size"],
+                    update_conflicts=True,
+                    unique_fields=["user", "course"],
+                    update_fields=["bits", "n_completed", "layout", "updated_at"],
+                )
+            self.stdout.write(f"  {slug}: {len(rows)} row(s)")
+
+        summary = (f"{n_rows} bitmap row(s), {n_bytes} byte(s) of bits "
+                   f"for {n_completions} completion row(s)")
+        if options["check"]:
+            if n_bad:
+                raise CommandError(f"{n_bad} of {summary} are stale.")
+            self.stdout.write(self.style.SUCCESS(f"All {summary} are consistent."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {summary}."))
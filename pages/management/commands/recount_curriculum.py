@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from pages import counters, progress
+from pages.models import Course, Enrollment
+
+
+class Command(BaseCommand):
+    help = "Recomputes (or with --check, verifies) Course.n_modules/n_lessons and enrollment progress counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true",
+                            help="Only report drifted counters; exit with an error if any are found.")
+        parser.add_argument("--course", action="append", dest="slugs", metavar="SLUG",
+                            help="Limit to this course (repeatable).")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["slugs"]:
+            courses = courses.filter(slug__in=options["slugs"])
+        enrollments = Enrollment.objects.filter(course__in=courses)
+
+        drifted = list(
+            counters.counted_courses()
+            .filter(pk__in=courses.values("pk"))
+            .exclude(n_modules=F("true_modules"), n_lessons=F("true_lessons"))
+            .values_list("slug", "n_modules", "true_modules", "n_lessons", "true_lessons")
+        )
+        for slug, n_mod, true_mod, n_les, true_les in drifted:
+            self.stdout.write(f"  {slug}: modules {n_mod} -> {true_mod}, lessons {n_les} -> {true_les}")
+
+        stale_progress = progress.drifted(enrollments).count()
+
+        if options["check"]:
+            if drifted or stale_progress:
+                raise CommandError(
+                    f"{len(drifted)} course(s) with drifted counters, "
+                    f"{stale_progress} enrollment(s) with stale progress."
+                )
+            self.stdout.write(self.style.SUCCESS("All counters are consistent."))
+            return
+
+        with transaction.atomic():
+            n_courses = counters.recount(courses)
+            n_enrollments = progress.recompute(enrollments)
+        self.stdout.write(self.style.SUCCESS(
+            f"Recounted {n_courses} course(s) ({len(drifted)} drifted) and {n_enrollments} enrollment(s)."
+        ))
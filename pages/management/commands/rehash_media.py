@@ -0,0 +1,69 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pages import blobstore
+from pages.models import Resource
+from pages.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = ("Moves files uploaded before the content-addressed storage into it: each file is hashed "
+            "and stored once as a blob, and the rows are repointed. Refcounts are recounted at the end.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would move.")
+        parser.add_argument("--delete-originals", action="store_true",
+                            help="Remove the old files once the rows point at their blobs.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        originals, n_rows, n_missing, n_bytes = set(), 0, 0, 0
+        new_names = set()
+        with transaction.atomic():
+            for model, field in blobstore.file_fields():
+                label = model._meta.label
+                storage = model._meta.get_field(field).storage
+                rows = (model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+                        .exclude(**{f"{field}__startswith": blobstore.PREFIX}).values_list("pk", field))
+                for pk, name in rows.iterator():
+                    if not storage.exists(name):
+                        n_missing += 1
+                        self.stderr.write(f"  {label} {pk}: {name} is missing")
+                        continue
+                    n_rows += 1
+                    n_bytes += storage.size(name)
+                    originals.add(name)
+                    if dry_run:
+                        continue
+                    with storage.open(name) as fh:
+                        new_name = storage.save(name, fh)
+                    new_names.add(new_name)
+                    model.objects.filter(pk=pk).update(**{field: new_name})
+
+            if not dry_run:
+                blobstore.recount()
+                # Resource URLs carry the content hash
+                course_ids = set(Resource.objects.filter(file__in=new_names)
+                                 .values_list("lesson__module__course_id", flat=True))
+
+                def bump():
+                    for course_id in course_ids:
+                        bump_version("curriculum", course_id)
+
+                transaction.on_commit(bump)
+
+        blob_bytes = sum(os.path.getsize(blobstore.resource_storage().path(n)) for n in new_names)
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {n_rows} file(s) ({n_bytes / 1e6:.1f} MB)"
+            + ("" if dry_run else f" into {len(new_names)} blob(s) ({blob_bytes / 1e6:.1f} MB)")
+            + f"; {n_missing} missing."
+        ))
+
+        if options["delete_originals"] and not dry_run:
+            storage = blobstore.resource_storage()
+            for name in originals:
+                storage.delete(name)
+            self.stdout.write(f"Deleted {len(originals)} original file(s).")
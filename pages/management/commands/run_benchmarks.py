@@ -0,0 +1,121 @@
+import json
+import platform
+import subprocess
+import sys
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from pages import benchmarks
+from pages.models import Course, Enrollment, LessonCompletion, QuizAttempt
+
+
+class Command(BaseCommand):
+    help = ("Drives the hot views through the test client and reports p50/p95 latency and queries "
+            "per request; optionally saves JSON and compares it with an earlier run.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", action="append", dest="scenarios",
+                            choices=list(benchmarks.SCENARIOS), help="Run only this scenario (repeatable).")
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--user", help="Username to benchmark as (default: first generated load user).")
+        parser.add_argument("--output", help="Write results to this JSON file.")
+        parser.add_argument("--compare", help="Earlier JSON results to compare against.")
+
+    def handle(self, *args, **options):
+        user = self._user(options["user"])
+        try:
+            fixture = benchmarks.build_fixture(user)
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        names = options["scenarios"] or list(benchmarks.SCENARIOS)
+        if fixture.quiz_id is None and "api_submit_quiz_attempt" in names:
+            names.remove("api_submit_quiz_attempt")
+            self.stderr.write("Skipping api_submit_quiz_attempt: the course has no quiz questions.")
+
+        client = Client()
+        client.force_login(user)
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for name in names:
+                result = benchmarks.run(name, client, fixture, options["iterations"], options["warmup"])
+                results[name] = result.as_dict()
+
+        baseline = self._load(options["compare"]) if options["compare"] else None
+        self._print(results, baseline)
+
+        if options["output"]:
+            payload = {"meta": self._meta(user, fixture, options), "results": results}
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(payload, fh, indent=2)
+            self.stdout.write(f"Saved {options['output']}")
+
+    def _user(self, username):
+        User = get_user_model()
+        users = User.objects.filter(enrollments__isnull=False).order_by("pk")
+        if username:
+            users = users.filter(username=username)
+        else:
+            users = users.filter(username__startswith="load-") or users
+        user = users.first()
+        if user is None:
+            raise CommandError("No enrolled user to benchmark; run `manage.py generate_load_data` first.")
+        return user
+
+    def _load(self, path):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                return json.load(fh)["results"]
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+
+    def _print(self, results, baseline):
+        self.stdout.write(f"{'scenario':32} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}  status")
+        for name, r in results.items():
+            line = f"{name:32} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['queries_per_request']:8.1f}  {r['statuses']}"
+            before = (baseline or {}).get(name)
+            if before:
+                line += (f"   Δp50 {self._delta(before['p50_ms'], r['p50_ms'])}"
+                         f" Δp95 {self._delta(before['p95_ms'], r['p95_ms'])}"
+                         f" Δq {r['queries_per_request'] - before['queries_per_request']:+.1f}")
+            self.stdout.write(line)
+
+    @staticmethod
+    def _delta(before, after):
+        return f"{(after - before) / before * 100:+.0f}%" if before else "n/a"
+
+    def _meta(self, user, fixture, options):
+        try:
+            commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                    text=True, cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            "timestamp": timezone.now().isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "warmup": options["warmup"],
+            "user": user.get_username(),
+            "course": fixture.course_slug,
+            "settings": {
+                name: getattr(settings, name, None)
+                for name in ("COMPLETION_BITMAPS", "WRITE_QUEUE_ENABLED", "QUIZ_ATTEMPT_MODE")
+            },
+            "dataset": {
+                "courses": Course.objects.count(),
+                "enrollments": Enrollment.objects.count(),
+                "completions": LessonCompletion.objects.count(),
+                "quiz_attempts": QuizAttempt.objects.count(),
+            },
+            "argv": sys.argv[1:],
+        }
@@ -0,0 +1,57 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, get_resolver
+
+from .routers import replica_configured, use_replica
+
+
+class ReadReplicaMiddleware:
+    """
+    Route ORM reads of read-only views (settings.READ_REPLICA_VIEWS and admin
+    changelists) to the replica for GET/HEAD requests.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.views = frozenset(getattr(settings, "READ_REPLICA_VIEWS", ()))
+        # Stay async under ASGI so async views don't pay a thread hop
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = self._enter(request)
+        try:
+            return self.get_response(request)
+        finally:
+            if token is not None:
+                use_replica.reset(token)
+
+    async def __acall__(self, request):
+        # Set and reset in this coroutine's context: process_view would run
+        # in sync_to_async's copy of it, where the token can't be reset
+        token = self._enter(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            if token is not None:
+                use_replica.reset(token)
+
+    def _enter(self, request):
+        """Flag replica reads for this request if it is for a read-only view."""
+        if request.method not in ("GET", "HEAD") or not replica_configured():
+            return None
+        try:
+            match = get_resolver(getattr(request, "urlconf", None)).resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.view_name in self.views or (
+            match.namespace == "admin" and match.url_name and match.url_name.endswith("_changelist")
+        ):
+            return use_replica.set(True)
+        return None
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Frozen copy of pages.static_quizzes.provision() as of this migration, so
+# later changes to that module can't change what migrating does.
+STATIC_COURSE_SLUG = "web-dev-static"
+STATIC_QUIZ_NUMBERS = range(1, 9)
+
+
+def forwards(apps, schema_editor):
+    Course = apps.get_model("pages", "Course")
+    Module = apps.get_model("pages", "Module")
+    Lesson = apps.get_model("pages", "Lesson")
+    Quiz = apps.get_model("pages", "Quiz")
+    course, _ = Course.objects.get_or_create(
+        slug=STATIC_COURSE_SLUG,
+        defaults={
+            "title": "Web Development (Static Quizzes)",
+            "category": "Web Dev",
+            "short_desc": "Container course for static quiz pages 1–8.",
+            "is_active": True,
+        },
+    )
+    module, _ = Module.objects.get_or_create(
+        course=course,
+        index=1,
+        defaults={"title": "Module (Static Quizzes)", "intro": "Auto-provisioned"},
+    )
+    for num in STATIC_QUIZ_NUMBERS:
+        lesson, _ = Lesson.objects.get_or_create(
+            module=module,
+            index=num,
+            defaults={"title": f"Static Quiz {num}", "summary": "Auto-provisioned"},
+        )
+        Quiz.objects.get_or_create(lesson=lesson, defaults={"title": f"Quiz {num}", "pass_mark": 60})
+
+
+class Migration(migrations.Migration):
+    dependencies = [("pages", "0007_alter_enrollment_unique_together_and_more")]
+    operations = [migrations.RunPython(forwards, migrations.RunPython.noop)]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:51
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Enrollment = apps.get_model("pages", "Enrollment")
+    Lesson = apps.get_model("pages", "Lesson")
+    LessonCompletion = apps.get_model("pages", "LessonCompletion")
+    total = (
+        Lesson.objects.filter(module__course_id=OuterRef("course_id"))
+        .order_by().values("module__course_id")
+        .annotate(n=Count("id")).values("n")
+    )
+    completed = (
+        LessonCompletion.objects.filter(
+            user_id=OuterRef("user_id"),
+            lesson__module__course_id=OuterRef("course_id"),
+            completed=True,
+        )
+        .order_by().values("user_id")
+        .annotate(n=Count("id")).values("n")
+    )
+    Enrollment.objects.update(
+        total_lessons=Coalesce(Subquery(total, output_field=IntegerField()), Value(0)),
+        completed_lessons=Coalesce(Subquery(completed, output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0008_provision_static_quizzes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='total_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:53
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Course = apps.get_model("pages", "Course")
+    Module = apps.get_model("pages", "Module")
+    Lesson = apps.get_model("pages", "Lesson")
+
+    def count(qs, group_by):
+        return Coalesce(
+            Subquery(
+                qs.order_by().values(group_by).annotate(n=Count("id")).values("n"),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+
+    Course.objects.update(
+        n_modules=count(Module.objects.filter(course_id=OuterRef("pk")), "course_id"),
+        n_lessons=count(Lesson.objects.filter(module__course_id=OuterRef("pk")), "module__course_id"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0009_enrollment_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='n_lessons',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='n_modules',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from pages import search
+
+
+def forwards(apps, schema_editor):
+    search.create_index(schema_editor)
+    if search.TABLE not in schema_editor.connection.introspection.table_names():
+        return  # no full-text support on this backend
+    Course = apps.get_model("pages", "Course")
+    docs = search.build_documents(
+        Course.objects.values_list("pk", flat=True),
+        Course,
+        apps.get_model("pages", "Module"),
+        apps.get_model("pages", "Lesson"),
+    )
+    search.write_documents(schema_editor.connection, docs)
+
+
+def backwards(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+    dependencies = [("pages", "0010_course_counters")]
+    operations = [migrations.RunPython(forwards, backwards)]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0014_userprofile_avatar_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 
+from .blobstore import avatar_storage, resource_storage
+
 # Create your models here.
 
 # ----- User Profile -----
@@ -12,7 +14,9 @@ class UserProfile(models.Model):
     timezone = models.CharField(max_length=64, blank=True)
     phone = models.CharField(max_length=32, blank=True)
     bio = models.TextField(blank=True)
-    avatar = models.ImageField(upload_to="avatars/", blank=True, null=True)
+    avatar = models.ImageField(upload_to="avatars/", storage=avatar_storage, blank=True, null=True)
+    # Thumbnails from pages.avatars: {"version": n, "webp": {"64": name, ...}, "jpeg": {...}}
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     prefs = models.JSONField(default=dict, blank=True)  # ✅ correct
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -28,6 +32,9 @@ class Course(models.Model):
     category = models.CharField(max_length=64, blank=True)  # Web/Data/Design/Security...
     short_desc = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    # Denormalized curriculum size, maintained by pages.counters
+    n_modules = models.PositiveIntegerField(default=0, editable=False)
+    n_lessons = models.PositiveIntegerField(default=0, editable=False)
     def save(self, *a, **kw):
         if not self.slug: self.slug = slugify(self.title)
         super().save(*a, **kw)
@@ -43,6 +50,11 @@ class Module(models.Model):
         ordering = ["index"]
         indexes = [models.Index(fields=["course", "index"])]
         
+    def save(self, *a, **kw):
+        # Counter updates in post_save must commit (or roll back) with the row
+        with transaction.atomic():
+            super().save(*a, **kw)
+
     def __str__(self): return f"{self.course.title} • Module {self.index}"
 
 class Lesson(models.Model):
@@ -56,13 +68,17 @@ class Lesson(models.Model):
         ordering = ["index"]
         indexes = [models.Index(fields=["module", "index"])]
     
+    def save(self, *a, **kw):
+        with transaction.atomic():
+            super().save(*a, **kw)
+
     def __str__(self): 
         return f"{self.module} • L{self.index}: {self.title}"
 
 class Resource(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="resources")
     name = models.CharField(max_length=200)
-    file = models.FileField(upload_to="lesson_resources/")
+    file = models.FileField(upload_to="lesson_resources/", max_length=200, storage=resource_storage)
     def __str__(self): return f"{self.lesson}: {self.name}"
 
 # Enrollment & progress
@@ -81,6 +97,10 @@ class Enrollment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized progress, maintained by pages.progress
+    completed_lessons = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["user", "course"], name="unique_enrollment")
@@ -90,6 +110,13 @@ class Enrollment(models.Model):
     def __str__(self):
         return f"{self.user} ↔ {self.course}"
 
+    @property
+    def progress(self):
+        """Completed lessons as a whole percent (0–100)."""
+        if not self.total_lessons:
+            return 0
+        return min(100, int(round(self.completed_lessons * 100 / self.total_lessons)))
+
 class LessonCompletion(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="lesson_completions")
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="completions")
@@ -102,6 +129,26 @@ class LessonCompletion(models.Model):
         
     def __str__(self): return f"{self.user} • {self.lesson} : {self.completed}"
 
+class LessonProgressBitmap(models.Model):
+    """
+    Compact mirror of LessonCompletion for one (user, course): bit N is set
+    when the Nth lesson of the course (curriculum order) is completed.
+    `layout` fingerprints the lesson order the bits were written against;
+    a mismatch means the curriculum changed and the row is rebuilt.
+    See pages.bitmaps.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="progress_bitmaps")
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="progress_bitmaps")
+    bits = models.BinaryField(default=b"")
+    n_completed = models.PositiveIntegerField(default=0)
+    layout = models.CharField(max_length=16)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "course"], name="unique_progress_bitmap")]
+
+    def __str__(self): return f"{self.user} • {self.course} : {self.n_completed}"
+
 # ----- Quizzes -----
 class Quiz(models.Model):
     lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, related_name="quiz")
@@ -158,3 +205,19 @@ class ContactMessage(models.Model):
 
     def __str__(self):
         return f"{self.name} <{self.email}> • {self.created_at:%Y-%m-%d}"
+
+class Blob(models.Model):
+    """
+    One stored file of the content-addressed storage (pages.blobstore).
+    `refcount` is the number of FileField values naming it; blobs at zero
+    are removed by `manage.py gc_blobs` once `updated_at` (bumped by every
+    upload of the content and every reference change) is past its grace.
+    """
+    name = models.CharField(max_length=200, unique=True)  # storage name, blobs/<ns>/<aa>/<sha256><ext>
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self): return f"{self.name} ({self.refcount})"
@@ -0,0 +1,163 @@
+"""
+Catalog page caching (index, courses_list, course_enroll).
+
+Everything here is keyed by the "catalog" content version, which signals
+bump after any Course/Module/Lesson change, so entries never need deleting.
+The version is shared by all workers (pages.versions), so an edit handled
+by one stops every worker serving the old pages.
+
+  * cache_anonymous_page: full responses for visitors without a session.
+    Hits are served without touching the ORM and carry an ETag plus a
+    Last-Modified taken from the catalog version (a microsecond timestamp),
+    so browsers and CDNs can revalidate with a 304. The CSRF token of forms
+    (the contact form on the homepage) is swapped for the visitor's own on
+    every hit; such pages are marked private and their ETag includes a hash
+    of the CSRF cookie, so a rotated cookie never revalidates an old copy.
+  * cached_catalog_value: shared data for the logged-in variants, which add
+    their per-user bits (enrollment CTA, "Continue" buttons) on top.
+
+Entries live in their own cache alias (PAGE_CACHE_ALIAS) so that a flood of
+distinct URLs can only evict other pages, never the content versions. Page
+keys are built from the view's whitelisted query parameters alone; anything
+else in the query string is ignored, and overlong values skip the cache.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .versions import bump_version, get_version
+
+CSRF_PLACEHOLDER = b"__pagecache_csrf__"
+_CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _cache():
+    return caches[getattr(settings, "PAGE_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "PAGE_CACHE_TIMEOUT", 600)
+
+
+def _max_param_length():
+    return getattr(settings, "PAGE_CACHE_MAX_PARAM_LENGTH", 100)
+
+
+def normalise_query(q):
+    """Case- and whitespace-insensitive form of a search query."""
+    return " ".join(q.lower().split())
+
+
+def catalog_version() -> int:
+    return get_version("catalog")
+
+
+def bump_catalog() -> int:
+    return bump_version("catalog")
+
+
+def cached_catalog_value(name, build, *parts):
+    """build() once per catalog version and `parts` (e.g. a search query)."""
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    key = f"catalog:{name}:{catalog_version()}:{digest}"
+    cache = _cache()
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout=_timeout())
+    return value
+
+
+# ----- Full anonymous responses -----
+def _cacheable(request, params):
+    # A session cookie may mean a logged-in user (or queued messages); deciding
+    # that would cost a session lookup, so those requests take the normal path.
+    limit = _max_param_length()
+    return (
+        request.method in ("GET", "HEAD")
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+        and all(len(v) <= limit for name in params for v in request.GET.getlist(name))
+    )
+
+
+def _page_key(request, version, params):
+    # Only the parameters the view reads; their raw values, as templates echo them
+    query = [(name, request.GET.getlist(name)) for name in params]
+    digest = hashlib.md5(repr((request.path, query)).encode()).hexdigest()
+    return f"page:{request.resolver_match.view_name}:{version}:{digest}"
+
+
+def _entry(response):
+    content, n_tokens = _CSRF_INPUT.subn(rb"\g<1>" + CSRF_PLACEHOLDER + rb"\g<2>", response.content)
+    return {
+        "content": content,
+        "content_type": response["Content-Type"],
+        "etag": '"%s"' % hashlib.md5(content).hexdigest(),
+        "private": bool(n_tokens),
+    }
+
+
+def _respond(request, entry, version):
+    last_modified = version // 1_000_000
+    etag = entry["etag"]
+    if entry["private"]:
+        # The copy a browser holds embeds a token for the CSRF cookie it had
+        # then: tie the validator to that cookie, and skip Last-Modified
+        # (which can't tell cookies apart), so a rotated cookie gets a 200.
+        token = get_token(request)
+        etag = '"%s-%s"' % (etag.strip('"'), hashlib.md5(request.META["CSRF_COOKIE"].encode()).hexdigest()[:16])
+        last_modified = None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        response = not_modified
+    else:
+        content = entry["content"]
+        if entry["private"]:
+            content = content.replace(CSRF_PLACEHOLDER, token.encode())
+        response = HttpResponse(content, content_type=entry["content_type"])
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, max_age=0, must_revalidate=True)
+    if entry["private"]:
+        patch_cache_control(response, private=True)
+    else:
+        patch_cache_control(response, public=True)
+    patch_vary_headers(response, ["Cookie"])
+    return response
+
+
+def cache_anonymous_page(view=None, *, params=()):
+    """
+    Cache the view's anonymous responses; `params` names the query
+    parameters its output depends on (@cache_anonymous_page(params=("q",))).
+    """
+    if view is None:
+        return lambda view: cache_anonymous_page(view, params=params)
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not _cacheable(request, params):
+            return view(request, *args, **kwargs)
+        version = catalog_version()
+        key = _page_key(request, version, params)
+        cache = _cache()
+        entry = cache.get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming or request.user.is_authenticated:
+                return response
+            entry = _entry(response)
+            cache.set(key, entry, timeout=_timeout())
+        return _respond(request, entry, version)
+
+    return wrapped
@@ -0,0 +1,84 @@
+"""
+Denormalized course progress on Enrollment (completed_lessons/total_lessons).
+
+Counters are adjusted incrementally with F() updates:
+  * lesson completion toggled  -> completed_lessons of that enrollment
+  * lesson added/removed       -> total_lessons of every enrollment in the course
+recompute() rebuilds them from LessonCompletion/Lesson for repairs and backfills.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .db import shift
+from .models import Enrollment, Lesson, LessonCompletion
+
+
+def completion_changed(user_id, course_id, delta):
+    """A lesson of course_id became completed (+1) or not completed (-1)."""
+    if delta:
+        Enrollment.objects.filter(user_id=user_id, course_id=course_id).update(
+            completed_lessons=shift("completed_lessons", delta)
+        )
+
+
+def lessons_changed(course_id, delta):
+    """delta lessons were added to (or removed from) course_id."""
+    if delta:
+        Enrollment.objects.filter(course_id=course_id).update(
+            total_lessons=shift("total_lessons", delta)
+        )
+
+
+def lessons_removed(lessons, course_id):
+    """
+    Called before `lessons` (a Lesson queryset within course_id) are deleted:
+    drop them from the completed count of every learner, in one UPDATE
+    (totals move via lessons_changed).
+    """
+    done = LessonCompletion.objects.filter(lesson__in=lessons, completed=True)
+    per_user = (
+        done.filter(user_id=OuterRef("user_id"))
+        .order_by().values("user_id")
+        .annotate(n=Count("id")).values("n")
+    )
+    Enrollment.objects.filter(course_id=course_id, user_id__in=done.values("user_id")).update(
+        completed_lessons=Greatest(
+            F("completed_lessons") - Subquery(per_user, output_field=IntegerField()), Value(0)
+        )
+    )
+
+
+def _true_counts():
+    total = (
+        Lesson.objects.filter(module__course_id=OuterRef("course_id"))
+        .order_by().values("module__course_id")
+        .annotate(n=Count("id")).values("n")
+    )
+    completed = (
+        LessonCompletion.objects.filter(
+            user_id=OuterRef("user_id"),
+            lesson__module__course_id=OuterRef("course_id"),
+            completed=True,
+        )
+        .order_by().values("user_id")
+        .annotate(n=Count("id")).values("n")
+    )
+    return {
+        "total_lessons": Coalesce(Subquery(total, output_field=IntegerField()), Value(0)),
+        "completed_lessons": Coalesce(Subquery(completed, output_field=IntegerField()), Value(0)),
+    }
+
+
+def recompute(enrollments=None):
+    """Rebuild progress counters for the given Enrollment queryset (default: all)."""
+    if enrollments is None:
+        enrollments = Enrollment.objects.all()
+    return enrollments.update(**_true_counts())
+
+
+def drifted(enrollments):
+    """Enrollments whose stored counters differ from the source tables."""
+    true = _true_counts()
+    return enrollments.annotate(
+        true_total=true["total_lessons"], true_completed=true["completed_lessons"],
+    ).exclude(total_lessons=F("true_total"), completed_lessons=F("true_completed"))
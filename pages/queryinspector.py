@@ -0,0 +1,191 @@
+"""
+Per-request SQL inspection and query budgets.
+
+QueryInspectorMiddleware records every query a request runs. The recorder
+lives in a ContextVar and an execute wrapper is added to each connection as
+it is created, so ORM calls that sync_to_async moves to another thread are
+counted as well. Queries are grouped by normalised SQL (IN lists and numbers
+collapsed) plus the first call site in the project; a group that repeats
+settings.QUERY_INSPECTOR_N_PLUS_ONE times or more is logged as a likely N+1.
+
+@query_budget(n) caps the queries of a view. Going over raises
+QueryBudgetExceeded when settings.QUERY_BUDGET_MODE is "raise" (as the test
+runner sets it) and logs a warning otherwise.
+
+Staff responses carry an X-Query-Count summary header, and /staff/queries/
+lists the last requests this process inspected. Queries run while a
+StreamingHttpResponse is consumed happen after the middleware returns and
+aren't counted.
+"""
+import logging
+import re
+import sys
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+RECENT = deque(maxlen=50)  # summaries for /staff/queries/
+
+_recorder = ContextVar("query_recorder", default=None)
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit):
+    """Declare the most queries a view may run (see QueryInspectorMiddleware)."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def enabled():
+    return getattr(settings, "QUERY_INSPECTOR_ENABLED", False)
+
+
+def normalise(sql):
+    return _NUMBER.sub("N", _IN_LIST.sub("(%s, ...)", sql))
+
+
+def call_site():
+    """path:line of the innermost project frame that isn't this module."""
+    root = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and filename != __file__ and "site-packages" not in filename:
+            return f"{filename[len(root) + 1:]}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "-"
+
+
+@dataclass
+class Query:
+    alias: str
+    sql: str
+    site: str
+    ms: float
+
+
+@dataclass
+class Recorder:
+    path: str
+    view: str = ""
+    budget: int = None
+    queries: list = field(default_factory=list)
+
+    def repeated(self, threshold):
+        """[(count, site, sql)] for groups run at least `threshold` times."""
+        groups = Counter((q.site, q.sql) for q in self.queries)
+        return [(n, site, sql) for (site, sql), n in groups.most_common() if n >= threshold]
+
+    def summary(self):
+        threshold = getattr(settings, "QUERY_INSPECTOR_N_PLUS_ONE", 5)
+        return {
+            "path": self.path,
+            "view": self.view,
+            "queries": len(self.queries),
+            "ms": round(sum(q.ms for q in self.queries), 2),
+            "budget": self.budget,
+            "n_plus_one": [
+                {"count": n, "site": site, "sql": sql} for n, site, sql in self.repeated(threshold)
+            ],
+        }
+
+
+def _record(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.queries.append(Query(
+            context["connection"].alias, normalise(sql), call_site(), (time.perf_counter() - started) * 1000,
+        ))
+
+
+@receiver(connection_created)
+def install_wrapper(sender, connection, **kwargs):
+    # connection_created fires again on reconnect; the wrapper list survives
+    if enabled() and _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+class QueryInspectorMiddleware:
+    """Records the request's queries; enforces @query_budget; reports to staff."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = request._query_recorder = Recorder(request.path)
+        token = _recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        user = getattr(request, "user", None)
+        return self.finish(recorder, response, user is not None and user.is_staff)
+
+    async def __acall__(self, request):
+        recorder = request._query_recorder = Recorder(request.path)
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        is_staff = hasattr(request, "auser") and (await request.auser()).is_staff
+        return self.finish(recorder, response, is_staff)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = request._query_recorder
+        recorder.view = request.resolver_match.view_name
+        recorder.budget = getattr(view_func, "query_budget", None)
+        return None
+
+    def finish(self, recorder, response, is_staff):
+        summary = recorder.summary()
+        RECENT.append(summary)
+        for group in summary["n_plus_one"]:
+            logger.warning("Likely N+1 in %s: %s ran %d times: %s",
+                           recorder.view or recorder.path, group["site"], group["count"], group["sql"][:300])
+        if is_staff:
+            header = f"{summary['queries']} queries in {summary['ms']:.1f} ms"
+            if recorder.budget is not None:
+                header += f"; budget {recorder.budget}"
+            if summary["n_plus_one"]:
+                header += "; likely N+1: " + ", ".join(
+                    f"{g['site']} x{g['count']}" for g in summary["n_plus_one"][:3]
+                )
+            response["X-Query-Count"] = header
+        if recorder.budget is not None and summary["queries"] > recorder.budget:
+            message = f"{recorder.view} ran {summary['queries']} queries (budget {recorder.budget})"
+            if getattr(settings, "QUERY_BUDGET_MODE", "log") == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
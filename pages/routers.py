@@ -0,0 +1,37 @@
+"""
+Database routing for an optional read replica.
+
+Reads of this app's models go to the "replica" alias only while a request is
+inside a read-only view (flagged by pages.middleware.ReadReplicaMiddleware).
+Everything else, including auth and sessions, stays on "default" so a
+freshly written row is never looked up on a lagging replica.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA = "replica"
+
+use_replica = ContextVar("use_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "pages" and use_replica.get() and replica_configured():
+            return REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Let `migrate --database=replica` build a local stand-in
+        return None
@@ -0,0 +1,218 @@
+"""
+Full-text course search.
+
+One search document per course, built from the course title/category/short
+description plus its module titles/intros and lesson titles/summaries:
+
+  * SQLite:   FTS5 virtual table (rowid = course id), ranked with bm25(),
+              prefix indexes, typo tolerance via the fts5vocab term list.
+  * Postgres: tsvector table with a GIN index, ranked with ts_rank(),
+              prefix matching via :* (no typo correction).
+  * Anything else (or FTS5 compiled out): falls back to icontains.
+
+The index lives in the same database as the content and is rewritten by
+signals inside the editing transaction, so it commits or rolls back with it.
+"""
+import difflib
+import re
+
+from django.db import OperationalError, connection, connections, router
+
+TABLE = "pages_coursesearch"
+VOCAB = "pages_coursesearch_vocab"
+
+MAX_TERMS = 8
+# bm25 column weights: title, category, short_desc, body
+WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+_available = None
+
+
+# ----- Schema (used by migration 0011) -----
+def create_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+                "title, category, short_desc, body, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        except OperationalError:
+            return  # SQLite built without FTS5: search falls back to icontains
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {VOCAB} USING fts5vocab({TABLE}, 'row')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE} "
+            "(course_id bigint PRIMARY KEY, document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TABLE}_document_idx ON {TABLE} USING GIN (document)"
+        )
+
+
+def drop_index(schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {VOCAB}")
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def is_available():
+    global _available
+    if _available is None:
+        _available = (
+            connection.vendor in ("sqlite", "postgresql")
+            and TABLE in connection.introspection.table_names()
+        )
+    return _available
+
+
+# ----- Indexing -----
+def build_documents(course_ids, Course, Module, Lesson):
+    """
+    {course_id: (title, category, short_desc, body)} in three queries.
+    Takes the model classes so migrations can pass their historical models.
+    """
+    docs = {
+        pk: [title, category, short_desc, []]
+        for pk, title, category, short_desc in Course.objects.filter(pk__in=course_ids)
+        .values_list("pk", "title", "category", "short_desc")
+    }
+    for course_id, title, intro in (
+        Module.objects.filter(course_id__in=docs).values_list("course_id", "title", "intro")
+    ):
+        docs[course_id][3] += [title, intro]
+    for course_id, title, summary in (
+        Lesson.objects.filter(module__course_id__in=docs)
+        .values_list("module__course_id", "title", "summary")
+    ):
+        docs[course_id][3] += [title, summary]
+    return {
+        pk: (title, category or "", short_desc or "", "\n".join(filter(None, body)))
+        for pk, (title, category, short_desc, body) in docs.items()
+    }
+
+
+def write_documents(conn, docs, removed=()):
+    """Upsert `docs` (from build_documents) and drop `removed` course ids."""
+    gone = list(removed) + list(docs)
+    with conn.cursor() as cur:
+        if conn.vendor == "sqlite":
+            if gone:
+                cur.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(pk,) for pk in gone])
+            cur.executemany(
+                f"INSERT INTO {TABLE} (rowid, title, category, short_desc, body) VALUES (%s, %s, %s, %s, %s)",
+                [(pk, *doc) for pk, doc in docs.items()],
+            )
+        elif conn.vendor == "postgresql":
+            if removed:
+                cur.execute(f"DELETE FROM {TABLE} WHERE course_id = ANY(%s)", [list(removed)])
+            cur.executemany(
+                f"INSERT INTO {TABLE} (course_id, document) VALUES (%s, "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'D')) "
+                "ON CONFLICT (course_id) DO UPDATE SET document = EXCLUDED.document",
+                [(pk, *doc) for pk, doc in docs.items()],
+            )
+
+
+def reindex(course_ids):
+    """Rebuild the documents of the given courses (missing ones are dropped)."""
+    if not is_available():
+        return
+    from .models import Course, Module, Lesson
+
+    course_ids = set(filter(None, course_ids))
+    if not course_ids:
+        return
+    docs = build_documents(course_ids, Course, Module, Lesson)
+    write_documents(connection, docs, removed=course_ids - set(docs))
+
+
+def reindex_all(batch_size=500):
+    from .models import Course
+
+    ids = list(Course.objects.order_by("pk").values_list("pk", flat=True))
+    if is_available():
+        with connection.cursor() as cur:
+            cur.execute(f"DELETE FROM {TABLE}")
+    for i in range(0, len(ids), batch_size):
+        reindex(ids[i:i + batch_size])
+    return len(ids)
+
+
+# ----- Querying -----
+def _terms(q):
+    return re.findall(r"\w+", q.lower())[:MAX_TERMS]
+
+
+def _corrections(cur, term):
+    """Close vocabulary terms for a term nothing in the index starts with."""
+    cur.execute(
+        f"SELECT 1 FROM {VOCAB} WHERE term >= %s AND term < %s LIMIT 1",
+        [term, term + "\uffff"],
+    )
+    if cur.fetchone():
+        return []
+    # Typos rarely hit the first two letters; that keeps the scan small
+    cur.execute(
+        f"SELECT term FROM {VOCAB} WHERE term >= %s AND term < %s "
+        "AND length(term) BETWEEN %s AND %s",
+        [term[:2], term[:2] + "\uffff", len(term) - 2, len(term) + 2],
+    )
+    vocab = [row[0] for row in cur.fetchall()]
+    return difflib.get_close_matches(term, vocab, n=3, cutoff=0.75)
+
+
+def _read_connection():
+    # Follows the read replica routing of the catalog views
+    from .models import Course
+
+    return connections[router.db_for_read(Course)]
+
+
+def _sqlite_ids(terms, limit):
+    clauses = []
+    with _read_connection().cursor() as cur:
+        for term in terms:
+            options = [f'"{term}"*']
+            if len(term) >= 4:
+                options += [f'"{alt}"' for alt in _corrections(cur, term)]
+            clauses.append("(" + " OR ".join(options) + ")")
+        cur.execute(
+            f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s "
+            f"ORDER BY bm25({TABLE}, {', '.join(map(str, WEIGHTS))}) LIMIT %s",
+            [" AND ".join(clauses), limit],
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def _postgres_ids(terms, limit):
+    query = " & ".join(f"{term}:*" for term in terms)
+    with _read_connection().cursor() as cur:
+        cur.execute(
+            f"SELECT course_id FROM {TABLE}, to_tsquery('simple', %s) query "
+            "WHERE document @@ query ORDER BY ts_rank(document, query) DESC LIMIT %s",
+            [query, limit],
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def search_course_ids(q, limit=200):
+    """
+    Course ids matching `q`, best first, or None when no index is available
+    (the caller should fall back to a plain filter).
+    """
+    if not is_available():
+        return None
+    terms = _terms(q)
+    if not terms:
+        return []
+    if connection.vendor == "sqlite":
+        return _sqlite_ids(terms, limit)
+    return _postgres_ids(terms, limit)
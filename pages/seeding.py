@@ -0,0 +1,337 @@
+"""
+Diff-based course seeding.
+
+Course definitions live in JSON (or YAML, when PyYAML is installed) files:
+a course object, a list of them, or {"courses": [...]}. Each course has
+slug/title/category/short_desc/is_active and modules -> lessons -> quiz ->
+questions -> choices ([text, is_correct] pairs or {"text", "is_correct"}).
+
+sync() loads the current rows of every level with one query each, then
+applies only the differences with bulk_create/bulk_update (and deletes), all
+in one transaction. Rows are matched by natural keys: course slug, module
+index, lesson index, question text within its quiz and choice text within
+its question, so unchanged questions and choices keep their ids (and the
+QuizAttempt.raw_answers that reference them stay valid).
+
+Bulk operations skip signals, so counters, progress, the search index and
+the content versions are refreshed explicitly at the end.
+"""
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.db import transaction
+
+from . import counters, pagecache, progress, search
+from .models import Choice, Course, Enrollment, Lesson, Module, Question, Quiz
+from .versions import bump_version
+
+try:
+    import yaml
+except ImportError:  # optional: JSON works without it
+    yaml = None
+
+SEED_DIR = Path(__file__).resolve().parent / "seed_data"
+DEFAULT_PASS_MARK = 60
+
+
+class SeedError(ValueError):
+    pass
+
+
+# ----- Loading -----
+def _read(path):
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in (".yaml", ".yml"):
+        if yaml is None:
+            raise SeedError(f"{path}: install PyYAML to read YAML seed files")
+        return yaml.safe_load(text)
+    try:
+        return json.loads(text)
+    except ValueError as exc:
+        raise SeedError(f"{path}: {exc}")
+
+
+def load_definitions(paths=None):
+    """Course definitions from files and/or directories (default: SEED_DIR)."""
+    files = []
+    for path in map(Path, paths or [SEED_DIR]):
+        if path.is_dir():
+            files += sorted(p for p in path.iterdir() if p.suffix in (".json", ".yaml", ".yml"))
+        elif path.exists():
+            files.append(path)
+        else:
+            raise SeedError(f"{path}: no such file or directory")
+    courses = []
+    for path in files:
+        data = _read(path)
+        if isinstance(data, dict) and "courses" in data:
+            data = data["courses"]
+        courses += data if isinstance(data, list) else [data]
+    return [_normalise(c) for c in courses]
+
+
+def _choice(value):
+    if isinstance(value, dict):
+        return value["text"], bool(value.get("is_correct", False))
+    text, is_correct = value
+    return text, bool(is_correct)
+
+
+def _normalise(course):
+    try:
+        slug = course["slug"]
+        return {
+            "slug": slug,
+            "title": course["title"],
+            "category": course.get("category", ""),
+            "short_desc": course.get("short_desc", ""),
+            "is_active": course.get("is_active", True),
+            "modules": [
+                {
+                    "index": m["index"],
+                    "title": m["title"],
+                    "intro": m.get("intro", ""),
+                    "lessons": [
+                        {
+                            "index": l["index"],
+                            "title": l["title"],
+                            "youtube_url": l.get("youtube_url", ""),
+                            "summary": l.get("summary", ""),
+                            "pass_mark": (l.get("quiz") or {}).get("pass_mark", DEFAULT_PASS_MARK),
+                            "questions": [
+                                {"text": q["text"], "choices": [_choice(c) for c in q.get("choices", [])]}
+                                for q in (l.get("quiz") or {}).get("questions", [])
+                            ],
+                        }
+                        for l in m.get("lessons", [])
+                    ],
+                }
+                for m in course.get("modules", [])
+            ],
+        }
+    except (KeyError, TypeError, ValueError, AttributeError) as exc:
+        raise SeedError(f"Malformed course definition: {exc!r}")
+
+
+# ----- Diffing -----
+@dataclass
+class SeedReport:
+    created: dict = field(default_factory=dict)
+    updated: dict = field(default_factory=dict)
+    deleted: dict = field(default_factory=dict)
+    courses: list = field(default_factory=list)
+
+    def count(self, bucket, model, n):
+        if n:
+            getattr(self, bucket)[model.__name__] = getattr(self, bucket).get(model.__name__, 0) + n
+
+    @property
+    def changed(self):
+        return bool(self.created or self.updated or self.deleted)
+
+    def summary(self):
+        def fmt(bucket):
+            return ", ".join(f"{n} {name}" for name, n in bucket.items()) or "nothing"
+        return (f"{len(self.courses)} course(s): created {fmt(self.created)}; "
+                f"updated {fmt(self.updated)}; deleted {fmt(self.deleted)}.")
+
+
+class _Level:
+    """Matches wanted rows to existing ones and queues the writes for one model."""
+
+    def __init__(self, model, fields, report):
+        self.model = model
+        self.fields = fields
+        self.report = report
+        self.create, self.update = [], []
+        self.keep = set()
+
+    def sync(self, existing, wanted_values, **parent):
+        """
+        existing: the current instance (or None); wanted_values: {field: value}.
+        Returns the instance the children should hang off.
+        """
+        if existing is None:
+            obj = self.model(**parent, **wanted_values)
+            self.create.append(obj)
+            return obj
+        self.keep.add(existing.pk)
+        if any(getattr(existing, f) != v for f, v in wanted_values.items()):
+            for f, v in wanted_values.items():
+                setattr(existing, f, v)
+            self.update.append(existing)
+        return existing
+
+    def flush(self):
+        if self.create:
+            self.model.objects.bulk_create(self.create, batch_size=500)
+        if self.update:
+            self.model.objects.bulk_update(self.update, self.fields, batch_size=500)
+        self.report.count("created", self.model, len(self.create))
+        self.report.count("updated", self.model, len(self.update))
+
+    @property
+    def pending(self):
+        return len(self.create) + len(self.update)
+
+    def delete_missing(self, queryset):
+        stale = queryset.exclude(pk__in=self.keep | {o.pk for o in self.create})
+        n = stale.count()
+        if n:
+            stale.delete()
+            self.report.count("deleted", self.model, n)
+
+
+def _by_key(queryset, key):
+    """{key: [rows...]}: duplicate texts are matched one row at a time."""
+    rows = {}
+    for obj in queryset:
+        rows.setdefault(key(obj), []).append(obj)
+    return rows
+
+
+def _take(rows, key):
+    matches = rows.get(key)
+    if not matches:
+        return None
+    obj = matches.pop(0)
+    if not matches:
+        del rows[key]
+    return obj
+
+
+def _refetch(objs, queryset, key):
+    """Fill in pks the backend couldn't return from bulk_create."""
+    missing = [o for o in objs if o.pk is None]
+    if missing:
+        pks = {key(o): o.pk for o in queryset}
+        for o in missing:
+            o.pk = pks[key(o)]
+
+
+def sync(definitions, prune=False):
+    """
+    Make the database match `definitions` (from load_definitions).
+    With prune, modules/lessons missing from a definition are deleted too;
+    questions and choices of seeded quizzes always mirror the definition.
+    """
+    report = SeedReport(courses=[d["slug"] for d in definitions])
+    slugs = report.courses
+    if len(set(slugs)) != len(slugs):
+        raise SeedError("A course slug is defined more than once.")
+
+    with transaction.atomic():
+        # Courses
+        level = _Level(Course, ["title", "category", "short_desc", "is_active"], report)
+        current = {c.slug: c for c in Course.objects.filter(slug__in=slugs)}
+        courses = {}
+        for d in definitions:
+            courses[d["slug"]] = level.sync(current.get(d["slug"]), {
+                f: d[f] for f in ("title", "category", "short_desc", "is_active")
+            }, slug=d["slug"])
+        level.flush()
+        _refetch(level.create, Course.objects.filter(slug__in=slugs), lambda c: c.slug)
+        course_ids = [c.pk for c in courses.values()]
+
+        # Modules
+        level = _Level(Module, ["title", "intro"], report)
+        current = {(m.course_id, m.index): m for m in Module.objects.filter(course_id__in=course_ids)}
+        modules = {}
+        for d in definitions:
+            course = courses[d["slug"]]
+            for md in d["modules"]:
+                modules[(course.pk, md["index"])] = (md, level.sync(
+                    current.get((course.pk, md["index"])),
+                    {"title": md["title"], "intro": md["intro"]}, course=course, index=md["index"],
+                ))
+        level.flush()
+        _refetch(level.create, Module.objects.filter(course_id__in=course_ids), lambda m: (m.course_id, m.index))
+        if prune:
+            level.delete_missing(Module.objects.filter(course_id__in=course_ids))
+
+        # Lessons
+        level = _Level(Lesson, ["title", "youtube_url", "summary"], report)
+        module_ids = [m.pk for _, m in modules.values()]
+        current = {(l.module_id, l.index): l for l in Lesson.objects.filter(module_id__in=module_ids)}
+        lessons = []
+        for md, module in modules.values():
+            for ld in md["lessons"]:
+                lessons.append((ld, level.sync(
+                    current.get((module.pk, ld["index"])),
+                    {"title": ld["title"], "youtube_url": ld["youtube_url"], "summary": ld["summary"]},
+                    module=module, index=ld["index"],
+                )))
+        level.flush()
+        _refetch(level.create, Lesson.objects.filter(module_id__in=module_ids), lambda l: (l.module_id, l.index))
+        if prune:
+            level.delete_missing(Lesson.objects.filter(module_id__in=module_ids))
+
+        # Quizzes (one per lesson, like the admin-created ones)
+        level = _Level(Quiz, ["title", "is_active", "pass_mark"], report)
+        lesson_ids = [l.pk for _, l in lessons]
+        current = {q.lesson_id: q for q in Quiz.objects.filter(lesson_id__in=lesson_ids)}
+        quizzes = []
+        for ld, lesson in lessons:
+            quizzes.append((ld, level.sync(
+                current.get(lesson.pk),
+                {"title": f"{ld['title']} Quiz", "is_active": True, "pass_mark": ld["pass_mark"]},
+                lesson=lesson,
+            )))
+        level.flush()
+        _refetch(level.create, Quiz.objects.filter(lesson_id__in=lesson_ids), lambda q: q.lesson_id)
+        touched_quizzes = {q.pk for q in level.create + level.update}
+
+        # Questions, matched by text within their quiz so ids survive reordering
+        level = _Level(Question, ["order"], report)
+        quiz_ids = [q.pk for _, q in quizzes]
+        current = _by_key(Question.objects.filter(quiz_id__in=quiz_ids).order_by("order", "id"),
+                          lambda q: (q.quiz_id, q.text))
+        questions = []
+        for ld, quiz in quizzes:
+            for order, qd in enumerate(ld["questions"], start=1):
+                question = level.sync(_take(current, (quiz.pk, qd["text"])), {"order": order},
+                                      quiz=quiz, text=qd["text"])
+                questions.append((qd, question))
+        level.flush()
+        _refetch(level.create, Question.objects.filter(quiz_id__in=quiz_ids), lambda q: (q.quiz_id, q.text))
+        touched_quizzes |= {q.quiz_id for q in level.create + level.update}
+        touched_quizzes |= {quiz_id for quiz_id, _ in current}  # questions about to go
+        level.delete_missing(Question.objects.filter(quiz_id__in=quiz_ids))
+
+        # Choices, matched by text within their question
+        level = _Level(Choice, ["is_correct"], report)
+        quiz_of = {q.pk: q.quiz_id for _, q in questions}
+        current = _by_key(Choice.objects.filter(question_id__in=list(quiz_of)).order_by("id"),
+                          lambda c: (c.question_id, c.text))
+        for qd, question in questions:
+            before = level.pending
+            for text, is_correct in qd["choices"]:
+                level.sync(_take(current, (question.pk, text)), {"is_correct": is_correct},
+                           question=question, text=text)
+            if level.pending != before:
+                touched_quizzes.add(question.quiz_id)
+        touched_quizzes |= {quiz_of[question_id] for question_id, _ in current}
+        level.flush()
+        level.delete_missing(Choice.objects.filter(question_id__in=list(quiz_of)))
+
+        if report.changed:
+            _refresh_derived(course_ids, touched_quizzes)
+    return report
+
+
+def _refresh_derived(course_ids, quiz_ids):
+    """What the model signals would have done for the bulk writes above."""
+    courses = Course.objects.filter(pk__in=course_ids)
+    counters.recount(courses)
+    progress.recompute(Enrollment.objects.filter(course_id__in=course_ids))
+    search.reindex(course_ids)
+
+    def bump():
+        for course_id in course_ids:
+            bump_version("curriculum", course_id)
+        for quiz_id in quiz_ids:
+            bump_version("quiz", quiz_id)
+        pagecache.bump_catalog()
+
+    transaction.on_commit(bump)
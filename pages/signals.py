@@ -1,12 +1,232 @@
 # pages/signals.py
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import UserProfile
+from .models import (
+    UserProfile, Course, Enrollment, Module, Lesson, Resource, Quiz, Question, Choice
+)
+from .versions import bump_version
+from . import blobstore, counters, pagecache, progress, search, static_quizzes
 
 User = get_user_model()
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
-        UserProfile.objects.get_or_create(user=instance)
\ No newline at end of file
+        UserProfile.objects.get_or_create(user=instance)
+
+
+# ----- Course counters & enrollment progress -----
+@receiver(post_save, sender=Enrollment)
+def enrollment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        progress.recompute(Enrollment.objects.filter(pk=instance.pk))
+
+def _origin_is(origin, model):
+    """Whether a delete started at `model` (an instance or a queryset of it)."""
+    return isinstance(origin, model) or getattr(origin, "model", None) is model
+
+def _cascaded(origin, sender):
+    """
+    Whether this row goes with a deleted parent of the catalog (a course
+    taking its modules and lessons, a module its lessons), whose own
+    receivers account for the whole subtree.
+    """
+    return origin is not None and not _origin_is(origin, sender)
+
+def _course_of_module(module_id):
+    return Module.objects.filter(pk=module_id).values_list("course_id", flat=True).first()
+
+def _old_value(instance, field):
+    """The stored value of `field` before this save (None for new rows)."""
+    if instance._state.adding:
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+@receiver(pre_save, sender=Module)
+def module_saving(sender, instance, raw=False, **kwargs):
+    instance._old_course_id = None if raw else _old_value(instance, "course_id")
+
+@receiver(post_save, sender=Module)
+def module_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.modules_changed(instance.course_id, +1)
+    elif instance._old_course_id and instance._old_course_id != instance.course_id:
+        counters.module_moved(instance, instance._old_course_id, instance.course_id)
+
+@receiver(pre_delete, sender=Module)
+def module_removing(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin, sender):
+        return  # the course's counters and enrollments go with it
+    # All of its lessons at once; lesson_removing skips them
+    lessons = Lesson.objects.filter(module_id=instance.pk)
+    progress.lessons_removed(lessons, instance.course_id)
+    counters.modules_changed(instance.course_id, -1)
+    counters.lessons_changed(instance.course_id, -lessons.count())
+
+@receiver(pre_save, sender=Lesson)
+def lesson_saving(sender, instance, raw=False, **kwargs):
+    instance._old_course_id = None if raw else _old_value(instance, "module__course_id")
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    course_id = instance._course_id = _course_of_module(instance.module_id)
+    if created:
+        counters.lessons_changed(course_id, +1)
+    elif instance._old_course_id and instance._old_course_id != course_id:
+        counters.lesson_moved(instance, instance._old_course_id, course_id)
+
+@receiver(pre_delete, sender=Lesson)
+def lesson_removing(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin, sender):
+        return  # counted by module_removing, or gone with the course
+    course_id = _course_of_module(instance.module_id)
+    progress.lessons_removed(Lesson.objects.filter(pk=instance.pk), course_id)
+    counters.lessons_changed(course_id, -1)
+
+# LessonCompletion deliberately has no receivers: any would turn the
+# cascade from a Lesson/User delete into one query and signal per row.
+# Direct deletes happen in the admin, which recomputes the counters.
+
+
+# ----- Course search index -----
+# Signals below are connected after the counter handlers above, so
+# `_old_course_id` is already set when a module/lesson moves between courses.
+@receiver([post_save, post_delete], sender=Course)
+def course_search_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.reindex([instance.pk])
+
+@receiver([post_save, post_delete], sender=Module)
+def module_search_changed(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and not _cascaded(origin, sender):
+        search.reindex([instance.course_id, getattr(instance, "_old_course_id", None)])
+
+@receiver(post_save, sender=Lesson)
+def lesson_search_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.reindex([instance._course_id, instance._old_course_id])
+
+@receiver(post_delete, sender=Lesson)
+def lesson_search_deleted(sender, instance, origin=None, **kwargs):
+    if not _cascaded(origin, sender):
+        search.reindex([_course_of_module(instance.module_id)])
+
+
+# ----- Curriculum snapshot versions -----
+def _bump_curriculum(*course_ids):
+    for course_id in set(filter(None, course_ids)):
+        transaction.on_commit(lambda c=course_id: bump_version("curriculum", c))
+
+def _course_of_lesson(lesson_id):
+    return (Lesson.objects.filter(pk=lesson_id)
+            .values_list("module__course_id", flat=True).first())
+
+@receiver([post_save, post_delete], sender=Module)
+def module_curriculum_changed(sender, instance, origin=None, **kwargs):
+    if not _cascaded(origin, sender):
+        _bump_curriculum(instance.course_id, getattr(instance, "_old_course_id", None))
+
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_curriculum_changed(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin, sender):
+        return  # the module's receiver bumps the course
+    course_id = getattr(instance, "_course_id", None) or _course_of_module(instance.module_id)
+    _bump_curriculum(course_id, getattr(instance, "_old_course_id", None))
+
+@receiver(pre_save, sender=Resource)
+def resource_saving(sender, instance, raw=False, **kwargs):
+    instance._old_course_id = None if raw else _old_value(instance, "lesson__module__course_id")
+
+@receiver([post_save, post_delete], sender=Resource)
+def resource_changed(sender, instance, origin=None, **kwargs):
+    if not _cascaded(origin, sender):
+        _bump_curriculum(_course_of_lesson(instance.lesson_id), getattr(instance, "_old_course_id", None))
+
+
+# ----- Catalog version (cached catalog pages) -----
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Module)
+@receiver([post_save, post_delete], sender=Lesson)
+def catalog_changed(sender, instance, origin=None, **kwargs):
+    if not _cascaded(origin, sender):
+        transaction.on_commit(pagecache.bump_catalog)
+
+
+# ----- Quiz content versions (answer-key cache) -----
+def _bump_quiz(quiz_id):
+    # After commit, so a reader can't cache pre-edit rows under the new version
+    if quiz_id:
+        transaction.on_commit(lambda: bump_version("quiz", quiz_id))
+
+@receiver([post_save, post_delete], sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    _bump_quiz(instance.pk)
+    if kwargs["signal"] is post_delete:
+        static_quizzes.reset()
+
+def _quiz_of_question(question_id):
+    return (Question.objects.filter(pk=question_id)
+            .values_list("quiz_id", flat=True).first())
+
+@receiver(pre_save, sender=Question)
+def question_moving(sender, instance, **kwargs):
+    # A question re-assigned to another quiz must invalidate both quizzes
+    if not instance._state.adding:
+        _bump_quiz(_quiz_of_question(instance.pk))
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    _bump_quiz(instance.quiz_id)
+
+@receiver(pre_save, sender=Choice)
+def choice_moving(sender, instance, **kwargs):
+    if not instance._state.adding:
+        old_question_id = (Choice.objects.filter(pk=instance.pk)
+                           .values_list("question_id", flat=True).first())
+        if old_question_id and old_question_id != instance.question_id:
+            _bump_quiz(_quiz_of_question(old_question_id))
+
+@receiver([post_save, post_delete], sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    if Choice.question.is_cached(instance):
+        quiz_id = instance.question.quiz_id
+    else:
+        quiz_id = _quiz_of_question(instance.question_id)
+    _bump_quiz(quiz_id)
+
+
+# ----- Blob reference counts (pages.blobstore) -----
+@receiver(pre_save, sender=Resource)
+@receiver(pre_save, sender=UserProfile)
+def blob_reference_saving(sender, instance, raw=False, **kwargs):
+    instance._old_blobs = set()
+    if not raw and not instance._state.adding:
+        fields = blobstore.REFERENCES[sender._meta.label]
+        old = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+        instance._old_blobs = blobstore.names_in(list(old or ()))
+
+@receiver(post_save, sender=Resource)
+@receiver(post_save, sender=UserProfile)
+def blob_reference_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    fields = blobstore.REFERENCES[sender._meta.label]
+    new = blobstore.names_in([getattr(instance, f) for f in fields])
+    old = instance._old_blobs
+    for name in new - old:
+        blobstore.retain(name)
+    for name in old - new:
+        blobstore.release(name)
+
+@receiver(post_delete, sender=Resource)
+@receiver(post_delete, sender=UserProfile)
+def blob_reference_deleted(sender, instance, **kwargs):
+    fields = blobstore.REFERENCES[sender._meta.label]
+    for name in blobstore.names_in([getattr(instance, f) for f in fields]):
+        blobstore.release(name)
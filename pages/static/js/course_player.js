@@ -0,0 +1,94 @@
+// Year
+document.getElementById('year').textContent = new Date().getFullYear();
+
+// Mobile sidebar toggle
+const sidebar = document.getElementById('sidebar');
+const toggleBtn = document.getElementById('sideToggle');
+toggleBtn.addEventListener('click', () => {
+  const open = sidebar.classList.toggle('open');
+  toggleBtn.setAttribute('aria-expanded', open ? 'true' : 'false');
+});
+
+// CSRF cookie
+function getCookie(name) {
+  const value = `; ${document.cookie}`;
+  const parts = value.split(`; ${name}=`);
+  if (parts.length === 2) return decodeURIComponent(parts.pop().split(';').shift());
+}
+const csrftoken = getCookie('csrftoken');
+
+// This learner's completed lessons on top of the shared curriculum markup
+const completedIds = new Set(JSON.parse(document.getElementById('completedLessons').textContent).map(String));
+document.querySelectorAll('.mark-complete').forEach(btn => {
+  if (completedIds.has(btn.dataset.lesson)) {
+    btn.classList.add('completed');
+    btn.textContent = 'Completed ✓';
+  }
+});
+
+// Toggle completion -> POST to API
+document.querySelectorAll('.mark-complete').forEach(btn => {
+  const lessonId = btn.dataset.lesson;
+  btn.addEventListener('click', async () => {
+    const setTo = !btn.classList.contains('completed');
+    try {
+      const res = await fetch(document.body.dataset.toggleUrl, {
+        method: "POST",
+        headers: { "X-CSRFToken": csrftoken, "Accept":"application/json" },
+        body: new URLSearchParams({ lesson_id: lessonId, completed: String(setTo) })
+      });
+      if (!res.ok) throw new Error('Network');
+      const data = await res.json();
+      if (data.ok) {
+        btn.classList.toggle('completed', data.completed);
+        btn.textContent = data.completed ? 'Completed ✓' : 'Mark complete';
+        updateModuleCompletionBadges();
+      }
+    } catch (e) { console.error(e); }
+  });
+});
+
+// Badge when all lessons in a module are done
+function updateModuleCompletionBadges(){
+  const steps = Array.from(document.querySelectorAll('.module-step'));
+  const meta = JSON.parse(document.getElementById('moduleLessons').textContent || "[]");
+  steps.forEach(btn => {
+    const anchor = (btn.getAttribute('data-target') || '').replace('#','');
+    const m = meta.find(x => x.anchor === anchor);
+    if (!m) return;
+    const allDone = m.lesson_ids.length > 0 && m.lesson_ids.every(id => {
+      const b = document.querySelector('.mark-complete[data-lesson="'+id+'"]');
+      return b && b.classList.contains('completed');
+    });
+    btn.classList.toggle('completed', allDone);
+    btn.title = allDone ? 'All lessons complete' : '';
+  });
+}
+updateModuleCompletionBadges();
+
+// Progression: highlight active module by scroll
+const moduleSections = Array.from(document.querySelectorAll('section[id^="module"]'));
+const stepButtons = Array.from(document.querySelectorAll('.module-step'));
+function setActiveById(id){
+  stepButtons.forEach(btn => {
+    const target = btn.getAttribute('data-target');
+    const active = target === ('#' + id);
+    btn.classList.toggle('active', active);
+    btn.setAttribute('aria-selected', active ? 'true' : 'false');
+  });
+}
+const io = new IntersectionObserver((entries) => {
+  const visible = entries.filter(e => e.isIntersecting)
+                         .sort((a,b) => a.boundingClientRect.top - b.boundingClientRect.top);
+  if(visible[0]) setActiveById(visible[0].target.id);
+}, { rootMargin: "-30% 0px -60% 0px", threshold: 0.01 });
+moduleSections.forEach(s => io.observe(s));
+
+// Click to scroll
+stepButtons.forEach(btn => {
+  btn.addEventListener('click', () => {
+    const sel = btn.getAttribute('data-target');
+    const target = document.querySelector(sel);
+    if(target){ target.scrollIntoView({behavior:'smooth', block:'start'}); target.focus({preventScroll:true}); }
+  });
+});
@@ -0,0 +1,49 @@
+// Initials in the avatar from course title (e.g., "Web Development" → "WD")
+document.querySelectorAll('.js-initials').forEach(el=>{
+  const t = (el.dataset.title || '').trim();
+  const parts = t.split(/\s+/).slice(0,2);
+  const letters = parts.map(p=>p[0]?.toUpperCase()||'').join('');
+  el.textContent = letters || 'C';
+});
+
+// Build category chips dynamically from cards
+const grid = document.getElementById('courseGrid');
+const chipWrap = document.getElementById('chips');
+const cols = Array.from(document.querySelectorAll('.course-col'));
+const cats = Array.from(new Set(cols.map(c => (c.dataset.cat||'Uncategorised')))).sort();
+const makeChip = (label, active=false) => {
+  const b = document.createElement('button');
+  b.type = 'button';
+  b.className = 'chip' + (active ? ' active' : '');
+  b.textContent = label;
+  b.dataset.cat = label;
+  b.addEventListener('click', ()=>{
+    Array.from(chipWrap.querySelectorAll('.chip')).forEach(x=>x.classList.remove('active'));
+    b.classList.add('active');
+    filter(label);
+  });
+  return b;
+};
+if (cats.length){
+  chipWrap.appendChild(makeChip('All', true));
+  cats.forEach(c => chipWrap.appendChild(makeChip(c)));
+}
+
+function filter(cat){
+  cols.forEach(col=>{
+    const ok = (cat==='All') || (col.dataset.cat===cat);
+    col.style.display = ok ? '' : 'none';
+  });
+}
+
+// If user typed a search, also client-filter instantly (in addition to server)
+const qInput = document.getElementById('qInput');
+if(qInput){
+  qInput.addEventListener('input', ()=>{
+    const q = qInput.value.trim().toLowerCase();
+    cols.forEach(col=>{
+      const txt = col.innerText.toLowerCase();
+      col.style.display = txt.includes(q) ? '' : 'none';
+    });
+  });
+}
@@ -0,0 +1,93 @@
+// Pull courses from server JSON
+// const courses = JSON.parse(document.getElementById('rcic-courses').textContent || '[]');
+
+const courses = window.__COURSES__ || [];
+
+// --- State ---
+const state = { search:'', category:'', status:'', theme: localStorage.getItem('rcic:theme') || 'light' };
+
+// --- DOM refs ---
+const grid = document.getElementById('courseGrid');
+const emptyState = document.getElementById('emptyState');
+const search = document.getElementById('search');
+const sideSearch = document.getElementById('sideSearch');
+const filterCategory = document.getElementById('filterCategory');
+const filterStatus = document.getElementById('filterStatus');
+const themeBtn = document.getElementById('themeBtn');
+const badgeCount = document.getElementById('badgeCount');
+const sideToggle = document.getElementById('sideToggle');
+const sidebar = document.getElementById('sidebar');
+
+// Init theme
+document.body.setAttribute('data-theme', state.theme);
+themeBtn.setAttribute('aria-pressed', state.theme === 'dark' ? 'true' : 'false');
+themeBtn.textContent = state.theme === 'dark' ? '☀️ Light' : '🌙 Dark';
+
+// Render
+function render(){
+  const q = state.search.toLowerCase();
+  const list = courses.filter(c=>{
+    const matchesQ = !q || (c.title?.toLowerCase().includes(q)) || (c.desc?.toLowerCase().includes(q));
+    const matchesCat = !state.category || c.category === state.category;
+    const matchesStatus = !state.status || c.status === state.status;
+    return matchesQ && matchesCat && matchesStatus;
+  });
+
+  badgeCount.textContent = courses.length;
+
+  grid.innerHTML = '';
+  if(list.length === 0){
+    emptyState.style.display = 'block';
+    return;
+  }
+  emptyState.style.display = 'none';
+
+  list.forEach(c=>{
+    const card = document.createElement('article');
+    card.className = 'card';
+    card.innerHTML = `
+      <h3>${c.title}</h3>
+      <div class="meta">
+        <span class="chip">${c.category || 'General'}</span>
+        <span class="chip">${c.status || 'In Progress'}</span>
+        ${c.badge ? `<span class="pill gold">${c.badge}</span>`:''}
+      </div>
+      <p class="desc">${c.desc || ''}</p>
+      <div class="ptext">${c.progress ?? 0}% complete</div>
+      <div class="progress" aria-label="${c.title} progress">
+        <span class="bar" style="width:${c.progress ?? 0}%;"></span>
+      </div>
+      <div class="meta">
+        ${(c.tags||[]).map(t=>`<span class="chip">${t}</span>`).join('')}
+      </div>
+      <div class="actions">
+        <a class="btn primary" href="/course/${c.id}/">Continue</a>
+        ${(c.status==='Completed') ? '<span class="pill green">Certificate available</span>' : ''}
+      </div>
+    `;
+    grid.appendChild(card);
+  });
+}
+
+// Events
+search.addEventListener('input', e=>{ state.search = e.target.value; render(); });
+sideSearch.addEventListener('input', e=>{ state.search = e.target.value; search.value = e.target.value; render(); });
+filterCategory.addEventListener('change', e=>{ state.category = e.target.value; render(); });
+filterStatus.addEventListener('change', e=>{ state.status = e.target.value; render(); });
+
+themeBtn.addEventListener('click', ()=>{
+  state.theme = state.theme === 'dark' ? 'light' : 'dark';
+  document.body.setAttribute('data-theme', state.theme);
+  themeBtn.setAttribute('aria-pressed', state.theme === 'dark' ? 'true' : 'false');
+  themeBtn.textContent = state.theme === 'dark' ? '☀️ Light' : '🌙 Dark';
+  localStorage.setItem('rcic:theme', state.theme);
+});
+
+// Sidebar toggle (mobile)
+sideToggle.addEventListener('click', ()=>{
+  const closed = sidebar.classList.toggle('closed');
+  sideToggle.setAttribute('aria-expanded', closed ? 'false' : 'true');
+});
+
+// First render
+render();
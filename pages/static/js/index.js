@@ -0,0 +1,10 @@
+// Year
+document.getElementById('year').textContent = new Date().getFullYear();
+
+// Contact toggle
+const toggle = document.getElementById('toggleContact');
+const card = document.getElementById('contactForm');
+toggle.addEventListener('click', () => {
+  const visible = getComputedStyle(card).display !== 'none';
+  card.style.display = visible ? 'none' : 'flex';
+});
@@ -0,0 +1,26 @@
+// Show / Hide password
+const pwd = document.getElementById('id_password');
+const toggleBtn = document.getElementById('togglePassword');
+toggleBtn.addEventListener('click', () => {
+  const isPwd = pwd.type === 'password';
+  pwd.type = isPwd ? 'text' : 'password';
+  toggleBtn.innerHTML = isPwd ? '<i class="bi bi-eye-slash"></i>' : '<i class="bi bi-eye"></i>';
+  toggleBtn.setAttribute('aria-label', isPwd ? 'Hide password' : 'Show password');
+});
+
+// Client-side validation (optional)
+const form = document.getElementById('loginForm');
+form.addEventListener('submit', (e) => {
+  if (!form.checkValidity()) {
+    e.preventDefault();
+    form.classList.add('was-validated');
+  }
+});
+
+// Remember me → session expiry
+const remember = document.getElementById('rememberMe');
+if (remember) {
+  remember.addEventListener('change', () => {
+    // If you want to control session expiry server-side, handle in view/middleware.
+  });
+}
@@ -0,0 +1,50 @@
+// Shared by the static quizzes 2-8. Each page defines `answers`
+// ({q1: "value"}; checkbox questions list the values sorted: "a,c") and marks
+// its form data-require-answer if a question can't be skipped.
+let score = 0;
+const total = Object.keys(answers).length;
+const requireAnswer = "requireAnswer" in document.getElementById("quizForm").dataset;
+
+// Show first question
+document.getElementById("q1Box").style.display = "block";
+
+function nextQuestion(num) {
+  const feedback = document.getElementById("f" + num);
+  const selected = Array.from(document.querySelectorAll(`input[name="q${num}"]:checked`), input => input.value);
+
+  if (selected.length === 0) {
+    feedback.textContent = "No answer selected.";
+    feedback.className = "feedback incorrect";
+    if (requireAnswer) return;
+  } else if (selected.sort().join(",") === answers[`q${num}`]) {
+    feedback.textContent = "Correct!";
+    feedback.className = "feedback correct";
+    score++;
+  } else {
+    feedback.textContent = "Incorrect!";
+    feedback.className = "feedback incorrect";
+  }
+
+  // Hide current question after feedback delay, show next
+  setTimeout(() => {
+    document.getElementById(`q${num}Box`).style.display = "none";
+    if (num < total) {
+      document.getElementById(`q${num + 1}Box`).style.display = "block";
+    } else {
+      finishQuiz();
+    }
+  }, 1000);
+}
+
+function finishQuiz() {
+  const percentage = (score / total) * 100;
+  document.getElementById("score").textContent = `You scored ${score} out of ${total} (${percentage.toFixed(0)}%)`;
+
+  if (percentage >= 60) {
+    document.getElementById("result").textContent = "Congratulations! You Passed.";
+    document.getElementById("result").className = "pass";
+  } else {
+    document.getElementById("result").textContent = "Sorry, You Failed.";
+    document.getElementById("result").className = "fail";
+  }
+}
@@ -0,0 +1,251 @@
+// Correct answers (keep your mapping)
+const answers = {
+  q1:"9", q2:"9", q3:"7", q4:"8", q5:"8",
+  q6:"6", q7:"6", q8:"9", q9:"6", q10:"7"
+};
+
+const total = Object.keys(answers).length;
+let current = 1;
+let score = 0;
+const selections = {};    // { q1: "value", ... }
+const correctness = {};   // { q1: true/false, ... }
+
+// DOM refs
+const bar = document.getElementById('bar');
+const counter = document.getElementById('counter');
+const prevBtn = document.getElementById('prevBtn');
+const nextBtn = document.getElementById('nextBtn');
+const resultBox = document.getElementById('resultBox');
+const scoreText = document.getElementById('scoreText');
+const passFail = document.getElementById('passFail');
+const review = document.getElementById('review');
+const restartBtn = document.getElementById('restartBtn');
+
+// Init
+updateUI();
+wireOptions();
+
+// Keyboard shortcuts
+document.addEventListener('keydown', (e)=>{
+  if(e.key === 'Enter'){
+    if(nextBtn && !nextBtn.disabled){
+      e.preventDefault();
+      handleNext();
+    }
+  }
+});
+
+prevBtn.addEventListener('click', handlePrev);
+nextBtn.addEventListener('click', handleNext);
+restartBtn.addEventListener('click', restart);
+
+function qBox(n){ return document.getElementById(`q${n}Box`); }
+function feedbackEl(n){ return document.getElementById(`f${n}`); }
+
+function updateProgressVisual(){
+  const percent = ((current-1)/total)*100;
+  bar.style.width = `${percent}%`;
+  counter.textContent = `Q${current} / ${total}`;
+  prevBtn.disabled = current === 1;
+}
+
+function showQuestion(n){
+  for(let i=1;i<=total;i++){ qBox(i).classList.remove('active'); }
+  qBox(n).classList.add('active');
+  restoreState(n);               // re-apply lock & feedback if already answered
+  updateProgressVisual();
+  nextBtn.textContent = (n === total) ? 'Finish ⟶' : 'Next ⟶';
+  nextBtn.disabled = !selections[`q${n}`];
+}
+
+function updateUI(){ showQuestion(current); }
+
+function wireOptions(){
+  for(let i=1;i<=total;i++){
+    const box = qBox(i);
+    box.querySelectorAll('input[type="radio"]').forEach(r=>{
+      r.addEventListener('change', ()=>{
+        // record selection
+        selections[`q${i}`] = r.value;
+        const isCorrect = r.value === answers[`q${i}`];
+        correctness[`q${i}`] = isCorrect;
+
+        // paint current selection
+        paintOptions(i);
+        giveFeedback(i, isCorrect);
+
+        // LOCK this question so it can't be changed until restart
+        lockQuestion(i);
+
+        nextBtn.disabled = false;
+      });
+
+      // Improve radio keyboard nav (only matters before locked)
+      r.addEventListener('keydown', (e)=>{
+        if(r.disabled) return;
+        if(e.key === 'ArrowDown' || e.key === 'ArrowRight'){
+          e.preventDefault();
+          r.closest('label').nextElementSibling?.querySelector('input')?.focus();
+        }
+        if(e.key === 'ArrowUp' || e.key === 'ArrowLeft'){
+          e.preventDefault();
+          r.closest('label').previousElementSibling?.querySelector('input')?.focus();
+        }
+      });
+    });
+  }
+}
+
+function paintOptions(qNum){
+  const box = qBox(qNum);
+  const correctVal = answers[`q${qNum}`];
+  const selectedVal = selections[`q${qNum}`];
+
+  box.querySelectorAll('.option').forEach(lbl=>{
+    const input = lbl.querySelector('input');
+    lbl.classList.remove('correct','incorrect');
+    if(input.value === selectedVal){
+      lbl.classList.add(input.value === correctVal ? 'correct' : 'incorrect');
+    }
+  });
+}
+
+function giveFeedback(qNum, isCorrect){
+  const f = feedbackEl(qNum);
+  f.textContent = isCorrect ? 'Correct!' : 'Incorrect!';
+  f.className = `feedback ${isCorrect ? 'correct' : 'incorrect'}`;
+}
+
+// Disable all radios for a question (lock after answer)
+function lockQuestion(qNum){
+  const box = qBox(qNum);
+  box.querySelectorAll('input[type="radio"]').forEach(r => r.disabled = true);
+  box.querySelectorAll('.option').forEach(lbl => lbl.classList.add('locked'));
+}
+
+// Re-apply state (including locks) when navigating back
+function restoreState(qNum){
+  const box = qBox(qNum);
+  const sel = selections[`q${qNum}`];
+
+  // Reset UI
+  box.querySelectorAll('.option').forEach(lbl => lbl.classList.remove('correct','incorrect','locked'));
+  box.querySelectorAll('input[type="radio"]').forEach(r => {
+    r.checked = false;
+    r.disabled = false;
+  });
+  const f = feedbackEl(qNum);
+  f.textContent = '';
+  f.className = 'feedback';
+
+  // If already answered earlier, repaint + lock
+  if(sel){
+    box.querySelectorAll('input[type="radio"]').forEach(r => { r.checked = (r.value === sel); });
+    paintOptions(qNum);
+    giveFeedback(qNum, sel === answers[`q${qNum}`]);
+    lockQuestion(qNum);
+  }
+}
+
+function handlePrev(){ if(current > 1){ current--; showQuestion(current); } }
+
+function handleNext(){
+  if(!selections[`q${current}`]) return; // guard
+  if(current < total){
+    current++;
+    showQuestion(current);
+  }else{
+    finishQuiz();
+  }
+}
+
+function getCookie(name){
+  const m = document.cookie.match('(^|;)\\s*' + name + '\\s*=\\s*([^;]+)');
+  return m ? m.pop() : '';
+}
+
+function finishQuiz(){
+  // Compute score from correctness
+  score = Object.values(correctness).filter(Boolean).length;
+
+  // UI changes
+  document.getElementById('quizForm').style.display = 'none';
+  document.querySelector('.nav').style.display = 'none';
+  document.querySelector('.progressbar').style.visibility = 'hidden';
+
+  const pct = Math.round((score/total)*100);
+  scoreText.textContent = `You scored ${score} out of ${total} (${pct}%)`;
+  passFail.textContent = (pct >= 60) ? 'Congratulations! You Passed.' : 'Sorry, You Failed.';
+  passFail.className = (pct >= 60) ? 'pass' : 'fail';
+
+
+  const canPost = document.body.dataset.canPost === "true";
+  if (canPost) {
+    const apiUrl = document.body.dataset.apiUrl;
+    const form = new URLSearchParams();
+    form.set("score", String(pct));
+
+    // Optional: also send the chosen labels for later analytics/reporting
+    // Object.keys(selections).forEach(q => form.set(`label_${q}`, labelFor(q, selections[q])));
+
+    fetch(apiUrl, {
+      method: "POST",
+      headers: { "X-CSRFToken": getCookie("csrftoken") },
+      body: form
+    }).catch(()=>{}); // fire-and-forget for now
+  }
+
+
+
+  // Build review table
+  const rows = [];
+  for(let i=1;i<=total;i++){
+    const qName = `q${i}`;
+    const userVal = selections[qName] ?? '—';
+    const correctVal = answers[qName];
+    rows.push(`
+      <tr>
+        <td>Q${i}</td>
+        <td class="${userVal===correctVal ? 'good':'bad'}">${labelFor(qName, userVal)}</td>
+        <td>${labelFor(qName, correctVal)}</td>
+      </tr>
+    `);
+  }
+  review.innerHTML = `
+    <table aria-label="Answer review">
+      <thead><tr><th>Question</th><th>Your Answer</th><th>Correct Answer</th></tr></thead>
+      <tbody>${rows.join('')}</tbody>
+    </table>
+  `;
+  resultBox.style.display = 'block';
+}
+
+function labelFor(qName, val){
+  if(!val) return '—';
+  const input = document.querySelector(`input[name="${qName}"][value="${val}"]`);
+  if(!input) return '—';
+  return input.parentElement.textContent.trim();
+}
+
+function restart(){
+  // reset state
+  for(let k in selections) delete selections[k];
+  for(let k in correctness) delete correctness[k];
+  score = 0; current = 1;
+
+  // reset UI
+  document.getElementById('quizForm').style.display = '';
+  document.querySelector('.nav').style.display = '';
+  document.querySelector('.progressbar').style.visibility = 'visible';
+  resultBox.style.display = 'none';
+
+  // unlock everything
+  for(let i=1;i<=total;i++){
+    const box = qBox(i);
+    box.querySelectorAll('input[type="radio"]').forEach(r=> { r.checked = false; r.disabled = false; });
+    box.querySelectorAll('.option').forEach(lbl=> lbl.classList.remove('correct','incorrect','locked'));
+    const f = feedbackEl(i); f.textContent=''; f.className='feedback';
+  }
+  nextBtn.disabled = true;
+  updateUI();
+}
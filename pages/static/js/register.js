@@ -0,0 +1,83 @@
+// ----- Password visibility
+const pass = document.getElementById('password');
+const confirm = document.getElementById('confirm');
+document.getElementById('togglePass').addEventListener('click', () => {
+  pass.type = pass.type === 'password' ? 'text' : 'password';
+});
+document.getElementById('toggleConfirm').addEventListener('click', () => {
+  confirm.type = confirm.type === 'password' ? 'text' : 'password';
+});
+
+// ----- Password strength + checklist
+const bar = document.getElementById('strengthBar');
+const cLen = document.getElementById('cLen');
+const cNum = document.getElementById('cNum');
+const cSym = document.getElementById('cSym');
+
+function setCheckIcon(el, ok) {
+  el.className = ok ? 'fa-solid fa-check ok' : 'fa-regular fa-circle bad';
+}
+function strength(pw) {
+  let score = 0;
+  const hasLen = pw.length >= 8;
+  const hasNum = /\d/.test(pw);
+  const hasSym = /[^A-Za-z0-9]/.test(pw);
+  score = (hasLen + hasNum + hasSym) / 3;
+  setCheckIcon(cLen, hasLen);
+  setCheckIcon(cNum, hasNum);
+  setCheckIcon(cSym, hasSym);
+  bar.style.width = (score * 100) + '%';
+}
+pass.addEventListener('input', () => {
+  strength(pass.value);
+  // live confirm match validity
+  if (confirm.value.length) confirm.reportValidity();
+});
+
+// ----- Populate timezones
+const tzSelect = document.getElementById('tz');
+const timeZones = Intl.supportedValuesOf ? Intl.supportedValuesOf('timeZone') : [];
+let guessed = Intl.DateTimeFormat().resolvedOptions().timeZone || '';
+tzSelect.innerHTML = '<option value="">Select timezone</option>' +
+  timeZones.map(z => `<option value="${z}" ${z === guessed ? 'selected' : ''}>${z}</option>`).join('');
+
+// ----- Geolocation (country) — best effort without external APIs
+const countryInput = document.getElementById('country');
+try {
+  // Try to infer country from language
+  const lang = navigator.language || '';
+  const countryCode = (lang.split('-')[1] || '').toUpperCase();
+  if (countryCode) countryInput.value = countryCode;
+} catch (e) { }
+
+// ----- Bootstrap validation + confirm match
+const form = document.getElementById('signupForm');
+function passwordsMatch() {
+  return pass.value && confirm.value && pass.value === confirm.value;
+}
+confirm.addEventListener('input', () => {
+  if (!passwordsMatch()) {
+    confirm.setCustomValidity('Passwords do not match');
+  } else {
+    confirm.setCustomValidity('');
+  }
+});
+
+form.addEventListener('submit', (e) => {
+  if (!passwordsMatch()) {
+    confirm.setCustomValidity('Passwords do not match');
+  } else {
+    confirm.setCustomValidity('');
+  }
+
+  if (!form.checkValidity()) {
+    e.preventDefault();
+    e.stopPropagation();
+  } else {
+    // Submit normally or intercept here:
+    // e.preventDefault(); // if handling via fetch()
+    // fetch('/api/register', { method:'POST', body: new FormData(form) })
+    //   .then(r => r.json()).then(console.log);
+  }
+  form.classList.add('was-validated');
+});
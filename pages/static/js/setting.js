@@ -0,0 +1,196 @@
+// Endpoints come from the data-* attributes on <body> (setting.html)
+const URLS = document.body.dataset;
+
+// ---------- CSRF ----------
+function getCookie(name){
+  const m = document.cookie.match('(^|;)\\s*' + name + '\\s*=\\s*([^;]+)'); 
+  return m ? decodeURIComponent(m.pop()) : '';
+}
+const CSRF = getCookie('csrftoken');
+
+// ---------- UI helpers ----------
+const toast = new bootstrap.Toast(document.getElementById('toast'));
+const toastBody = document.getElementById('toastBody');
+const showToast = (msg) => { toastBody.textContent = msg; toast.show(); };
+
+// ---------- Populate selects / defaults ----------
+const tzSel = document.getElementById('timezone');
+const zones = (Intl.supportedValuesOf ? Intl.supportedValuesOf('timeZone') : []);
+const guessed = Intl.DateTimeFormat().resolvedOptions().timeZone || '';
+tzSel.innerHTML = '<option value="">Select timezone</option>' + zones.map(z => `<option value="${z}" ${z===guessed?'selected':''}>${z}</option>`).join('');
+
+// Infer country
+const countryInput = document.getElementById('country');
+const lang = navigator.language || '';
+const inferredCountry = (lang.split('-')[1] || '').toUpperCase();
+if(inferredCountry && !countryInput.value) countryInput.value = inferredCountry;
+
+// Avatar preview
+const avatarInput = document.getElementById('avatarInput');
+const avatarPreview = document.getElementById('avatarPreview');
+const avatarWebp = document.getElementById('avatarWebp');
+function showAvatar(src, webpSrcset = '', jpegSrcset = ''){
+  avatarWebp.srcset = webpSrcset;
+  avatarPreview.srcset = jpegSrcset;
+  avatarPreview.src = src;
+}
+avatarInput.addEventListener('change', (e) => {
+  const file = e.target.files[0];
+  if(!file) return;
+  if(file.size > 10 * 1024 * 1024){
+    showToast('Image too large (max 10MB).');
+    avatarInput.value = '';
+    return;
+  }
+  const reader = new FileReader();
+  reader.onload = (ev) => { showAvatar(ev.target.result); };
+  reader.readAsDataURL(file);
+});
+
+// Toggle password reveal
+document.querySelectorAll('[data-toggle="reveal"]').forEach(btn => {
+  btn.addEventListener('click', () => {
+    const target = document.querySelector(btn.dataset.target);
+    if(!target) return;
+    target.type = target.type === 'password' ? 'text' : 'password';
+  });
+});
+
+// ---------- Load from backend ----------
+async function loadProfileFromAPI(){
+  // GET /api/profile/
+  const r1 = await fetch(URLS.apiProfile, {credentials:'same-origin'});
+  if(!r1.ok) throw new Error('Failed to load profile');
+  const prof = await r1.json();
+
+  document.getElementById('firstName').value = prof.first_name || '';
+  document.getElementById('lastName').value  = prof.last_name || '';
+  document.getElementById('email').value     = prof.email || '';
+  document.getElementById('phone').value     = prof.phone || '';
+  document.getElementById('country').value   = prof.country || (document.getElementById('country').value || '');
+  if (prof.timezone) tzSel.value = prof.timezone;
+  document.getElementById('bio').value       = prof.bio || '';
+  // Thumbnails are made in the background: sized variants once ready
+  if (prof.avatar && prof.avatar.url) showAvatar(prof.avatar.url, prof.avatar.srcset, prof.avatar.jpeg_srcset);
+
+  // GET /api/preferences
+  const r2 = await fetch(URLS.apiPreferences, {credentials:'same-origin'});
+  if(r2.ok){
+    const prefs = await r2.json();
+    (prefs.theme === 'dark' ? document.getElementById('themeDark') : document.getElementById('themeLight')).checked = true;
+    document.getElementById('nAnnouncements').checked = !!prefs.nAnnouncements;
+    document.getElementById('nReminders').checked     = !!prefs.nReminders;
+    document.getElementById('nMarketing').checked     = !!prefs.nMarketing;
+    // live preview theme
+    document.documentElement.setAttribute('data-theme', prefs.theme || 'light');
+  }
+}
+
+// ---------- Profile form submit (multipart) ----------
+const formProfile = document.getElementById('formProfile');
+document.getElementById('resetProfile').addEventListener('click', async () => {
+  await loadProfileFromAPI(); showToast('Reset changes.');
+});
+
+formProfile.addEventListener('submit', async (e) => {
+  if(!formProfile.checkValidity()){
+    e.preventDefault(); e.stopPropagation();
+    formProfile.classList.add('was-validated');
+    return;
+  }
+  e.preventDefault();
+
+  const fd = new FormData();
+  fd.append('first_name', document.getElementById('firstName').value.trim());
+  fd.append('last_name',  document.getElementById('lastName').value.trim());
+  fd.append('email',      document.getElementById('email').value.trim());
+  fd.append('phone',      document.getElementById('phone').value.trim());
+  fd.append('country',    document.getElementById('country').value.trim());
+  fd.append('timezone',   document.getElementById('timezone').value);
+  fd.append('bio',        document.getElementById('bio').value.trim());
+  if (avatarInput.files[0]) fd.append('avatar', avatarInput.files[0]);
+
+  const res = await fetch(URLS.apiProfile, {
+    method: 'POST',  // allowed by decorator
+    body: fd,
+    headers: {'X-CSRFToken': CSRF},
+    credentials: 'same-origin'
+  });
+  if(!res.ok){
+    const err = await res.json().catch(() => ({}));
+    showToast(err.error || 'Failed to update profile');
+    return;
+  }
+  showToast('Profile updated');
+});
+
+// ---------- Security (password change) ----------
+const formSecurity = document.getElementById('formSecurity');
+const newPw = document.getElementById('newPw');
+const confirmPw = document.getElementById('confirmPw');
+function passwordsMatch(){ return newPw.value && confirmPw.value && newPw.value === confirmPw.value; }
+confirmPw.addEventListener('input', () => {
+  confirmPw.setCustomValidity(passwordsMatch() ? '' : 'Passwords do not match');
+});
+
+formSecurity.addEventListener('submit', async (e) => {
+  if(!passwordsMatch()){
+    confirmPw.setCustomValidity('Passwords do not match');
+  } else {
+    confirmPw.setCustomValidity('');
+  }
+  if(!formSecurity.checkValidity()){
+    e.preventDefault(); e.stopPropagation();
+    formSecurity.classList.add('was-validated');
+    return;
+  }
+  e.preventDefault();
+
+});
+
+// ---------- Preferences ----------
+const formPrefs = document.getElementById('formPrefs');
+formPrefs.addEventListener('submit', async (e) => {
+  e.preventDefault();
+  const fd = new FormData();
+  const theme = document.getElementById('themeDark').checked ? 'dark' : 'light';
+  fd.append('theme', theme);
+  fd.append('nAnnouncements', document.getElementById('nAnnouncements').checked ? 'true' : 'false');
+  fd.append('nReminders',     document.getElementById('nReminders').checked ? 'true' : 'false');
+  fd.append('nMarketing',     document.getElementById('nMarketing').checked ? 'true' : 'false');
+
+  const res = await fetch(URLS.apiPreferences, {
+    method: 'POST', headers: {'X-CSRFToken': CSRF}, body: fd, credentials:'same-origin'
+  });
+  if(!res.ok){ showToast('Failed to save preferences'); return; }
+
+  // live preview
+  document.documentElement.setAttribute('data-theme', theme);
+  showToast('Preferences saved');
+});
+
+// ---------- Export & Delete ----------
+document.getElementById('exportData').addEventListener('click', async () => {
+  const res = await fetch("#", {credentials:'same-origin'});
+  if(!res.ok){ showToast('Export failed'); return; }
+  const data = await res.json();
+  const blob = new Blob([JSON.stringify(data,null,2)], {type:'application/json'});
+  const a = document.createElement('a');
+  a.href = URL.createObjectURL(blob);
+  a.download = 'rabbani-profile-export.json';
+  a.click();
+  URL.revokeObjectURL(a.href);
+});
+
+document.getElementById('deleteAccount').addEventListener('click', async () => {
+  if(!confirm('This will permanently delete your account. Continue?')) return;
+  const res = await fetch(URLS.apiDeleteAccount, {
+    method:'POST', headers:{'X-CSRFToken': CSRF}, credentials:'same-origin'
+  });
+  if(!res.ok){ showToast('Delete failed'); return; }
+  // Back to home (or login)
+  location.href = URLS.home;
+});
+
+// ---------- Init ----------
+loadProfileFromAPI().catch(()=> showToast('Could not load profile'));
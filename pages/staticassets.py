@@ -0,0 +1,448 @@
+"""
+Static asset build and delivery.
+
+CompressedManifestStaticFilesStorage is Django's manifest storage (names
+fingerprinted by content, listed in staticfiles.json). It minifies the app's
+own bundles (css/, js/: one per page, see templates/base.html) as it copies
+them, then does extra work at the end of collectstatic for each hashed file:
+
+  - text assets (COMPRESSIBLE) get .gz and, with the `brotli` package
+    installed, .br siblings when that saves at least 5%;
+  - JPEG/PNG images get copies resized to each of STATIC_IMAGE_WIDTHS
+    narrower than the original (img/web.<hash>.960w.jpg), and every image
+    gets .avif/.webp siblings (STATIC_IMAGE_FORMATS) when they are smaller.
+    The widths are stored in the manifest under "srcsets" for the {% srcset %}
+    tag (pages.templatetags.static_assets).
+
+StaticFilesMiddleware serves STATIC_ROOT from the app server, like
+WhiteNoise: it picks .br/.gz from Accept-Encoding and AVIF/WebP from Accept
+for the same URL (with Vary), answers conditional requests and caches hashed
+names for a year as immutable. Put a CDN or proxy cache in front of it, or
+serve STATIC_ROOT from the proxy with the same rules, and set
+STATIC_SERVE=0. It stays out of the way under DEBUG (the default there), so
+runserver's staticfiles handler serves the source files as they are edited.
+"""
+import gzip
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from PIL import Image
+
+from .downloads import IMMUTABLE_MAX_AGE, etag_for
+
+try:
+    import brotli
+except ImportError:  # optional: .gz only without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE = {".css", ".js", ".mjs", ".map", ".json", ".svg", ".txt", ".xml", ".html", ".ico", ".ttf", ".otf", ".eot"}
+RESIZABLE = {".jpg", ".jpeg", ".png"}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # preferred first
+IMAGE_FORMATS = {
+    "avif": ("AVIF", {"quality": 60, "speed": 8}),
+    "webp": ("WEBP", {"quality": 80, "method": 6}),
+}
+MIN_SAVING = 0.05
+MINIFY_DIRS = ("css/", "js/")  # the app's own bundles; vendored files ship as they are
+
+
+def _encode(image, fmt, options):
+    out = io.BytesIO()
+    image.save(out, fmt, **options)
+    return out.getvalue()
+
+
+# ----- Minification -----
+# Deliberately conservative: comments and layout whitespace go, everything
+# else (tokens, line breaks in JS) stays, so the output behaves exactly like
+# the source without needing a parser.
+_WORD = re.compile(r"[\w$\u0080-\uffff]")
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await", "instanceof"}
+# Characters a space can be dropped (before, after): CSS keeps the space in
+# front of ":" (descendant pseudo-classes) and "(" ("and (min-width...)")
+_CSS_TIGHT = (set("{};,>)!"), set("{};,>:("))
+_JS_TIGHT = (set("{}()[];,:<>=!&|?*%^~."),) * 2
+
+
+def _skip_string(source, i):
+    """Index just past the string/template literal starting at source[i]."""
+    quote, i, n = source[i], i + 1, len(source)
+    while i < n:
+        c = source[i]
+        if c == "\\":
+            i += 2
+        elif c == quote:
+            return i + 1
+        elif quote == "`" and source.startswith("${", i):
+            i, depth = i + 2, 1
+            while i < n and depth:
+                c = source[i]
+                if c in "'\"`":
+                    i = _skip_string(source, i)
+                    continue
+                depth += {"{": 1, "}": -1}.get(c, 0)
+                i += 1
+        elif c == "\n" and quote != "`":
+            return i  # unterminated: leave the rest alone
+        else:
+            i += 1
+    return n
+
+
+def _skip_regex(source, i):
+    """Index just past the regex literal at source[i], or None if it isn't one."""
+    n, in_class, i = len(source), False, i + 1
+    while i < n:
+        c = source[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "\n":
+            return None
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            i += 1
+            while i < n and source[i].isalpha():
+                i += 1
+            return i
+        i += 1
+    return None
+
+
+def _minify(source, tight, js):
+    out, pending, last_word = [], None, ""
+    i, n = 0, len(source)
+
+    def emit(text):
+        nonlocal pending
+        if pending and out:
+            prev = out[-1][-1]
+            if pending == "\n":
+                out.append("\n")
+            elif not (prev in tight[1] or text[0] in tight[0]):
+                out.append(" ")
+        pending = None
+        out.append(text)
+
+    while i < n:
+        c = source[i]
+        if c.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            if js and "\n" in source[i:j]:
+                pending = "\n"
+            else:
+                pending = pending or " "
+            i = j
+        elif source.startswith("/*", i):
+            j = source.find("*/", i + 2)
+            j = n if j < 0 else j + 2
+            if js and "\n" in source[i:j]:
+                pending = "\n"
+            else:
+                pending = pending or " "
+            i = j
+        elif js and source.startswith("//", i):
+            j = source.find("\n", i)
+            i = n if j < 0 else j
+        elif c in "'\"" or (js and c == "`"):
+            j = _skip_string(source, i)
+            emit(source[i:j])
+            last_word, i = "", j
+        elif js and c == "/" and (not out or out[-1][-1] in _REGEX_AFTER or last_word in _REGEX_KEYWORDS):
+            j = _skip_regex(source, i) or i + 1
+            emit(source[i:j])
+            last_word, i = "", j
+        elif _WORD.match(c):
+            j = i + 1
+            while j < n and _WORD.match(source[j]):
+                j += 1
+            word = source[i:j]
+            emit(word)
+            last_word, i = word, j
+        else:
+            emit(c)
+            last_word, i = "", i + 1
+    text = "".join(out)
+    return (text.replace(";}", "}") if not js else text) + "\n"
+
+
+def minify_css(source):
+    return _minify(source, _CSS_TIGHT, js=False)
+
+
+def minify_js(source):
+    """Comments and indentation out; line breaks kept for automatic semicolon insertion."""
+    return _minify(source, _JS_TIGHT, js=True)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def __init__(self, *args, **kwargs):
+        self.srcsets = {}
+        super().__init__(*args, **kwargs)
+
+    def load_manifest(self):
+        hashed_files, manifest_hash = super().load_manifest()
+        content = self.read_manifest()
+        self.srcsets = json.loads(content).get("srcsets", {}) if content else {}
+        return hashed_files, manifest_hash
+
+    def save_manifest(self):
+        super().save_manifest()
+        if self.srcsets:
+            with self.manifest_storage.open(self.manifest_name) as manifest:
+                payload = json.loads(manifest.read().decode())
+            payload["srcsets"] = self.srcsets
+            self.manifest_storage.delete(self.manifest_name)
+            self.manifest_storage.save(self.manifest_name, ContentFile(json.dumps(payload).encode()))
+
+    def _save(self, name, content):
+        # Both the plain and the hashed copies pass through here; the hash
+        # is of the source, which changes whenever the minified output does
+        if name.startswith(MINIFY_DIRS) and ".min." not in name:
+            ext = os.path.splitext(name)[1]
+            minify = {".css": minify_css, ".js": minify_js}.get(ext)
+            if minify:
+                content.seek(0)
+                content = ContentFile(minify(content.read().decode()).encode())
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        self.srcsets = {}
+        names = sorted(set(self.hashed_files.values()))
+        # Pillow and zlib release the GIL while encoding
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 2) as pool:
+            for name, written in zip(names, pool.map(self._variants, names)):
+                for variant in written:
+                    yield name, variant, True
+        self.save_manifest()
+
+    def _variants(self, name):
+        """Write the compressed/resized/re-encoded siblings of `name`; returns their names."""
+        ext = os.path.splitext(name)[1].lower()
+        with self.open(name) as fh:
+            data = fh.read()
+        if ext in COMPRESSIBLE:
+            return self._compress(name, data)
+        if ext in RESIZABLE:
+            return self._images(name, data)
+        return []
+
+    def _write(self, name, data, original_size):
+        if len(data) > original_size * (1 - MIN_SAVING):
+            return False
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(data))
+        return True
+
+    def _compress(self, name, data):
+        written = []
+        candidates = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            candidates.append((".br", brotli.compress(data)))
+        for suffix, compressed in candidates:
+            if self._write(name + suffix, compressed, len(data)):
+                written.append(name + suffix)
+        return written
+
+    def _images(self, name, data):
+        stem, ext = os.path.splitext(name)
+        fmt = "PNG" if ext.lower() == ".png" else "JPEG"
+        formats = getattr(settings, "STATIC_IMAGE_FORMATS", ("avif", "webp"))
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode == "P" else "RGB")
+        img.info = {}
+
+        images = [(name, img, data)]
+        widths = {}
+        for width in sorted(getattr(settings, "STATIC_IMAGE_WIDTHS", ())):
+            if width >= img.width:
+                continue
+            height = round(img.height * width / img.width)
+            resized = img.resize((width, height), Image.Resampling.LANCZOS)
+            if fmt == "JPEG":
+                encoded = _encode(resized.convert("RGB"), fmt, {"quality": 82, "optimize": True, "progressive": True})
+            else:
+                encoded = _encode(resized, fmt, {"optimize": True})
+            resized_name = f"{stem}.{width}w{ext}"
+            if self.exists(resized_name):
+                self.delete(resized_name)
+            self._save(resized_name, ContentFile(encoded))
+            widths[str(width)] = resized_name
+            images.append((resized_name, resized, encoded))
+
+        written = list(widths.values())
+        for image_name, image, original in images:
+            for fmt_name in formats:
+                try:
+                    encoded = _encode(image, *IMAGE_FORMATS[fmt_name])
+                except (OSError, ValueError, KeyError):
+                    # No encoder for the format in this Pillow build, or it
+                    # choked on this image: the original still gets served
+                    logger.warning("Skipping %s copy of %s", fmt_name, image_name, exc_info=True)
+                    continue
+                if self._write(f"{image_name}.{fmt_name}", encoded, len(original)):
+                    written.append(f"{image_name}.{fmt_name}")
+        if widths:
+            widths[str(img.width)] = name
+            self.srcsets[name] = widths
+        return written
+
+
+# ----- Serving -----
+def _accepts(header, token):
+    """Whether an Accept/Accept-Encoding header lists `token` with q > 0."""
+    for item in (header or "").split(","):
+        value, *params = (part.strip() for part in item.split(";"))
+        if value.lower() != token:
+            continue
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    return float(param[2:]) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+class StaticFile:
+    """A file under STATIC_ROOT and the variants collectstatic wrote next to it."""
+
+    def __init__(self, path, immutable):
+        self.path = path
+        self.stat = os.stat(path)
+        self.immutable = immutable
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        ext = os.path.splitext(path)[1].lower()
+        self.encodings, self.images = [], []
+        if ext in COMPRESSIBLE:
+            self.encodings = [(encoding, path + suffix) for encoding, suffix in ENCODINGS if os.path.exists(path + suffix)]
+        elif ext in RESIZABLE:
+            self.images = [(f"image/{fmt}", f"{path}.{fmt}") for fmt in IMAGE_FORMATS if os.path.exists(f"{path}.{fmt}")]
+
+    def pick(self, request):
+        """(path, content type, content encoding) to send, and the header to Vary on."""
+        if self.encodings:
+            accept_encoding = request.headers.get("Accept-Encoding")
+            for encoding, path in self.encodings:
+                if _accepts(accept_encoding, encoding):
+                    return (path, self.content_type, encoding), "Accept-Encoding"
+            return (self.path, self.content_type, None), "Accept-Encoding"
+        if self.images:
+            accept = request.headers.get("Accept")
+            for content_type, path in self.images:
+                if _accepts(accept, content_type):
+                    return (path, content_type, None), "Accept"
+            return (self.path, self.content_type, None), "Accept"
+        return (self.path, self.content_type, None), None
+
+
+class StaticFilesMiddleware:
+    """Serve STATIC_URL from STATIC_ROOT with precompressed and image variants."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not getattr(settings, "STATIC_SERVE", False) or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith("/") else "/" + settings.STATIC_URL
+        self.root = str(Path(settings.STATIC_ROOT).resolve())
+        self.max_age = getattr(settings, "STATIC_MAX_AGE", 60)
+        # Files are looked up once per process: restart after collectstatic
+        self.files = {}
+        self.hashed = None
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.serve(request)
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        response = self.serve(request)
+        return response if response is not None else await self.get_response(request)
+
+    def _load_hashed(self):
+        try:
+            with open(os.path.join(self.root, "staticfiles.json"), encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return set()
+        hashed = set(manifest.get("paths", {}).values())
+        for widths in manifest.get("srcsets", {}).values():
+            hashed.update(widths.values())
+        return hashed
+
+    def find(self, name):
+        static = self.files.get(name)
+        if static is None:
+            try:
+                path = safe_join(self.root, name)
+            except ValueError:
+                return None
+            if not os.path.isfile(path):
+                return None  # misses aren't cached: any URL could be asked for
+            if self.hashed is None:
+                self.hashed = self._load_hashed()
+            static = StaticFile(path, name in self.hashed)
+            self.files[name] = static
+        return static
+
+    def serve(self, request):
+        if request.method not in ("GET", "HEAD") or not request.path_info.startswith(self.prefix):
+            return None
+        static = self.find(request.path_info[len(self.prefix):])
+        if static is None:
+            return None
+        (path, content_type, encoding), vary = static.pick(request)
+        stat = static.stat if path == static.path else os.stat(path)
+        etag, last_modified = etag_for(stat), int(stat.st_mtime)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+            del response["Content-Disposition"]
+            if encoding:
+                response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        if vary:
+            patch_vary_headers(response, (vary,))
+        if static.immutable:
+            patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=self.max_age)
+        return response
@@ -0,0 +1,29 @@
+from urllib.parse import urljoin
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.encoding import filepath_to_uri
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def srcset(path, sizes="100vw"):
+    """
+    srcset/sizes attributes for a static image, from the widths collectstatic
+    resized it to (pages.staticassets). Nothing when there are none, e.g. in
+    DEBUG, where {% static %} doesn't use the hashed names either.
+    """
+    srcsets = getattr(staticfiles_storage, "srcsets", None)
+    if settings.DEBUG or not srcsets:
+        return ""
+    widths = srcsets.get(staticfiles_storage.stored_name(path))
+    if not widths:
+        return ""
+    candidates = ", ".join(
+        f"{urljoin(staticfiles_storage.base_url, filepath_to_uri(name))} {width}w"
+        for width, name in sorted(widths.items(), key=lambda item: int(item[0]))
+    )
+    return format_html('srcset="{}" sizes="{}"', candidates, sizes)
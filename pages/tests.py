@@ -1,3 +1,1473 @@
-from django.test import TestCase
+import csv
+import dataclasses
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.db.models.deletion import Collector
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from unittest import mock
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from PIL import Image
+
+from . import (
+    attempt_spool, avatars, benchmarks, bitmaps, blobstore, checks, completions, counters, downloads,
+    enrollment_import, exports, grading, pagecache, progress, queryinspector, routers, search, seeding, static_quizzes,
+    staticassets, versions, views, writequeue,
+)
+from .curriculum import get_curriculum
+from .models import (
+    Blob, Choice, ContactMessage, Course, Enrollment, Lesson, LessonCompletion, LessonProgressBitmap, Module, Question,
+    Quiz, QuizAttempt, Resource, UserProfile,
+)
+
+User = get_user_model()
+
+
+def make_course(slug="course", n_modules=1, n_lessons=2, **fields):
+    """A course with n_modules modules of n_lessons lessons each."""
+    course = Course.objects.create(slug=slug, title=slug.title(), **fields)
+    for m in range(1, n_modules + 1):
+        module = Module.objects.create(course=course, index=m, title=f"Module {m}")
+        for n in range(1, n_lessons + 1):
+            Lesson.objects.create(module=module, index=n, title=f"Lesson {m}.{n}")
+    return course
+
+
+def complete(user, lessons):
+    LessonCompletion.objects.bulk_create(
+        [LessonCompletion(user=user, lesson=lesson, completed=True) for lesson in lessons]
+    )
+    progress.recompute(Enrollment.objects.filter(user=user))
+
+
+class CacheMixin:
+    def setUp(self):
+        super().setUp()
+        for alias in ("default", "pages"):
+            caches[alias].clear()
+
+
+class TempDirMixin:
+    def setUp(self):
+        super().setUp()
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.tmp = Path(self._tmp.name)
+
+
+# ----- Quiz attempt spool -----
+class AttemptSpoolTests(TempDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.override = override_settings(QUIZ_ATTEMPT_SPOOL_DIR=self.tmp)
+        self.override.enable()
+        self.addCleanup(self.override.disable)
+        self.user = User.objects.create(username="learner")
+        course = make_course(n_lessons=1)
+        self.quiz = Quiz.objects.create(lesson=Lesson.objects.get(module__course=course))
+
+    def enqueue(self, **overrides):
+        args = dict(user_id=self.user.id, quiz_id=self.quiz.id, score=3, total=4, passed=True,
+                    raw_answers={"1": 2})
+        args.update(overrides)
+        return attempt_spool.enqueue(**args)
+
+    def write_raw(self, name, content):
+        path = self.tmp / attempt_spool.READY / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        return path
+
+    def test_enqueue_claim_ingest(self):
+        self.enqueue()
+        self.enqueue(score=1, passed=False)
+        paths = attempt_spool.claim(10)
+        self.assertEqual(len(paths), 2)
+        self.assertEqual(attempt_spool.pending(), 0)
+        self.assertEqual(attempt_spool.ingest(paths), (2, 0))
+        self.assertEqual(sorted(QuizAttempt.objects.values_list("score", flat=True)), [1, 3])
+        self.assertEqual(list((self.tmp / attempt_spool.PROCESSING).iterdir()), [])
+
+    def test_claim_stamps_claim_time(self):
+        self.enqueue()
+        ready = next((self.tmp / attempt_spool.READY).iterdir())
+        old = time.time() - 3600
+        os.utime(ready, (old, old))  # enqueued an hour ago
+        [claimed] = attempt_spool.claim(10)
+        self.assertGreater(claimed.stat().st_mtime, time.time() - 60)
+        # A freshly claimed file is not "abandoned", however old the attempt
+        self.assertEqual(attempt_spool.recover(older_than=300), 0)
+        self.assertTrue(claimed.exists())
+
+    def test_recover_requeues_stale_claims(self):
+        self.enqueue()
+        [claimed] = attempt_spool.claim(10)
+        old = time.time() - 3600
+        os.utime(claimed, (old, old))
+        self.assertEqual(attempt_spool.recover(older_than=300), 1)
+        self.assertEqual(attempt_spool.pending(), 1)
+
+    def test_malformed_records_go_to_failed(self):
+        self.enqueue()
+        self.write_raw("00000000000000000001-a.json", "not json")
+        self.write_raw("00000000000000000002-b.json", json.dumps([1, 2]))
+        self.write_raw("00000000000000000003-c.json", json.dumps({"quiz_id": self.quiz.id}))
+        self.write_raw("00000000000000000004-d.json", json.dumps({
+            "user_id": "x", "quiz_id": self.quiz.id, "score": 1, "total": 1, "passed": True,
+            "submitted_at": "2025-01-01T00:00:00+00:00",
+        }))
+        self.enqueue(quiz_id=self.quiz.id + 1000)  # quiz deleted since
+        inserted, failed = attempt_spool.ingest(attempt_spool.claim(10))
+        self.assertEqual((inserted, failed), (1, 5))
+        self.assertEqual(QuizAttempt.objects.count(), 1)
+        self.assertEqual(len(list((self.tmp / attempt_spool.FAILED).iterdir())), 5)
+
+
+# ----- Catalog page cache -----
+class PageCacheTests(CacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = make_course("python-basics", is_active=True)
+        self.url = reverse("courses_list")
+
+    def test_anonymous_hit_skips_the_database(self):
+        first = self.client.get(self.url)
+        self.assertContains(first, "Python-Basics")
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url)
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again["ETag"], first["ETag"])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+    def test_rotated_csrf_cookie_gets_a_fresh_page(self):
+        first = self.client.get(reverse("index"))
+        self.assertIn("private", first["Cache-Control"])
+        self.assertNotIn("Last-Modified", first)
+        again = self.client.get(reverse("index"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        self.client.cookies.load({"csrftoken": "r" * 32})  # e.g. rotated at logout
+        rotated = self.client.get(reverse("index"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(rotated.status_code, 200)
+        self.assertNotEqual(rotated["ETag"], first["ETag"])
+
+    def test_only_whitelisted_params_are_keyed(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {"utm_source": "mail", "page": "7"})
+        self.client.get(self.url, {"q": "python"})
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {"q": "python", "utm_source": "x"})
+        # Pages never compete with the content versions for "default" slots
+        self.assertFalse([k for k in caches["default"]._cache if ":page:" in k])
+
+    def test_overlong_query_is_not_cached(self):
+        self.client.get(self.url, {"q": "x" * 500})
+        self.assertFalse([k for k in caches["pages"]._cache if "page:courses_list" in k])
+
+    def test_normalised_query_shares_catalog_value(self):
+        calls = []
+        build = lambda: calls.append(1) or []
+        for q in ("Python  Basics", " python basics"):
+            pagecache.cached_catalog_value("courses", build, pagecache.normalise_query(q))
+        self.assertEqual(len(calls), 1)
+
+    def test_course_change_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_course("django-advanced", is_active=True)
+        self.assertContains(self.client.get(self.url), "Django-Advanced")
+
+    def test_admin_bulk_actions_invalidate(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        hidden = make_course("hidden-course", is_active=False)
+        self.assertNotContains(self.client.get(self.url), "Hidden-Course")
+        self.client.force_login(admin)
+        changelist = reverse("admin:pages_course_changelist")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(changelist, {"action": "activate_selected", "_selected_action": [hidden.pk]})
+        self.client.logout()
+        self.assertContains(self.client.get(self.url), "Hidden-Course")
+
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(changelist, {"action": "deactivate_selected", "_selected_action": [hidden.pk]})
+        self.client.logout()
+        self.assertNotContains(self.client.get(self.url), "Hidden-Course")
+
+
+# ----- Blob refcounts -----
+def png(color, size=(80, 60)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, "PNG")
+    out.seek(0)
+    return out
+
+
+@override_settings(AVATAR_SIZES=(32, 64), AVATAR_WORKERS=0)
+class BlobRefcountTests(TempDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.override = override_settings(MEDIA_ROOT=self.tmp)
+        self.override.enable()
+        self.addCleanup(self.override.disable)
+        self.user = User.objects.create(username="learner")
+
+    def refcounts(self, names):
+        return {Blob.objects.get(name=name).refcount for name in names}
+
+    def test_identical_resources_share_one_blob(self):
+        lesson = make_course(n_lessons=1).modules.get().lessons.get()
+        a = Resource.objects.create(lesson=lesson, name="a", file=ContentFile(b"same bytes", "a.pdf"))
+        b = Resource.objects.create(lesson=lesson, name="b", file=ContentFile(b"same bytes", "b.pdf"))
+        self.assertEqual(a.file.name, b.file.name)
+        self.assertEqual(Blob.objects.get(name=a.file.name).refcount, 2)
+        b.delete()
+        self.assertEqual(Blob.objects.get(name=a.file.name).refcount, 1)
+        self.assertEqual(blobstore.recount(), 0)
+
+    def test_avatar_replacement_releases_old_variants(self):
+        avatars.save(self.user.id, 1, avatars.render(png("red")))
+        first = blobstore.names_in(UserProfile.objects.get(user=self.user).avatar_variants)
+        self.assertEqual(len(first), 4)  # 2 sizes x WebP/JPEG
+        self.assertEqual(self.refcounts(first), {1})
+
+        avatars.save(self.user.id, 2, avatars.render(png("blue")))
+        profile = UserProfile.objects.get(user=self.user)
+        second = blobstore.names_in(profile.avatar_variants)
+        self.assertIn(profile.avatar.name, second)  # the 64px WebP, in both fields
+        self.assertEqual(self.refcounts(second), {1})
+        self.assertEqual(self.refcounts(first), {0})
+
+        # A recount agrees with the signals: one reference per row, not per field
+        self.assertEqual(blobstore.recount(), 0)
+        self.assertEqual(blobstore.references()[profile.avatar.name], 1)
+
+    def test_stale_upload_does_not_replace_newer(self):
+        avatars.save(self.user.id, 5, avatars.render(png("red")))
+        self.assertFalse(avatars.save(self.user.id, 4, avatars.render(png("blue"))))
+        self.assertEqual(UserProfile.objects.get(user=self.user).avatar_variants["version"], 5)
+
+    def test_gc_spares_blobs_reused_within_the_grace_period(self):
+        lesson = make_course(n_lessons=1).modules.get().lessons.get()
+        resource = Resource.objects.create(lesson=lesson, name="a", file=ContentFile(b"old notes", "a.pdf"))
+        name, path = resource.file.name, resource.file.path
+        resource.delete()
+        long_ago = timezone.now() - timedelta(days=2)
+        Blob.objects.filter(name=name).update(created_at=long_ago, updated_at=long_ago)
+
+        # Same content uploaded again; its row isn't saved (and retained) yet
+        self.assertEqual(blobstore.resource_storage().save("b.pdf", ContentFile(b"old notes")), name)
+        self.assertEqual(blobstore.collect(), (0, 0))
+        self.assertTrue(os.path.exists(path))
+
+        Blob.objects.filter(name=name).update(updated_at=long_ago)
+        self.assertEqual(blobstore.collect(), (1, len(b"old notes")))
+        self.assertFalse(os.path.exists(path) or Blob.objects.filter(name=name).exists())
+        # An upload racing the deletion finds no row and no file, and writes both back
+        blobstore.resource_storage().save("c.pdf", ContentFile(b"old notes"))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(Blob.objects.get(name=name).refcount, 0)
+
+
+# ----- Activity exports -----
+async def _collect(blocks):
+    return [block async for block in blocks]
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username="staff", is_staff=True)
+        lesson = make_course(n_lessons=1).modules.get().lessons.get()
+        quiz = Quiz.objects.create(lesson=lesson)
+        QuizAttempt.objects.bulk_create([
+            QuizAttempt(quiz=quiz, user=cls.staff, score=i, total=5, passed=i >= 4, raw_answers={"1": i})
+            for i in range(7)
+        ])
+
+    def test_csv_and_jsonl(self):
+        lines = b"".join(exports.stream("quiz_attempts")).decode().splitlines()
+        self.assertEqual(lines[0].split(","), exports.header("quiz_attempts"))
+        self.assertEqual(len(lines), 8)
+        records = [json.loads(line) for line in b"".join(exports.stream("quiz_attempts", "jsonl")).splitlines()]
+        self.assertEqual([r["score"] for r in records], list(range(7)))
+        self.assertEqual(records[2]["raw_answers"], {"1": 2})
+
+    def test_after_id_resumes(self):
+        ids = list(QuizAttempt.objects.order_by("id").values_list("id", flat=True))
+        records = b"".join(exports.stream("quiz_attempts", "jsonl", after_id=ids[4])).splitlines()
+        self.assertEqual([json.loads(r)["id"] for r in records], ids[5:])
+
+    def test_async_stream_matches_sync(self):
+        for fmt in exports.FORMATS:
+            for chunk_size in (2, 7, 100):  # page boundaries inside, at and past the end
+                with self.subTest(fmt=fmt, chunk_size=chunk_size):
+                    expected = b"".join(exports.stream("quiz_attempts", fmt))
+                    blocks = async_to_sync(_collect)(exports.astream("quiz_attempts", fmt, chunk_size=chunk_size))
+                    self.assertEqual(b"".join(blocks), expected)
+                    gz = async_to_sync(_collect)(exports.astream("quiz_attempts", fmt, gzip=True, chunk_size=chunk_size))
+                    self.assertEqual(gzip.decompress(b"".join(gz)), expected)
+
+    def test_async_stream_reads_in_pages(self):
+        with self.assertNumQueries(4):  # 7 rows in pages of 2: 2+2+2+1
+            async_to_sync(_collect)(exports.astream("quiz_attempts", chunk_size=2))
+
+    def test_view_streams_sync_under_wsgi(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("export_activity", args=["quiz_attempts"]), {"format": "jsonl"})
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 7)
+
+    async def test_view_streams_async_under_asgi(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse("export_activity", args=["quiz_attempts"]), {"gzip": "1"})
+        self.assertTrue(response.is_async)
+        body = gzip.decompress(b"".join([block async for block in response.streaming_content]))
+        self.assertEqual(len(body.splitlines()), 8)
+
+    def test_csv_neutralises_formulas(self):
+        User.objects.filter(pk=self.staff.pk).update(username='=HYPERLINK("http://x.example","y")')
+        row = next(csv.reader(b"".join(exports.stream("quiz_attempts")).decode().splitlines()[1:]))
+        self.assertEqual(row[2], '\'=HYPERLINK("http://x.example","y")')
+        self.assertEqual((row[6], row[10]), ("0", '{"1": 0}'))
+        record = json.loads(b"".join(exports.stream("quiz_attempts", "jsonl")).splitlines()[0])
+        self.assertEqual(record["username"], '=HYPERLINK("http://x.example","y")')  # JSONL stays as stored
+
+    def test_bad_format_is_rejected(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("export_activity", args=["quiz_attempts"]), {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+
+# ----- Course counters and enrollment progress -----
+class CounterTests(TestCase):
+    def setUp(self):
+        self.course = make_course(n_modules=2, n_lessons=3)
+        self.other = make_course("other", n_modules=1, n_lessons=2)
+        self.alice = User.objects.create(username="alice")
+        self.bob = User.objects.create(username="bob")
+        for user in (self.alice, self.bob):
+            Enrollment.objects.create(user=user, course=self.course)
+            Enrollment.objects.create(user=user, course=self.other)
+        m1, m2 = self.course.modules.order_by("index")
+        self.m1_lessons, self.m2_lessons = list(m1.lessons.all()), list(m2.lessons.all())
+        complete(self.alice, self.m1_lessons + self.m2_lessons[:1])
+        complete(self.bob, self.m2_lessons)
+        complete(self.bob, self.other.modules.get().lessons.all())
+
+    def progress(self, user, course):
+        e = Enrollment.objects.get(user=user, course=course)
+        return e.completed_lessons, e.total_lessons
+
+    def assertConsistent(self):
+        self.assertFalse(progress.drifted(Enrollment.objects.all()).exists())
+        self.assertFalse(counters.counted_courses().exclude(
+            n_modules=F("true_modules"), n_lessons=F("true_lessons")).exists())
+
+    def test_created_rows_are_counted(self):
+        course = Course.objects.get(pk=self.course.pk)
+        self.assertEqual((course.n_modules, course.n_lessons), (2, 6))
+        self.assertEqual(self.progress(self.alice, self.course), (4, 6))
+        Lesson.objects.create(module=self.m1_lessons[0].module, index=9, title="Extra")
+        self.assertEqual(self.progress(self.alice, self.course), (4, 7))
+        self.assertConsistent()
+
+    def test_lesson_delete(self):
+        self.m2_lessons[0].delete()
+        self.assertEqual(self.progress(self.alice, self.course), (3, 5))
+        self.assertEqual(self.progress(self.bob, self.course), (2, 5))
+        self.assertConsistent()
+
+    def test_lesson_queryset_delete(self):
+        Lesson.objects.filter(pk__in=[self.m1_lessons[0].pk, self.m2_lessons[1].pk]).delete()
+        self.assertEqual(self.progress(self.alice, self.course), (3, 4))
+        self.assertEqual(self.progress(self.bob, self.course), (2, 4))
+        self.assertConsistent()
+
+    def test_module_delete_is_aggregated(self):
+        self.m2_lessons[0].module.delete()
+        self.assertEqual(self.progress(self.alice, self.course), (3, 3))
+        self.assertEqual(self.progress(self.bob, self.course), (0, 3))
+        self.assertEqual(self.progress(self.bob, self.other), (2, 2))
+        self.assertConsistent()
+
+    def test_module_delete_queries_dont_grow_with_lessons(self):
+        def delete_module_with(n_lessons):
+            module = Module.objects.create(course=self.other, index=9, title="Big")
+            lessons = [Lesson.objects.create(module=module, index=i, title=f"L{i}") for i in range(n_lessons)]
+            complete(self.alice, lessons)
+            with CaptureQueriesContext(connection) as ctx:
+                module.delete()
+            return len(ctx)
+
+        self.assertEqual(delete_module_with(2), delete_module_with(8))
+        self.assertConsistent()
+
+    def test_course_and_user_deletes(self):
+        self.assertTrue(Collector(using="default").can_fast_delete(LessonCompletion.objects.all()))
+        self.course.delete()
+        self.assertEqual(self.progress(self.bob, self.other), (2, 2))
+        self.bob.delete()
+        self.assertFalse(LessonCompletion.objects.filter(user_id=self.bob.pk).exists())
+        self.assertConsistent()
+
+    def test_admin_completion_delete(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(admin)
+        pks = list(LessonCompletion.objects.filter(user=self.alice, lesson__in=self.m1_lessons[:2])
+                   .values_list("pk", flat=True))
+        self.client.post(reverse("admin:pages_lessoncompletion_changelist"),
+                         {"action": "delete_selected", "_selected_action": pks, "post": "yes"})
+        self.assertEqual(self.progress(self.alice, self.course), (2, 6))
+        self.assertConsistent()
+
+    def test_recount_repairs_drift(self):
+        Course.objects.update(n_modules=0, n_lessons=99)
+        Enrollment.objects.update(completed_lessons=42, total_lessons=0)
+        counters.recount()
+        progress.recompute()
+        self.assertEqual(self.progress(self.alice, self.course), (4, 6))
+        self.assertConsistent()
+
+
+# ----- Bulk completion writes -----
+class CompletionApplyTests(TestCase):
+    def setUp(self):
+        self.course = make_course(n_lessons=4)
+        self.lessons = list(Lesson.objects.filter(module__course=self.course).order_by("index"))
+        self.user = User.objects.create(username="learner")
+        self.enrollment = Enrollment.objects.create(user=self.user, course=self.course)
+
+    def completed(self):
+        self.enrollment.refresh_from_db()
+        return self.enrollment.completed_lessons
+
+    def test_deltas_follow_actual_changes(self):
+        a, b, c, _ = (lesson.pk for lesson in self.lessons)
+        results = completions.apply(self.user.id, {a: True, b: True, 999999: True})
+        self.assertEqual(results[999999], {"ok": False, "error": "not_found"})
+        self.assertTrue(results[a]["ok"])
+        self.assertEqual(self.completed(), 2)
+
+        completions.apply(self.user.id, {a: True, b: True})  # repeated: no change
+        self.assertEqual(self.completed(), 2)
+        completions.apply(self.user.id, {a: False, c: False})  # c never completed
+        self.assertEqual(self.completed(), 1)
+        completions.apply(self.user.id, {a: True})  # back on after an explicit off
+        self.assertEqual(self.completed(), 2)
+        self.assertFalse(progress.drifted(Enrollment.objects.all()).exists())
+
+    def test_completed_at_kept_when_unchanged(self):
+        lid = self.lessons[0].pk
+        completions.apply(self.user.id, {lid: True})
+        first = LessonCompletion.objects.get(user=self.user, lesson_id=lid).completed_at
+        completions.apply(self.user.id, {lid: True})
+        self.assertEqual(LessonCompletion.objects.get(user=self.user, lesson_id=lid).completed_at, first)
+
+    def test_toggle_api(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse("api_toggle_lesson"),
+                                    {"lesson_id": self.lessons[0].pk, "completed": "true"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.completed(), 1)
+
+    def test_bulk_api(self):
+        self.client.force_login(self.user)
+        items = [{"lesson_id": lesson.pk, "completed": True} for lesson in self.lessons[:3]]
+        response = self.client.post(reverse("api_bulk_lessons"), json.dumps({"items": items}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.completed(), 3)
+
+
+
+# ----- Completion bitmaps -----
+@override_settings(COMPLETION_BITMAPS=True)
+class BitmapTests(CacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = make_course(n_modules=2, n_lessons=5)
+        self.lessons = list(Lesson.objects.filter(module__course=self.course).order_by("module__index", "index"))
+        self.user = User.objects.create(username="learner")
+        Enrollment.objects.create(user=self.user, course=self.course)
+
+    def curriculum(self):
+        return get_curriculum(self.course.pk)
+
+    def test_read_does_not_write(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[3], completed=True)
+        with CaptureQueriesContext(connection) as queries:
+            ids = bitmaps.completed_ids(self.user.id, self.curriculum())
+        self.assertEqual(ids, {self.lessons[3].pk})
+        self.assertFalse(LessonProgressBitmap.objects.exists())
+        self.assertTrue(all(q["sql"].startswith("SELECT") for q in queries.captured_queries))
+
+    def test_record_matches_rebuild(self):
+        changes = [
+            {self.lessons[0].pk: True, self.lessons[9].pk: True},
+            {self.lessons[4].pk: True, self.lessons[0].pk: False},
+            {self.lessons[9].pk: False, self.lessons[7].pk: True},
+        ]
+        for change in changes:
+            completions.apply(self.user.id, change)
+            row = LessonProgressBitmap.objects.get(user=self.user, course=self.course)
+            stored = bytes(row.bits)
+            rebuilt = bitmaps.rebuild(self.user.id, self.curriculum())
+            self.assertEqual(stored, rebuilt.to_bytes())
+            self.assertEqual(row.n_completed, rebuilt.count())
+        self.assertEqual(bitmaps.completed_ids(self.user.id, self.curriculum()),
+                         {self.lessons[4].pk, self.lessons[7].pk})
+
+    def test_reorder_rewrites_on_next_record(self):
+        completions.apply(self.user.id, {self.lessons[1].pk: True})
+        old_layout = LessonProgressBitmap.objects.get().layout
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.filter(pk=self.lessons[1].pk).update(index=99)
+            Lesson.objects.get(pk=self.lessons[0].pk).save()  # signals bump the curriculum version
+        self.assertEqual(bitmaps.completed_ids(self.user.id, self.curriculum()), {self.lessons[1].pk})
+        self.assertEqual(LessonProgressBitmap.objects.get().layout, old_layout)  # read left it alone
+        completions.apply(self.user.id, {self.lessons[2].pk: True})
+        row = LessonProgressBitmap.objects.get()
+        self.assertNotEqual(row.layout, old_layout)
+        self.assertEqual(row.layout, bitmaps.layout_of(self.curriculum()))
+        self.assertEqual(row.n_completed, 2)
+
+    def test_reconcile_command(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[2], completed=True)
+        with self.assertRaises(CommandError):
+            call_command("reconcile_completion_bitmaps", "--check", stdout=io.StringIO())
+        call_command("reconcile_completion_bitmaps", stdout=io.StringIO())
+        call_command("reconcile_completion_bitmaps", "--check", stdout=io.StringIO())
+        self.assertEqual(bytes(LessonProgressBitmap.objects.get().bits),
+                         bitmaps.from_completions(self.user.id, self.curriculum()).to_bytes())
+
+
+# ----- Async JSON API -----
+class AsyncApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="learner@example.org", email="learner@example.org")
+
+    async def test_preferences_round_trip(self):
+        await self.async_client.aforce_login(self.user)
+        profile = await UserProfile.objects.aget(user=self.user)
+        url = reverse("api_preferences")
+        response = await self.async_client.post(url, {"theme": "dark", "nMarketing": "on"})
+        self.assertEqual(response.json(), {"ok": True})
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json(), {"theme": "dark", "nAnnouncements": True, "nReminders": True,
+                                           "nMarketing": True})
+        saved = await UserProfile.objects.aget(pk=profile.pk)
+        self.assertGreater(saved.updated_at, profile.updated_at)
+
+    async def test_login_required(self):
+        response = await self.async_client.get(reverse("api_profile"))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_profile_update(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse("api_profile")
+        response = await self.async_client.post(url, {"first_name": "Ada", "email": " New@Example.org ",
+                                                      "country": "UK"})
+        self.assertEqual(response.json()["avatar_pending"], False)
+        data = (await self.async_client.get(url)).json()
+        self.assertEqual((data["first_name"], data["email"], data["country"]), ("Ada", "new@example.org", "UK"))
+        self.assertEqual((await User.objects.aget(pk=self.user.pk)).username, "new@example.org")
+
+    async def test_toggle_and_quiz_attempt(self):
+        course = await sync_to_async(make_course)(n_lessons=1)
+        lesson = await Lesson.objects.aget(module__course=course)
+        quiz = await Quiz.objects.acreate(lesson=lesson, title="Quiz", pass_mark=60)
+        await Enrollment.objects.acreate(user=self.user, course=course)
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.post(reverse("api_toggle_lesson"),
+                                                {"lesson_id": lesson.pk, "completed": "true"})
+        self.assertEqual(response.json(), {"ok": True, "completed": True})
+        self.assertTrue(await LessonCompletion.objects.filter(user=self.user, lesson=lesson, completed=True).aexists())
+        response = await self.async_client.post(reverse("api_toggle_lesson"), {"lesson_id": 999999})
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.async_client.post(reverse("api_quiz_attempt", args=[quiz.pk]),
+                                                {"score": "70", "total": "100", "label_q1": "b"})
+        data = response.json()
+        self.assertEqual((data["score"], data["passed"]), (70, True))
+        attempt = await QuizAttempt.objects.aget(pk=data["attempt_id"])
+        self.assertEqual((attempt.user_id, attempt.raw_answers), (self.user.pk, {"label_q1": "b"}))
+
+
+# ----- Course search -----
+class SearchTests(CacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        if not search.is_available():
+            self.skipTest("no full-text index on this database")
+        self.python = make_course("python-basics", category="Programming", short_desc="Learn Python step by step.")
+        self.web = make_course("web-dev", category="Web", short_desc="HTML and CSS, with a little Python tooling.")
+        self.data = make_course("data-science", category="Data")
+        Lesson.objects.filter(module__course=self.data).update(summary="numpy and pandas")
+        search.reindex([self.data.pk])  # update() skips the signals
+
+    def ids(self, q):
+        return search.search_course_ids(q)
+
+    def test_ranking_prefers_title_matches(self):
+        self.assertEqual(self.ids("python"), [self.python.pk, self.web.pk])
+        self.assertEqual(self.ids("python css"), [self.web.pk])
+        self.assertEqual(self.ids(""), [])
+
+    def test_prefix_and_typo_tolerance(self):
+        self.assertEqual(self.ids("pyth"), [self.python.pk, self.web.pk])
+        self.assertEqual(self.ids("pandsa"), [self.data.pk])
+        self.assertEqual(self.ids("Pyhton"), [self.python.pk, self.web.pk])
+        self.assertEqual(self.ids("zzzz"), [])
+
+    def test_index_follows_edits(self):
+        lesson = Lesson.objects.filter(module__course=self.web).first()
+        lesson.summary = "Flexbox layouts"
+        lesson.save()
+        self.assertEqual(self.ids("flexbox"), [self.web.pk])
+        lesson.module = self.python.modules.get()
+        lesson.save()
+        self.assertEqual(self.ids("flexbox"), [self.python.pk])
+        self.python.delete()
+        self.assertEqual(self.ids("flexbox"), [])
+
+    def test_catalog_view_orders_by_rank(self):
+        response = self.client.get(reverse("courses_list"), {"q": "python"})
+        self.assertEqual([c.pk for c in response.context["courses"]], [self.python.pk, self.web.pk])
+        self.data.is_active = False
+        self.data.save()
+        response = self.client.get(reverse("courses_list"), {"q": "pandas"})
+        self.assertEqual(list(response.context["courses"]), [])
+
+
+# ----- SQLite tuning and the write queue -----
+class WriteQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="learner")
+        self.quiz = Quiz.objects.create(lesson=make_course(n_lessons=1).modules.get().lessons.get())
+        self.queue = writequeue.WriteQueue()
+
+    def contact(self, n):
+        return {"name": f"Visitor {n}", "email": f"v{n}@example.org", "message": "hi"}
+
+    def attempt(self, score):
+        return {"user_id": self.user.pk, "quiz_id": self.quiz.pk, "score": score, "total": 10, "passed": False}
+
+    def apply(self, items):
+        batch = [(kind, payload, Future()) for kind, payload in items]
+        self.queue._apply(batch)
+        return [future for _, _, future in batch]
+
+    def test_sqlite_pragmas(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+        with connection.cursor() as cur:
+            cur.execute("PRAGMA busy_timeout")
+            self.assertEqual(cur.fetchone()[0], settings.SQLITE_PRAGMAS["busy_timeout"])
+
+    def test_batch_applies_in_one_transaction(self):
+        with self.assertNumQueries(4):  # savepoint, two INSERTs, release
+            futures = self.apply([("contact", self.contact(1)), ("quiz_attempt", self.attempt(3)),
+                                  ("contact", self.contact(2))])
+        self.assertEqual([f.result().email for f in (futures[0], futures[2])], ["v1@example.org", "v2@example.org"])
+        self.assertEqual(futures[1].result().score, 3)
+        self.assertIsNotNone(futures[1].result().pk)
+        self.assertEqual((self.queue.batches, self.queue.items), (1, 3))
+
+    def test_failed_batch_retries_items_singly(self):
+        with self.assertLogs("pages.writequeue", "WARNING"):
+            futures = self.apply([("contact", self.contact(1)), ("quiz_attempt", self.attempt(None)),
+                                  ("quiz_attempt", self.attempt(7))])
+        self.assertEqual(futures[0].result().name, "Visitor 1")
+        self.assertIsInstance(futures[1].exception(), IntegrityError)
+        self.assertEqual(futures[2].result().score, 7)
+        self.assertEqual(QuizAttempt.objects.get().score, 7)
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+    def test_collect_drains_up_to_max_batch(self):
+        self.queue = writequeue.WriteQueue(max_batch=3, max_delay=0)
+        for n in range(5):
+            self.queue._queue.put(("contact", self.contact(n), Future()))
+        self.assertEqual([len(self.queue._collect()) for _ in range(2)], [3, 2])
+
+    def test_run_inline_when_disabled(self):
+        result = writequeue.run("completions", (self.user.pk, {999999: True}))
+        self.assertEqual(result, {999999: {"ok": False, "error": "not_found"}})
+        with self.assertRaises(ValueError):
+            self.queue.submit("nope", {})
+
+
+@override_settings(WRITE_QUEUE_ENABLED=True)
+class WriteQueueWorkerTests(TransactionTestCase):
+    def test_concurrent_writes_flush_through_the_worker(self):
+        if connection.vendor == "sqlite" and connection.settings_dict["NAME"] == ":memory:":
+            self.skipTest("the worker thread needs a database it can open")
+        items = writequeue.write_queue.items
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            messages = list(pool.map(
+                lambda n: writequeue.run("contact", {"name": "V", "email": f"v{n}@example.org", "message": str(n)}),
+                range(20),
+            ))
+        self.assertEqual(sorted(int(m.message) for m in messages), list(range(20)))
+        self.assertEqual(ContactMessage.objects.count(), 20)
+        self.assertEqual(writequeue.write_queue.items - items, 20)
+
+
+# ----- Course player markup cache -----
+class CoursePlayerTests(CacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = make_course("python-basics", n_modules=2, n_lessons=3)
+        self.lessons = list(Lesson.objects.filter(module__course=self.course).order_by("module__index", "index"))
+        self.ann, self.bob = (User.objects.create(username=name) for name in ("ann", "bob"))
+        for user in (self.ann, self.bob):
+            Enrollment.objects.create(user=user, course=self.course)
+        complete(self.ann, self.lessons[:2])
+        self.url = reverse("course_detail", args=[self.course.slug])
+
+    def page(self, user):
+        self.client.force_login(user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def curriculum_markup(self, html):
+        return html[html.index('<div class="progression-wrap">'):html.index("<footer")]
+
+    def test_markup_shared_and_completions_applied_client_side(self):
+        ann, bob = self.page(self.ann), self.page(self.bob)
+        self.assertEqual(self.curriculum_markup(ann), self.curriculum_markup(bob))
+        self.assertIn(f'id="completedLessons" type="application/json">[{self.lessons[0].pk}, {self.lessons[1].pk}]', ann)
+        self.assertIn('id="completedLessons" type="application/json">[]', bob)
+
+    def test_fragment_rendered_once_per_curriculum_version(self):
+        self.page(self.ann)
+        cached = get_curriculum(self.course.pk)
+        hollow = dataclasses.replace(cached, modules=())  # what a re-render would show
+        with mock.patch("pages.views.get_curriculum", return_value=hollow):
+            self.assertIn(f"Lesson 1: {self.lessons[0].title}", self.page(self.bob))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[0].title = "Setting up"
+            self.lessons[0].save()
+        self.assertIn("Lesson 1: Setting up", self.page(self.bob))
+
+
+# ----- Content seeding -----
+class SeedingTests(CacheMixin, TempDirMixin, TestCase):
+    def definition(self, **changes):
+        course = {
+            "slug": "algebra", "title": "Algebra", "category": "Maths",
+            "modules": [{"index": 1, "title": "Basics", "lessons": [
+                {"index": 1, "title": "Variables", "quiz": {"questions": [
+                    {"text": "2 + x = 3", "choices": [["x = 1", True], {"text": "x = 2"}]},
+                    {"text": "x - 1 = 1", "choices": [["x = 2", True], ["x = 0", False]]},
+                ]}},
+                {"index": 2, "title": "Equations"},
+            ]}],
+        }
+        course.update(changes)
+        return course
+
+    def sync(self, *courses, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return seeding.sync([seeding._normalise(c) for c in courses], **kwargs)
+
+    def test_second_run_writes_nothing(self):
+        report = self.sync(self.definition())
+        self.assertEqual(report.created, {"Course": 1, "Module": 1, "Lesson": 2, "Quiz": 2, "Question": 2,
+                                          "Choice": 4})
+        course = Course.objects.get(slug="algebra")
+        self.assertEqual((course.n_modules, course.n_lessons), (1, 2))
+        with self.assertNumQueries(10):  # a read per level and a count per pruned level, in a savepoint
+            self.assertFalse(self.sync(self.definition()).changed)
+
+    def test_edits_keep_question_and_choice_ids(self):
+        self.sync(self.definition())
+        ids = dict(Question.objects.values_list("text", "id"))
+        choice_ids = set(Choice.objects.values_list("id", flat=True))
+        quiz_id = Quiz.objects.get(lesson__module__course__slug="algebra", lesson__index=1).pk
+        key = grading.get_answer_key(quiz_id)
+
+        changed = self.definition()
+        questions = changed["modules"][0]["lessons"][0]["quiz"]["questions"]
+        questions.reverse()
+        questions[0]["choices"] = [["x = 2", False], ["x = 0", True]]
+        report = self.sync(changed)
+        self.assertEqual((report.updated, report.created, report.deleted), ({"Question": 2, "Choice": 2}, {}, {}))
+        self.assertEqual(dict(Question.objects.values_list("text", "id")), ids)
+        self.assertEqual(set(Choice.objects.values_list("id", flat=True)), choice_ids)
+        self.assertEqual(list(Question.objects.order_by("order").values_list("text", flat=True)),
+                         ["x - 1 = 1", "2 + x = 3"])
+        self.assertNotEqual(grading.get_answer_key(quiz_id), key)
+
+    def test_prune_and_dry_run(self):
+        self.sync(self.definition())
+        shorter = self.definition()
+        shorter["modules"][0]["lessons"].pop()
+        self.assertEqual(self.sync(shorter).deleted, {})
+        self.assertEqual(self.sync(shorter, prune=True).deleted, {"Lesson": 1})
+        self.assertEqual(Course.objects.get(slug="algebra").n_lessons, 1)
+
+        path = self.tmp / "algebra.json"
+        path.write_text(json.dumps({"courses": [self.definition(title="Algebra I")]}))
+        call_command("seed_content", str(path), "--dry-run", stdout=io.StringIO())
+        self.assertEqual(Course.objects.get(slug="algebra").title, "Algebra")
+
+    def test_malformed_definitions(self):
+        with self.assertRaises(seeding.SeedError):
+            seeding._normalise({"slug": "x"})
+        with self.assertRaises(seeding.SeedError):
+            self.sync(self.definition(), self.definition())
+        with self.assertRaises(seeding.SeedError):
+            seeding.load_definitions(["/nonexistent/seed.json"])
+
+    def test_bundled_seed_data_loads(self):
+        definitions = seeding.load_definitions()
+        self.assertTrue(definitions)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(seeding.sync(definitions).courses)
+
+
+# ----- Load data and benchmarks -----
+class BenchmarkTests(CacheMixin, TempDirMixin, TestCase):
+    def generate(self, *args):
+        call_command("generate_load_data", "--users", "4", "--courses", "3", "--modules", "2", "--lessons", "3",
+                     "--questions", "2", "--choices", "3", "--enrollments", "2", *args, stdout=io.StringIO())
+
+    def test_generated_data_is_consistent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.generate()
+        self.assertEqual(Course.objects.filter(slug__startswith="load-", n_lessons=6).count(), 3)
+        self.assertEqual(Enrollment.objects.filter(user__username__startswith="load-").count(), 8)
+        self.assertEqual(LessonCompletion.objects.count(), 8 * 2)  # 40% of 6 lessons, rounded down
+        self.assertFalse(progress.drifted(Enrollment.objects.all()).exists())
+        self.assertEqual(QuizAttempt.objects.count(), 8 * 2)
+        with self.assertRaises(CommandError):
+            self.generate()  # same prefix twice
+
+        call_command("generate_load_data", "--clear", stdout=io.StringIO())
+        self.assertFalse(Course.objects.filter(slug__startswith="load-").exists())
+        self.assertFalse(User.objects.filter(username__startswith="load-").exists())
+
+    def test_run_benchmarks_reports_every_scenario(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.generate()
+        output = self.tmp / "bench.json"
+        out = io.StringIO()
+        call_command("run_benchmarks", "--iterations", "3", "--warmup", "1", "--output", str(output), stdout=out)
+        results = json.loads(output.read_text())["results"]
+        self.assertEqual(set(results), set(benchmarks.SCENARIOS))
+        for name, result in results.items():
+            with self.subTest(name):
+                self.assertEqual(result["statuses"], {"200": 3})
+                self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+
+        call_command("run_benchmarks", "--scenario", "dashboard", "--iterations", "2", "--compare", str(output),
+                     stdout=out)
+        self.assertIn("Δp50", out.getvalue())
+
+    def test_percentile(self):
+        self.assertEqual(benchmarks.percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(benchmarks.percentile(list(range(1, 101)), 95), 95)
+
+
+# ----- Query inspection and budgets -----
+class QueryInspectorTests(CacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.courses = [make_course(f"course-{n}", n_lessons=1) for n in range(6)]
+        self.staff = User.objects.create(username="staff", is_staff=True)
+
+    def test_repeated_query_shapes_are_grouped(self):
+        recorder = queryinspector.Recorder("/test/")
+        token = queryinspector._recorder.set(recorder)
+        try:
+            for course in self.courses:
+                list(course.modules.all())
+            Course.objects.filter(pk__in=[c.pk for c in self.courses[:2]]).count()
+        finally:
+            queryinspector._recorder.reset(token)
+        [(count, site, sql)] = recorder.repeated(5)
+        self.assertEqual(count, 6)
+        self.assertTrue(site.startswith("pages/tests.py:"))
+        self.assertIn('"pages_module"."course_id" = %s', sql)
+        self.assertEqual(queryinspector.normalise("WHERE id IN (%s, %s, %s) LIMIT 21"), "WHERE id IN (%s, ...) LIMIT N")
+
+    def test_staff_see_the_summary(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("courses_list"))
+        self.assertRegex(response["X-Query-Count"], r"^\d+ queries in [\d.]+ ms; budget 8$")
+        entries = self.client.get(reverse("query_log")).json()["requests"]
+        self.assertEqual((entries[0]["view"], entries[0]["budget"]), ("courses_list", 8))
+        self.client.force_login(User.objects.create(username="learner"))
+        self.assertFalse(self.client.get(reverse("courses_list")).has_header("X-Query-Count"))
+
+    def test_budget_raises_or_logs(self):
+        self.client.force_login(self.staff)
+        with mock.patch.object(views.courses_list, "query_budget", 1):
+            with self.assertRaises(queryinspector.QueryBudgetExceeded):
+                self.client.get(reverse("courses_list"))
+            with override_settings(QUERY_BUDGET_MODE="log"), self.assertLogs("pages.queryinspector", "WARNING"):
+                self.assertEqual(self.client.get(reverse("courses_list")).status_code, 200)
+
+    async def test_counts_queries_moved_to_threads_under_asgi(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse("api_preferences"))
+        self.assertRegex(response["X-Query-Count"], r"^[1-9]\d* queries")
+
+
+# ----- Base template and page bundles -----
+class PageBundleTests(CacheMixin, TempDirMixin, TestCase):
+    STATIC_SRC = re.compile(r'(?:src|href)="/static/([^"]+)"')
+
+    def setUp(self):
+        super().setUp()
+        self.course = make_course("python-basics")
+        self.user = User.objects.create(username="learner")
+        Enrollment.objects.create(user=self.user, course=self.course)
+
+    def assert_uses_bundles(self, html):
+        self.assertNotIn("<style", html)
+        bundles = self.STATIC_SRC.findall(html)
+        self.assertTrue(bundles)
+        for name in bundles:
+            self.assertIsNotNone(finders.find(name), name)
+
+    def test_pages_link_their_bundles(self):
+        anonymous = [reverse("index"), reverse("courses_list"), reverse("course_enroll", args=["python-basics"]),
+                     reverse("register"), reverse("login"), *(reverse("quiz", args=[n]) for n in range(1, 9))]
+        learner = [reverse("dashboard"), reverse("settings"), reverse("course_detail", args=["python-basics"])]
+        for url in anonymous + learner:
+            if url == learner[0]:
+                self.client.force_login(self.user)
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assert_uses_bundles(response.content.decode())
+        # Per-request values reach the scripts as data-* attributes
+        settings_page = self.client.get(reverse("settings"))
+        self.assertContains(settings_page, f'data-api-preferences="{reverse("api_preferences")}"')
+
+    def test_minifier_keeps_strings_and_regexes(self):
+        source = 'var a = "/* keep */";  // drop\nvar r = /a\\/b/g, t = `x  y`;\n/* drop */\nreturn a\n'
+        self.assertEqual(staticassets.minify_js(source), 'var a="/* keep */";\nvar r=/a\\/b/g,t=`x  y`;\nreturn a\n')
+        css = ("/* drop */\na:hover ,\nb > c {\n  content: \"  x \";\n}\n"
+               "@media (min-width: 10px) and (max-width: 20px) {}\n")
+        self.assertEqual(staticassets.minify_css(css),
+                         'a:hover,b>c{content:"  x "}@media (min-width:10px) and (max-width:20px){}\n')
+
+    def test_minified_bundles_still_parse(self):
+        node = shutil.which("node")
+        if node is None:
+            self.skipTest("node not installed")
+        for path in sorted(Path(finders.find("js")).glob("*.js")):
+            with self.subTest(path.name):
+                minified = self.tmp / path.name
+                minified.write_text(staticassets.minify_js(path.read_text(encoding="utf-8")), encoding="utf-8")
+                result = subprocess.run([node, "--check", str(minified)], capture_output=True, text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+                self.assertLess(minified.stat().st_size, path.stat().st_size)
+
+# ----- Static quiz containers -----
+class StaticQuizTests(TestCase):
+    def setUp(self):
+        static_quizzes.reset()
+        self.addCleanup(static_quizzes.reset)
+
+    def test_pages_use_provisioned_rows(self):
+        ids = static_quizzes.static_quiz_ids()
+        self.assertEqual(sorted(ids), list(static_quizzes.STATIC_QUIZ_NUMBERS))
+        response = self.client.get(reverse("quiz", args=[3]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["quiz_id"], ids[3])
+        self.assertEqual(self.client.get(reverse("quiz", args=[9])).status_code, 404)
+
+    def test_missing_rows_are_logged_and_404_without_writing(self):
+        quiz_id = static_quizzes.static_quiz_ids()[2]
+        Quiz.objects.filter(pk=quiz_id).delete()  # resets the mapping
+        n_quizzes = Quiz.objects.count()
+        with self.assertLogs("pages.static_quizzes", "ERROR"):
+            self.assertEqual(self.client.get(reverse("quiz", args=[2])).status_code, 404)
+        with self.assertLogs("pages.static_quizzes", "ERROR"):
+            self.assertEqual(self.client.get(reverse("quiz", args=[3])).status_code, 200)
+        self.assertEqual(Quiz.objects.count(), n_quizzes)
+
+        # The partial mapping wasn't kept: repairing the rows is enough
+        static_quizzes.provision(Course, Module, Lesson, Quiz)
+        self.assertEqual(self.client.get(reverse("quiz", args=[2])).status_code, 200)
+        self.assertEqual(len(static_quizzes.static_quiz_ids()), 8)
+
+
+# ----- CSV enrollment import -----
+class EnrollmentImportTests(TempDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = make_course("web-dev", n_lessons=3)
+        self.ann = User.objects.create(username="ann@example.org", email="ann@example.org")
+        self.bob = User.objects.create(username="bob", email="Bob@Example.org")  # pre-signup account
+
+    def run_import(self, csv_text, **kwargs):
+        return enrollment_import.import_enrollments(enrollment_import.read_rows(io.StringIO(csv_text)), **kwargs)
+
+    def test_emails_match_case_insensitively(self):
+        report = self.run_import(
+            "Email,Course\n"
+            "ANN@Example.org,web-dev\n"
+            "bob@example.ORG,web-dev\n"
+            "Ann@example.org,web-dev\n"
+        )
+        self.assertEqual((report.enrolled, report.duplicates, report.users_created), (2, 1, 0))
+        self.assertEqual(set(Enrollment.objects.values_list("user_id", flat=True)), {self.ann.pk, self.bob.pk})
+
+    def test_create_users_does_not_duplicate_accounts(self):
+        report = self.run_import(
+            "email,course,first_name\n"
+            "ANN@example.org,web-dev,Ann\n"
+            "New.Learner@Example.org,web-dev,New\n",
+            create_users=True,
+        )
+        self.assertEqual(report.users_created, 1)
+        self.assertEqual(User.objects.filter(username__iexact="ann@example.org").count(), 1)
+        new = User.objects.get(username="new.learner@example.org")
+        self.assertFalse(new.has_usable_password())
+        self.assertTrue(UserProfile.objects.filter(user=new).exists())
+        self.assertEqual(Enrollment.objects.get(user=new).total_lessons, 3)
+
+    def test_errors_and_reimport(self):
+        complete(self.ann, Lesson.objects.filter(module__course=self.course)[:2])
+        report = self.run_import(
+            "email,course,status\n"
+            "not-an-email,web-dev,\n"
+            "ann@example.org,nope,\n"
+            "ann@example.org,web-dev,bogus\n"
+            "ghost@example.org,web-dev,\n"
+            "ann@example.org,web-dev,\n"
+        )
+        self.assertEqual((report.rows, report.enrolled, report.n_errors), (5, 1, 4))
+        self.assertEqual(sorted(line for line, _ in report.errors), [2, 3, 4, 5])
+        enrollment = Enrollment.objects.get(user=self.ann)
+        self.assertEqual((enrollment.completed_lessons, enrollment.total_lessons), (2, 3))
+        again = self.run_import("email,course\nann@example.org,web-dev\n")
+        self.assertEqual((again.enrolled, again.already_enrolled), (0, 1))
+
+    def test_missing_columns(self):
+        with self.assertRaises(ValueError):
+            self.run_import("name,course\nann,web-dev\n")
+
+    def test_inactive_courses_are_rejected(self):
+        make_course("retired", is_active=False)
+        report = self.run_import("email,course\nann@example.org,retired\n")
+        self.assertEqual(report.errors, [(2, "unknown or inactive course 'retired'")])
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_failed_batch_retries_rows_singly(self):
+        real = enrollment_import._import_batch
+
+        def import_batch(batch, *args):
+            real(batch, *args)
+            if any(row["email"] == "bob@example.org" for _, row in batch):
+                raise IntegrityError("boom")
+
+        csv_text = "email,course\nann@example.org,web-dev\nbob@example.org,web-dev\nnew@example.org,web-dev\n"
+        with mock.patch.object(enrollment_import, "_import_batch", import_batch), \
+                self.assertLogs("pages.enrollment_import", "WARNING"):
+            report = self.run_import(csv_text, create_users=True, batch_size=2)
+        self.assertEqual((report.rows, report.enrolled, report.users_created), (3, 2, 1))
+        self.assertEqual(report.errors, [(3, "not imported: boom")])
+        self.assertEqual(set(Enrollment.objects.values_list("user__username", flat=True)),
+                         {"ann@example.org", "new@example.org"})
+
+    def test_command_commits_per_batch_unless_dry_run(self):
+        path = self.tmp / "cohort.csv"
+        path.write_text("email,course\nann@example.org,web-dev\nbob@example.org,nope\n")
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_enrollments", str(path), "--dry-run", stdout=out, stderr=err)
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertIn("line 3: unknown or inactive course 'nope'", err.getvalue())
+        call_command("import_enrollments", str(path), "--batch-size", "1", stdout=out, stderr=err)
+        self.assertEqual(Enrollment.objects.get().user, self.ann)
+
+
+# ----- Answer-key grading and its cache -----
+class GradingTests(CacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        grading.answer_keys.clear()
+        lesson = make_course(n_lessons=1).modules.get().lessons.get()
+        self.quiz = Quiz.objects.create(lesson=lesson, pass_mark=50)
+        self.q1 = Question.objects.create(quiz=self.quiz, text="One", order=2)
+        self.q2 = Question.objects.create(quiz=self.quiz, text="Two", order=1)
+        self.q3 = Question.objects.create(quiz=self.quiz, text="No choices", order=3)
+        self.right1 = Choice.objects.create(question=self.q1, text="A", is_correct=True)
+        self.wrong1 = Choice.objects.create(question=self.q1, text="B", is_correct=False)
+        self.right2 = Choice.objects.create(question=self.q2, text="C", is_correct=True)
+
+    def key(self):
+        return grading.get_answer_key(self.quiz.pk)
+
+    def test_load_and_grade(self):
+        with self.assertNumQueries(1):
+            key = grading.load_answer_key(self.quiz.pk)
+        self.assertEqual(key.question_ids, (self.q2.pk, self.q1.pk, self.q3.pk))
+        result = grading.grade(key, {str(self.q1.pk): str(self.right1.pk), str(self.q2.pk): "junk"})
+        self.assertEqual((result.correct, result.total, result.score), (1, 3, 33))
+        self.assertEqual(result.raw_answers, {
+            str(self.q2.pk): "junk", str(self.q1.pk): str(self.right1.pk), str(self.q3.pk): "",
+        })
+        self.assertEqual(grading.answers_from_post({"q_5": "7", "csrfmiddlewaretoken": "x"}), {"5": "7"})
+
+    def test_cached_until_content_changes(self):
+        first = self.key()
+        with self.assertNumQueries(0):
+            self.assertIs(self.key(), first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.wrong1.is_correct = True
+            self.wrong1.save()
+        second = self.key()
+        self.assertIn(self.wrong1.pk, second.correct[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.q3.delete()
+        self.assertEqual(self.key().total, 2)
+        self.assertEqual(grading.answer_keys.stats()["size"], 1)  # old versions dropped
+
+    def test_other_workers_see_the_bump(self):
+        # A second worker: its own answer-key LRU and its own cache connection
+        worker = grading.AnswerKeyCache()
+        self.assertEqual(worker.get(self.quiz.pk).total, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.q3.delete()
+        other = caches.create_connection(versions.alias())
+        self.assertEqual(other.get(f"ver:quiz:{self.quiz.pk}"), versions.get_version("quiz", self.quiz.pk))
+        self.assertEqual(worker.get(self.quiz.pk).total, 2)
+
+    def test_process_local_version_cache_is_rejected(self):
+        self.assertEqual(checks.check_content_version_cache(None), [])
+        local = {**settings.CACHES, versions.alias(): {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with override_settings(CACHES=local):
+            self.assertEqual([e.id for e in checks.check_content_version_cache(None)], ["pages.E001"])
+
+    def test_choice_moved_between_quizzes_bumps_both(self):
+        other = Quiz.objects.create(lesson=Lesson.objects.create(
+            module=self.quiz.lesson.module, index=5, title="Other"))
+        target = Question.objects.create(quiz=other, text="Target", order=1)
+        self.key(), grading.get_answer_key(other.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.right2.question = target
+            self.right2.save()
+        self.assertEqual(self.key().correct[0], frozenset())
+        self.assertEqual(grading.get_answer_key(other.pk).correct[0], frozenset({self.right2.pk}))
+
+    def test_submit_api_grades_and_records(self):
+        user = User.objects.create(username="learner")
+        self.client.force_login(user)
+        response = self.client.post(reverse("api_quiz_attempt", args=[self.quiz.pk]), {
+            f"q_{self.q1.pk}": self.right1.pk, f"q_{self.q2.pk}": self.right2.pk,
+        })
+        self.assertEqual(response.json()["score"], 67)
+        self.assertTrue(response.json()["passed"])
+        attempt = QuizAttempt.objects.get(user=user)
+        self.assertEqual((attempt.score, attempt.total), (67, 3))
+
+
+# ----- Gated resource downloads -----
+class ResourceDownloadTests(TempDirMixin, TestCase):
+    BODY = bytes(range(256)) * 4  # 1 KiB
+
+    def setUp(self):
+        super().setUp()
+        self.override = override_settings(MEDIA_ROOT=self.tmp, RESOURCE_SENDFILE=None)
+        self.override.enable()
+        self.addCleanup(self.override.disable)
+        self.course = make_course("web-dev", n_lessons=1, is_active=True)
+        lesson = self.course.modules.get().lessons.get()
+        self.resource = Resource.objects.create(lesson=lesson, name="Slides",
+                                                file=ContentFile(self.BODY, "slides.pdf"))
+        self.url = downloads.resource_url(self.resource)
+        self.learner = User.objects.create(username="learner")
+        Enrollment.objects.create(user=self.learner, course=self.course)
+
+    def get(self, url=None, **headers):
+        response = self.client.get(url or self.url, headers=headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_gating(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)  # login
+        stranger = User.objects.create(username="stranger")
+        self.client.force_login(stranger)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse("course_enroll", args=["web-dev"]), fetch_redirect_response=False)
+
+        self.client.force_login(self.learner)
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, self.BODY))
+        self.assertIn('filename="Slides.pdf"', response["Content-Disposition"])
+
+        Course.objects.filter(pk=self.course.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(User.objects.create(username="staff", is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_etag_and_versioned_url(self):
+        self.client.force_login(self.learner)
+        response, _ = self.get()
+        sha = blobstore.sha256_of(self.resource.file.name)
+        self.assertEqual(response["ETag"], f'"{sha}"')
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(self.get(If_None_Match=response["ETag"])[0].status_code, 304)
+        unversioned, _ = self.get(reverse("resource_download", args=[self.resource.pk]))
+        self.assertNotIn("immutable", unversioned["Cache-Control"])
+
+    def test_ranges(self):
+        self.client.force_login(self.learner)
+        response, body = self.get(Range="bytes=10-19")
+        self.assertEqual((response.status_code, body), (206, self.BODY[10:20]))
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(self.get(Range="bytes=-4")[1], self.BODY[-4:])
+        self.assertEqual(self.get(Range="bytes=1000-")[1], self.BODY[1000:])
+        self.assertEqual(self.get(Range="bytes=5000-")[0].status_code, 416)
+        self.assertEqual(self.get(Range="bytes=0-1,5-6")[0].status_code, 200)  # multi-range: whole file
+        # If-Range with a stale validator: the whole file, not a fragment
+        response, body = self.get(Range="bytes=0-9", If_Range='"stale"')
+        self.assertEqual((response.status_code, len(body)), (200, 1024))
+
+    def test_parse_range(self):
+        self.assertIsNone(downloads.parse_range("items=0-1", 10))
+        self.assertIsNone(downloads.parse_range("bytes=5-2", 10))
+        self.assertEqual(downloads.parse_range("bytes=2-100", 10), (2, 9))
+        self.assertIs(downloads.parse_range("bytes=-0", 10), False)
+
+    @override_settings(RESOURCE_SENDFILE="x-accel-redirect", RESOURCE_ACCEL_PREFIX="/protected-media/")
+    def test_accel_redirect(self):
+        self.client.force_login(self.learner)
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/" + self.resource.file.name)
+        self.assertEqual(response.content, b"")
+
+
+# ----- Read replica routing -----
+class ReadReplicaTests(CacheMixin, TestCase):
+    """
+    The test database has no replica, so the middleware is told there is
+    one and the router records where reads would have gone.
+    """
+
+    def setUp(self):
+        super().setUp()
+        make_course("python-basics", is_active=True)
+        self.flags = []
+        real = routers.ReadReplicaRouter.db_for_read
+
+        def recording(router, model, **hints):
+            if model._meta.app_label == "pages":
+                self.flags.append(routers.use_replica.get())
+            return real(router, model, **hints)
+
+        for patcher in (
+            mock.patch("pages.middleware.replica_configured", return_value=True),
+            mock.patch.object(routers.ReadReplicaRouter, "db_for_read", recording),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_read_only_views_use_replica(self):
+        self.assertEqual(self.client.get(reverse("courses_list")).status_code, 200)
+        self.assertTrue(self.flags and all(self.flags))
+        self.assertFalse(routers.use_replica.get())
+
+    def test_other_views_and_writes_stay_on_default(self):
+        self.client.post(reverse("contact_submit"), {"name": "A", "email": "a@example.org", "message": "hi"})
+        self.client.get(reverse("quiz", args=[1]))
+        self.assertTrue(self.flags)
+        self.assertFalse(any(self.flags))
+
+    async def test_read_only_views_use_replica_under_asgi(self):
+        for name in ("index", "courses_list"):
+            response = await self.async_client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.flags and all(self.flags))
+        self.assertFalse(routers.use_replica.get())
+
+
+# ----- Curriculum snapshots -----
+class CurriculumTests(CacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = make_course(n_modules=2, n_lessons=2)
+        self.other = make_course("other", n_lessons=1)
+
+    def snapshot(self, course=None):
+        return get_curriculum((course or self.course).pk)
+
+    def titles(self, course=None):
+        return [l.title for m in self.snapshot(course).modules for l in m.lessons]
+
+    def test_cached_per_version(self):
+        first = self.snapshot()
+        self.assertEqual((first.n_modules, first.n_lessons), (2, 4))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.snapshot(), first)
+
+    def test_edits_invalidate(self):
+        stale = self.snapshot()
+        lesson = Lesson.objects.get(module__course=self.course, module__index=1, index=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.title = "Renamed"
+            lesson.save()
+        self.assertIn("Renamed", self.titles())
+        self.assertNotEqual(self.snapshot().version, stale.version)
+
+        module = self.course.modules.get(index=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.create(module=module, index=9, title="Added")
+        self.assertEqual(self.titles()[-1], "Added")
+        with self.captureOnCommitCallbacks(execute=True):
+            module.delete()
+        self.assertEqual(self.snapshot().n_modules, 1)
+
+    def test_lesson_moved_between_courses(self):
+        self.snapshot(), self.snapshot(self.other)
+        lesson = Lesson.objects.filter(module__course=self.course).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.module = self.other.modules.get()
+            lesson.save()
+        self.assertEqual(self.snapshot().n_lessons, 3)
+        self.assertIn(lesson.title, self.titles(self.other))
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir())
+    def test_resource_edit_invalidates(self):
+        lesson = Lesson.objects.filter(module__course=self.course).first()
+        self.snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            Resource.objects.create(lesson=lesson, name="Notes", file=ContentFile(b"notes", "notes.txt"))
+        entry = self.snapshot().modules[0].lessons[0]
+        self.assertEqual([r.name for r in entry.resources], ["Notes"])
+
+
+# ----- Static assets -----
+@override_settings(DEBUG=False, STATIC_SERVE=True, STATIC_URL="/static/", STATIC_IMAGE_WIDTHS=(100,))
+class StaticAssetsTests(TempDirMixin, TestCase):
+    def collect(self, files):
+        """Copy `files` ({name: bytes}) into self.tmp as collectstatic would."""
+        source = FileSystemStorage(location=self.tmp / "src")
+        for name, data in files.items():
+            source.save(name, ContentFile(data))
+        storage = staticassets.CompressedManifestStaticFilesStorage(location=self.tmp / "root", base_url="/static/")
+        for name in files:
+            with source.open(name) as fh:
+                storage.save(name, fh)
+        processed = list(storage.post_process({name: (source, name) for name in files}))
+        self.assertFalse([error for *_, error in processed if isinstance(error, Exception)])
+        return storage
+
+    def middleware(self):
+        with override_settings(STATIC_ROOT=self.tmp / "root"):
+            return staticassets.StaticFilesMiddleware(lambda request: HttpResponse("app"))
+
+    def png(self):
+        out = io.BytesIO()
+        Image.effect_noise((300, 200), 40).convert("RGB").save(out, "PNG")
+        return out.getvalue()
+
+    def test_bundles_minified_and_compressed(self):
+        css = b"/* layout */\nbody {\n    margin: 0;\n}\n" * 50
+        storage = self.collect({"css/app.css": css})
+        hashed = storage.stored_name("css/app.css")
+        with storage.open(hashed) as fh:
+            minified = fh.read()
+        self.assertNotIn(b"layout", minified)
+        self.assertEqual(minified, b"body{margin:0}" * 50 + b"\n")
+        with storage.open(hashed + ".gz") as fh:
+            self.assertEqual(gzip.decompress(fh.read()), minified)
+
+    def test_failed_image_encode_skips_the_variant(self):
+        real = staticassets._encode
+
+        def encode(image, fmt, options):
+            if fmt == "AVIF":
+                raise OSError("encoder not available")
+            return real(image, fmt, options)
+
+        with mock.patch.object(staticassets, "_encode", encode), self.assertLogs("pages.staticassets", "WARNING"):
+            storage = self.collect({"img/photo.png": self.png()})
+        hashed = storage.stored_name("img/photo.png")
+        stem = hashed[:-len(".png")]
+        self.assertEqual(storage.srcsets[hashed], {"100": f"{stem}.100w.png", "300": hashed})
+        self.assertFalse(any(name.endswith(".avif") for name in os.listdir(self.tmp / "root" / "img")))
+        # The manifest written back through the public API keeps the widths
+        reloaded = staticassets.CompressedManifestStaticFilesStorage(location=self.tmp / "root")
+        self.assertEqual(reloaded.srcsets, storage.srcsets)
+
+    def test_negotiates_encoding(self):
+        storage = self.collect({"css/app.css": b"body { color: red; }\n" * 100})
+        middleware = self.middleware()
+        url = storage.url("css/app.css")
+        factory = RequestFactory()
+
+        response = middleware(factory.get(url, HTTP_ACCEPT_ENCODING="br;q=0, gzip"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertIn("immutable", response["Cache-Control"])
+        plain = middleware(factory.get(url))
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(plain.streaming_content), b"body{color:red}" * 100 + b"\n")
+
+        cached = middleware(factory.get(url, HTTP_IF_NONE_MATCH=plain["ETag"]))
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(middleware(factory.get("/static/missing.css")).content, b"app")
+
+    def test_negotiates_image_format(self):
+        storage = self.collect({"img/photo.png": self.png()})
+        hashed = storage.stored_name("img/photo.png")
+        root = self.tmp / "root"
+        # Whichever copies this Pillow build could write and that came out smaller
+        for fmt in ("avif", "webp"):
+            if not (root / f"{hashed}.{fmt}").exists():
+                (root / f"{hashed}.{fmt}").write_bytes(b"variant")
+        middleware = self.middleware()
+        factory = RequestFactory()
+        url = "/static/" + hashed
+
+        response = middleware(factory.get(url, HTTP_ACCEPT="image/webp,image/*;q=0.8"))
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertEqual(response["Vary"], "Accept")
+        response = middleware(factory.get(url, HTTP_ACCEPT="image/avif,image/webp"))
+        self.assertEqual(response["Content-Type"], "image/avif")
+        self.assertEqual(middleware(factory.get(url, HTTP_ACCEPT="*/*"))["Content-Type"], "image/png")
+
+    def test_not_used_under_debug(self):
+        self.collect({"css/app.css": b"body { color: red; }\n"})
+        for overrides in ({"DEBUG": True}, {"STATIC_SERVE": False}):
+            with self.subTest(**overrides), override_settings(**overrides), self.assertRaises(MiddlewareNotUsed):
+                self.middleware()
@@ -15,6 +15,7 @@ urlpatterns = [
 
     # Keep only ONE course detail route
     path("course/<slug:slug>/", views.course_detail, name="course_detail"),
+    path("resources/<int:resource_id>/", views.resource_download, name="resource_download"),
 
     # Static quizzes 1..8
     path("quiz/<int:num>/", views.quiz_static, name="quiz"),
@@ -24,9 +25,12 @@ urlpatterns = [
     path("api/preferences/", views.api_preferences, name="api_preferences"),
     path("api/account/delete/", views.api_delete_account, name="api_delete_account"),
     path("api/lesson/toggle/", views.api_toggle_lesson_completion, name="api_toggle_lesson"),
+    path("api/lesson/bulk/", views.api_bulk_lesson_completion, name="api_bulk_lessons"),
     path("api/quiz/<int:quiz_id>/attempt/", views.api_submit_quiz_attempt, name="api_quiz_attempt"),
 
     # Staff helpers
     path("enroll/<int:user_id>/<slug:slug>/", views.enroll_user, name="enroll_user"),
     path("unenroll/<int:user_id>/<slug:slug>/", views.unenroll_user, name="unenroll_user"),
+    path("staff/export/<str:kind>/", views.export_activity, name="export_activity"),
+    path("staff/queries/", views.query_log, name="query_log"),
 ]
@@ -0,0 +1,55 @@
+"""
+Content versions used to key derived caches (answer keys, curriculum, ...).
+
+A version is a monotonically increasing integer stored in Django's cache.
+Bumping a version makes every cache entry keyed by the old value unreachable,
+so nothing has to be deleted explicitly. Versions are seeded from the clock
+(microseconds) so that a cache flush or restart never hands out a value that
+was already used for older content.
+
+Versions must be visible to every worker, or an edit handled by one would
+leave the others serving (and grading with) stale entries. They live in the
+CONTENT_VERSION_CACHE alias: a file-based cache by default, shared by the
+workers of one host; point it at Redis/Memcached when running several hosts.
+A system check (pages.checks) rejects process-local backends for it.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def alias():
+    return getattr(settings, "CONTENT_VERSION_CACHE", "default")
+
+
+def _cache():
+    return caches[alias()]
+
+
+def _key(scope: str, ident=None) -> str:
+    return f"ver:{scope}" if ident is None else f"ver:{scope}:{ident}"
+
+
+def _now() -> int:
+    return time.time_ns() // 1000
+
+
+def get_version(scope: str, ident=None) -> int:
+    cache = _cache()
+    key = _key(scope, ident)
+    version = cache.get(key)
+    if version is None:
+        version = _now()
+        # add() so concurrent first readers agree on one value
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(scope: str, ident=None) -> int:
+    cache = _cache()
+    key = _key(scope, ident)
+    version = max(_now(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, timeout=None)
+    return version
@@ -1,9 +1,14 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, Http404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 
 from django.contrib import messages
 from django.contrib.auth import login
 from .forms import SignupForm
+from . import attempt_spool, avatars, bitmaps, completions, downloads, exports, grading, pagecache, queryinspector, search, writequeue
+from .curriculum import get_curriculum
+from .static_quizzes import static_quiz_ids
 from .models import (
     Course, Module, Lesson, Resource, Enrollment,
     LessonCompletion, UserProfile, Quiz, QuizAttempt, Question, Choice, ContactMessage
@@ -19,9 +24,10 @@ import json
 
 from django.contrib.auth.hashers import check_password
 from django.urls import reverse
-from django.db.models import Count, Q
+from django.db.models import Q
 
 # ----- Pages kept from your UI -----
+@pagecache.cache_anonymous_page
 def index(request):
     """Homepage shows courses that actually exist in DB (admin-created)."""
     courses = Course.objects.filter(is_active=True).order_by("title")
@@ -56,46 +62,16 @@ def contact_submit(request):
         messages.error(request, "Please fill in all contact fields.")
         return redirect("index")  # simple UX
 
-    ContactMessage.objects.create(name=name, email=email, message=message)
+    writequeue.run("contact", {"name": name, "email": email, "message": message})
     messages.success(request, "Thanks! We’ll get back to you within 1 business day.")
     return redirect("index")
 
-def _ensure_static_quiz(num: int) -> int:
-    """
-    Make sure there's a Course/Module/Lesson/Quiz for the given quiz number.
-    Returns the Quiz.id so the template can POST to /api/quiz/<id>/attempt/.
-    """
-    # A dedicated container so it won't clash with your real courses
-    course, _ = Course.objects.get_or_create(
-        slug="web-dev-static",
-        defaults={
-            "title": "Web Development (Static Quizzes)",
-            "category": "Web Dev",
-            "short_desc": "Container course for static quiz pages 1–8.",
-            "is_active": True,
-        },
-    )
-    module, _ = Module.objects.get_or_create(
-        course=course,
-        index=1,
-        defaults={"title": "Module (Static Quizzes)", "intro": "Auto-provisioned"},
-    )
-    lesson, _ = Lesson.objects.get_or_create(
-        module=module,
-        index=num,
-        defaults={"title": f"Static Quiz {num}", "summary": "Auto-provisioned"},
-    )
-    quiz, _ = Quiz.objects.get_or_create(
-        lesson=lesson, defaults={"title": f"Quiz {num}", "pass_mark": 60}
-    )
-    return quiz.id
-
 # --- your existing view, replace it with this version ---
 def quiz_static(request, num: int):
-    # Allow only 1..8
-    if not (1 <= num <= 8):
+    # Allow only 1..8; containers are provisioned by migration 0008
+    quiz_id = static_quiz_ids().get(num)
+    if quiz_id is None:
         raise Http404("Quiz not found")
-    quiz_id = _ensure_static_quiz(num)
     api_url = reverse("api_quiz_attempt", args=[quiz_id])
     # render the right static file and inject context for JS
     return render(
@@ -144,6 +120,7 @@ def register(request):
     return render(request, "register.html", {"form": form})
 
 # ----- Dashboard -----
+@queryinspector.query_budget(5)
 @login_required
 def dashboard(request):
     enrollments = (
@@ -161,7 +138,7 @@ def dashboard(request):
             "category": c.category or "General",
             "status": e.status or "In Progress",
             "desc": c.short_desc or "",
-            "progress": 0,
+            "progress": e.progress,
             "tags": ["Enrolled"],
             "badge": "NEW" if c.slug == "full-stack-web-dev" else ""
         })
@@ -173,91 +150,119 @@ def dashboard(request):
 
 
 # ----- Dynamic Course Page (optional) -----
+@queryinspector.query_budget(10)
 @login_required
 def course_detail(request, slug):
     """
     Authenticated course player. Only enrolled users can access.
     """
-    course = get_object_or_404(Course, slug=slug, is_active=True)
-
-    # Gate: must be enrolled
-    if not Enrollment.objects.filter(user=request.user, course=course).exists():
+    # One query for the gate and the course; a second only to tell a
+    # missing course (404) from a missing enrollment (redirect).
+    enrollment = (
+        Enrollment.objects.select_related("course")
+        .filter(user=request.user, course__slug=slug, course__is_active=True)
+        .first()
+    )
+    if enrollment is None:
+        course = get_object_or_404(Course, slug=slug, is_active=True)
         messages.info(request, "Please enroll to access the course player.")
         return redirect("course_enroll", slug=course.slug)
+    course = enrollment.course
 
-    # Curriculum
-    modules = (
-        course.modules.all()
-        .prefetch_related("lessons__resources")
-        .order_by("index")
-    )
+    # Curriculum (cached snapshot)
+    curriculum = get_curriculum(course.id)
 
     # Completed lesson IDs for this user
-    completed_ids = set(
-        LessonCompletion.objects.filter(
-            user=request.user,
-            lesson__module__course=course,
-            completed=True,
-        ).values_list("lesson_id", flat=True)
-    )
-
-    # For JS to mark module badges as completed when all lessons done
-    module_lessons = [
-        {"anchor": f"module{m.index}", "lesson_ids": [l.id for l in m.lessons.all()]}
-        for m in modules
-    ]
-
-    counts = course.modules.aggregate(
-        n_modules=Count("id", distinct=True),
-        n_lessons=Count("lessons", distinct=True),
-    )
+    if bitmaps.enabled():
+        completed_ids = bitmaps.completed_ids(request.user.id, curriculum)
+    else:
+        completed_ids = set(
+            LessonCompletion.objects.filter(
+                user=request.user,
+                lesson__module__course=course,
+                completed=True,
+            ).values_list("lesson_id", flat=True)
+        )
 
     return render(request, "course_player.html", {
         "course": course,
-        "modules": modules,
-        "completed_ids": completed_ids,
-        "module_lessons_json": json.dumps(module_lessons),
-        "n_modules": counts.get("n_modules") or 0,
-        "n_lessons": counts.get("n_lessons") or 0,
+        "modules": curriculum.modules,
+        "curriculum_version": curriculum.version,
+        # Applied client-side over the cached curriculum fragment
+        "completed_ids": sorted(completed_ids),
+        "module_lessons_json": curriculum.module_lessons_json,
+        "n_modules": curriculum.n_modules,
+        "n_lessons": curriculum.n_lessons,
     })
 
+@queryinspector.query_budget(5)
+@login_required
+@require_http_methods(["GET", "HEAD"])
+def resource_download(request, resource_id):
+    """Lesson resource file, for staff and learners enrolled in its course."""
+    resource = get_object_or_404(Resource.objects.select_related("lesson__module__course"), pk=resource_id)
+    if not resource.file:
+        raise Http404("No file")
+    course = resource.lesson.module.course
+    if not request.user.is_staff and not (
+        course.is_active and Enrollment.objects.filter(user=request.user, course=course).exists()
+    ):
+        messages.info(request, "Please enroll to download course resources.")
+        return redirect("course_enroll", slug=course.slug)
+    return downloads.serve_resource(request, resource)
+
 # ===========================
 # JSON API (fetch/AJAX)
 # ===========================
 
+# Pillow checks and file I/O; accepting may process inline (AVATAR_WORKERS = 0)
+_validate_avatar = sync_to_async(avatars.validate, thread_sensitive=False)
+_avatar_json = sync_to_async(avatars.as_json, thread_sensitive=False)
+_accept_avatar = sync_to_async(avatars.accept)
+
+@queryinspector.query_budget(6)
 @login_required
 @require_http_methods(["GET", "POST", "PUT", "PATCH"])
-def api_profile(request):
+async def api_profile(request):
     """
     GET  -> Return current user's profile data
     POST/PUT/PATCH -> Update user + profile (supports multipart for avatar)
     """
-    profile, _ = UserProfile.objects.get_or_create(user=request.user)
+    user = await request.auser()
+    profile, _ = await UserProfile.objects.aget_or_create(user=user)
 
     # ---------- GET ----------
     if request.method == "GET":
+        avatar = await _avatar_json(profile)
         return JsonResponse({
-            "first_name": request.user.first_name or "",
-            "last_name": request.user.last_name or "",
-            "email": request.user.email or "",
+            "first_name": user.first_name or "",
+            "last_name": user.last_name or "",
+            "email": user.email or "",
             "phone": profile.phone or "",
             "country": profile.country or "",
             "timezone": profile.timezone or "",
             "bio": profile.bio or "",
-            "avatar_url": profile.avatar.url if profile.avatar else "",
+            "avatar_url": avatar["url"],
+            "avatar": avatar,  # {"url", "srcset" (WebP), "jpeg_srcset", "pending"}
         })
 
     # ---------- POST / PUT / PATCH ----------
     data = request.POST or {}
+    upload = request.FILES.get("avatar")
+    if upload:
+        try:
+            await _validate_avatar(upload)
+        except ValueError as exc:
+            return JsonResponse({"ok": False, "error": str(exc)}, status=400)
 
     # --- Update core user fields ---
-    request.user.first_name = data.get("first_name", request.user.first_name)
-    request.user.last_name = data.get("last_name", request.user.last_name)
+    user.first_name = data.get("first_name", user.first_name)
+    user.last_name = data.get("last_name", user.last_name)
     email = data.get("email")
     if email:
-        request.user.email = email.strip().lower()
-        request.user.username = email.strip().lower()  # keep username=email pattern
-    request.user.save()
+        user.email = email.strip().lower()
+        user.username = email.strip().lower()  # keep username=email pattern
+    await user.asave()
 
     # --- Update profile fields ---
     profile.phone = data.get("phone", profile.phone)
@@ -265,18 +270,19 @@ def api_profile(request):
     profile.timezone = data.get("timezone", profile.timezone)
     profile.bio = data.get("bio", profile.bio)
 
-    # Handle avatar upload
-    if request.FILES.get("avatar"):
-        profile.avatar = request.FILES["avatar"]
+    await profile.asave()
 
-    profile.save()
+    # The avatar is resized and re-encoded in the background (pages.avatars)
+    if upload:
+        await _accept_avatar(user.id, upload)
 
-    return JsonResponse({"ok": True, "message": "Profile updated successfully"})
+    return JsonResponse({"ok": True, "message": "Profile updated successfully", "avatar_pending": bool(upload)})
 
 @login_required
 @require_http_methods(["GET","POST","PUT","PATCH"])
-def api_preferences(request):
-    profile = request.user.userprofile
+async def api_preferences(request):
+    user = await request.auser()
+    profile, _ = await UserProfile.objects.aget_or_create(user=user)
     if request.method == "GET":
         return JsonResponse(profile.prefs or {})
 
@@ -287,46 +293,97 @@ def api_preferences(request):
         "nMarketing": request.POST.get("nMarketing","false") in ("true","1","on"),
     }
     profile.prefs = prefs
-    profile.save()
+    await profile.asave(update_fields=["prefs", "updated_at"])
     return JsonResponse({"ok": True})
 
+# Completion writes and grading helpers are sync (bulk upserts, cache tiers);
+# thread_sensitive keeps them on the request's ORM thread.
+_run_write = sync_to_async(writequeue.run)
+_answer_key = sync_to_async(grading.get_answer_key)
+_course_progress = sync_to_async(completions.course_progress)
+# File I/O with fsync: no connection involved, so any executor thread will do
+_spool_attempt = sync_to_async(attempt_spool.enqueue, thread_sensitive=False)
+
+@queryinspector.query_budget(9)
 @login_required
 @require_http_methods(["POST"])
-def api_toggle_lesson_completion(request):
+async def api_toggle_lesson_completion(request):
     """Body: lesson_id, completed=true/false"""
-    lesson_id = request.POST.get("lesson_id")
-    completed = str(request.POST.get("completed","false")).lower() in ("true","1","yes")
-    lesson = get_object_or_404(Lesson, id=lesson_id)
-    obj, _ = LessonCompletion.objects.get_or_create(user=request.user, lesson=lesson)
-    obj.completed = completed
-    obj.completed_at = timezone.now() if completed else None
-    obj.save()
-    return JsonResponse({"ok": True, "completed": obj.completed})
+    try:
+        lesson_id = int(request.POST.get("lesson_id", ""))
+    except ValueError:
+        raise Http404("Lesson not found")
+    completed = _truthy(request.POST.get("completed", "false"))
+    user = await request.auser()
+    result = (await _run_write("completions", (user.id, {lesson_id: completed})))[lesson_id]
+    if not result["ok"]:
+        raise Http404("Lesson not found")
+    return JsonResponse({"ok": True, "completed": result["completed"]})
+
+def _truthy(value):
+    return str(value).lower() in ("true", "1", "yes")
+
+@queryinspector.query_budget(11)
+@login_required
+@require_http_methods(["POST"])
+async def api_bulk_lesson_completion(request):
+    """
+    JSON body: {"items": [{"lesson_id": 12, "completed": true}, ...]}
+    or form data: lesson_id=12&lesson_id=13&completed=true (same flag for all).
+    """
+    if request.content_type == "application/json":
+        try:
+            items = json.loads(request.body or b"{}").get("items") or []
+            changes = {int(i["lesson_id"]): _truthy(i.get("completed", True)) for i in items}
+        except (ValueError, TypeError, AttributeError, KeyError):
+            return JsonResponse({"ok": False, "error": "Malformed items."}, status=400)
+    else:
+        try:
+            flag = _truthy(request.POST.get("completed", "true"))
+            changes = {int(lid): flag for lid in request.POST.getlist("lesson_id")}
+        except ValueError:
+            return JsonResponse({"ok": False, "error": "Malformed lesson_id."}, status=400)
+
+    if not changes:
+        return JsonResponse({"ok": False, "error": "No lessons given."}, status=400)
+    if len(changes) > completions.MAX_ITEMS:
+        return JsonResponse({"ok": False, "error": f"At most {completions.MAX_ITEMS} lessons per request."}, status=400)
+
+    user = await request.auser()
+    results = await _run_write("completions", (user.id, changes))
+    course_ids = {r["course_id"] for r in results.values() if r["ok"]}
+    by_course = await _course_progress(user.id, course_ids)
+    return JsonResponse({
+        "ok": all(r["ok"] for r in results.values()),
+        "results": [
+            {"lesson_id": lid, **{k: v for k, v in r.items() if k != "course_id"}}
+            for lid, r in results.items()
+        ],
+        "progress": list(by_course.values()),
+    })
 
+@queryinspector.query_budget(8)
 @login_required
 @require_http_methods(["POST"])
-def api_submit_quiz_attempt(request, quiz_id: int):
+async def api_submit_quiz_attempt(request, quiz_id: int):
     """
     Accepts either:
       - answers[question_id]=choice_id for real DB-backed questions
       - OR static pages can send {score, total, label_*}
     """
-    quiz = get_object_or_404(Quiz, id=quiz_id)
+    quiz = await aget_object_or_404(Quiz, id=quiz_id)
+    user = await request.auser()
 
     raw_answers = {}
     score_param = request.POST.get("score")
 
     if score_param is None:
-        # DB-backed scoring
-        answers = {k.split("_", 1)[1]: v for k, v in request.POST.items() if k.startswith("q_")}
-        total = quiz.questions.count()
-        correct = 0
-        for q in quiz.questions.all().prefetch_related("choices"):
-            chosen_id = str(answers.get(str(q.id), ""))
-            raw_answers[str(q.id)] = chosen_id
-            if q.choices.filter(id=chosen_id, is_correct=True).exists():
-                correct += 1
-        score = int(round((correct * 100) / max(total, 1)))
+        # DB-backed scoring: cached answer key, grading in memory
+        result = grading.grade(
+            await _answer_key(quiz.id),
+            grading.answers_from_post(request.POST),
+        )
+        score, total, raw_answers = result.score, result.total, result.raw_answers
     else:
         # Static page payload
         try:
@@ -343,14 +400,23 @@ def api_submit_quiz_attempt(request, quiz_id: int):
                 raw_answers[k] = v
 
     passed = score >= getattr(quiz, "pass_mark", 70)
-    attempt = QuizAttempt.objects.create(
-        user=request.user,
-        quiz=quiz,
-        score=score,
-        total=total,
-        passed=passed,
-        raw_answers=raw_answers,
-    )
+    if attempt_spool.enabled():
+        # Written later by `manage.py drain_quiz_attempts`
+        await _spool_attempt(user.id, quiz.id, score, total, passed, raw_answers)
+        return JsonResponse({"ok": True, "score": score, "total": total, "passed": passed,
+                             "attempt_id": None, "queued": True})
+    fields = {
+        "user_id": user.id,
+        "quiz_id": quiz.id,
+        "score": score,
+        "total": total,
+        "passed": passed,
+        "raw_answers": raw_answers,
+    }
+    if writequeue.enabled():
+        attempt = await _run_write("quiz_attempt", fields)
+    else:
+        attempt = await QuizAttempt.objects.acreate(**fields)
     return JsonResponse({"ok": True, "score": score, "total": total, "passed": passed, "attempt_id": attempt.id})
 
 @login_required
@@ -381,15 +447,62 @@ def unenroll_user(request, user_id, slug):
     messages.success(request, f"Removed {user.email or user.username} from {course.title}.")
     return redirect("dashboard" if user == request.user else "/admin/pages/enrollment/")
 
-def courses_list(request):
-    q = request.GET.get("q", "").strip()
-    qs = Course.objects.filter(is_active=True).annotate(
-        n_modules=Count("modules", distinct=True),
-        n_lessons=Count("modules__lessons", distinct=True),
-    ).order_by("title")
+@user_passes_test(lambda u: u.is_staff)
+@require_http_methods(["GET"])
+def export_activity(request, kind):
+    """
+    Streams an export (see pages.exports). Query: format=csv|jsonl, gzip=1,
+    since, until, course (repeatable), after_id.
+    """
+    # A sync iterator would be buffered whole under ASGI; WSGI would buffer an async one
+    stream = exports.astream if isinstance(request, ASGIRequest) else exports.stream
+    if kind not in exports.EXPORTS:
+        raise Http404("Unknown export")
+    fmt = request.GET.get("format", "csv")
+    gzip = _truthy(request.GET.get("gzip", ""))
+    try:
+        after_id = request.GET.get("after_id")
+        blocks = stream(
+            kind, fmt, gzip,
+            since=exports.parse_bound(request.GET.get("since")),
+            until=exports.parse_bound(request.GET.get("until"), end=True),
+            courses=request.GET.getlist("course"),
+            after_id=int(after_id) if after_id else None,
+        )
+    except ValueError as exc:
+        return JsonResponse({"ok": False, "error": str(exc)}, status=400)
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(blocks, content_type="application/gzip" if gzip else content_type)
+    response["Content-Disposition"] = f'attachment; filename="{exports.filename(kind, fmt, gzip)}"'
+    return response
 
-    if q:
-        qs = qs.filter(Q(title__icontains=q) | Q(category__icontains=q))
+@user_passes_test(lambda u: u.is_staff)
+@require_http_methods(["GET"])
+def query_log(request):
+    """Query summaries of this process's last requests, newest first (?n_plus_one=1 to filter)."""
+    entries = list(queryinspector.RECENT)[::-1]
+    if _truthy(request.GET.get("n_plus_one", "")):
+        entries = [e for e in entries if e["n_plus_one"]]
+    return JsonResponse({"ok": True, "requests": entries})
+
+def _find_courses(q):
+    # n_modules/n_lessons are stored counters on Course (see pages.counters)
+    qs = Course.objects.filter(is_active=True).order_by("title")
+    if not q:
+        return list(qs)
+    ranked_ids = search.search_course_ids(q)
+    if ranked_ids is None:
+        # No full-text index on this database
+        return list(qs.filter(Q(title__icontains=q) | Q(category__icontains=q)))
+    rank = {pk: i for i, pk in enumerate(ranked_ids)}
+    return sorted(qs.filter(pk__in=ranked_ids), key=lambda c: rank[c.pk])
+
+@queryinspector.query_budget(8)
+@pagecache.cache_anonymous_page(params=("q",))
+def courses_list(request):
+    q = pagecache.normalise_query(request.GET.get("q", ""))
+    # Same list for everyone until the catalog changes
+    qs = pagecache.cached_catalog_value("courses", lambda: _find_courses(q), q)
 
     enrolled_slugs = set()
     if request.user.is_authenticated:
@@ -402,6 +515,8 @@ def courses_list(request):
         "enrolled_slugs": enrolled_slugs,
     })
 
+@queryinspector.query_budget(8)
+@pagecache.cache_anonymous_page
 def course_enroll(request, slug):
     """
     Public landing page for a course with curriculum preview and Enroll/Continue CTA.
@@ -410,20 +525,11 @@ def course_enroll(request, slug):
     """
     course = get_object_or_404(Course.objects.filter(is_active=True), slug=slug)
 
-    # Prefetch curriculum
-    modules = (
-        course.modules
-        .prefetch_related("lessons")
-        .order_by("index")
-    )
-
-    # Fast counts (single query)
-    counts = course.modules.aggregate(
-        n_modules=Count("id", distinct=True),
-        n_lessons=Count("lessons", distinct=True),
-    )
-    n_modules = counts.get("n_modules") or 0
-    n_lessons = counts.get("n_lessons") or 0
+    # Curriculum (cached snapshot)
+    curriculum = get_curriculum(course.id)
+    modules = curriculum.modules
+    n_modules = curriculum.n_modules
+    n_lessons = curriculum.n_lessons
 
     # Determine correct CTA
     is_enrolled = False
@@ -448,4 +554,5 @@ def course_enroll(request, slug):
         "is_enrolled": is_enrolled,
         "enroll_link": enroll_link,
         "continue_link": continue_link,
+        "catalog_version": pagecache.catalog_version(),
     })
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+In-process write queue (group commit) for small, hot writes.
+
+With WRITE_QUEUE_ENABLED, request threads hand their write to one background
+thread per process and wait for the result. The worker drains whatever
+accumulated (up to WRITE_QUEUE_MAX_BATCH items or WRITE_QUEUE_MAX_DELAY_MS)
+and applies it in a single transaction, so N concurrent requests cost one
+lock acquisition and one commit instead of N competing for SQLite's lock.
+
+When disabled (the default, and what tests use) run() executes the same
+handler inline, so callers don't need two code paths.
+
+Kinds:
+  "contact"      ContactMessage field dict        -> ContactMessage
+  "quiz_attempt" QuizAttempt field dict           -> QuizAttempt (with id)
+  "completions"  (user_id, {lesson_id: completed}) -> completions.apply() result
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import completions
+from .models import ContactMessage, QuizAttempt
+
+logger = logging.getLogger(__name__)
+
+
+# ----- Handlers: list of payloads in, list of results out -----
+def _write_contacts(payloads):
+    return ContactMessage.objects.bulk_create([ContactMessage(**p) for p in payloads])
+
+
+def _write_attempts(payloads):
+    return QuizAttempt.objects.bulk_create([QuizAttempt(**p) for p in payloads])
+
+
+def _write_completions(payloads):
+    return [completions.apply(user_id, changes) for user_id, changes in payloads]
+
+
+HANDLERS = {
+    "contact": _write_contacts,
+    "quiz_attempt": _write_attempts,
+    "completions": _write_completions,
+}
+
+
+def enabled():
+    return getattr(settings, "WRITE_QUEUE_ENABLED", False)
+
+
+# ----- Worker -----
+class WriteQueue:
+    def __init__(self, max_batch=200, max_delay=0.005):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self):
+        # Threads don't survive fork (e.g. gunicorn --preload): restart per pid
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                    self._queue = queue.Queue()
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name="pages-write-queue", daemon=True)
+                    self._thread.start()
+
+    def submit(self, kind, payload) -> Future:
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown write kind: {kind}")
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((kind, payload, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            close_old_connections()
+            try:
+                self._apply(batch)
+            except Exception:  # never let the worker die
+                logger.exception("Write queue batch failed")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("write queue failure"))
+
+    def _apply(self, batch):
+        by_kind = {}
+        for kind, payload, future in batch:
+            by_kind.setdefault(kind, []).append((payload, future))
+        try:
+            with transaction.atomic():
+                results = {
+                    kind: HANDLERS[kind]([p for p, _ in items]) for kind, items in by_kind.items()
+                }
+        except Exception:
+            # One bad item must not fail its neighbours: retry one by one
+            logger.warning("Write queue batch of %d failed; retrying items singly", len(batch), exc_info=True)
+            for kind, payload, future in batch:
+                try:
+                    # Resolve only after commit: SQLite checks foreign keys then
+                    with transaction.atomic():
+                        result = HANDLERS[kind]([payload])[0]
+                except Exception as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+        else:
+            for kind, items in by_kind.items():
+                for (_, future), result in zip(items, results[kind]):
+                    future.set_result(result)
+        self.batches += 1
+        self.items += len(batch)
+
+
+write_queue = WriteQueue(
+    max_batch=getattr(settings, "WRITE_QUEUE_MAX_BATCH", 200),
+    max_delay=getattr(settings, "WRITE_QUEUE_MAX_DELAY_MS", 5) / 1000,
+)
+
+
+def run(kind, payload):
+    """Perform one write, through the queue when enabled, and return its result."""
+    if not enabled():
+        return HANDLERS[kind]([payload])[0]
+    return write_queue.submit(kind, payload).result(timeout=getattr(settings, "WRITE_QUEUE_TIMEOUT", 30))